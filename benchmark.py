@@ -0,0 +1,1245 @@
+"""
+Headless benchmarks for the detection pipeline.
+
+    python benchmark.py pipeline                  # synthetic landmarks, all paths
+    python benchmark.py pipeline --render         # include keyboard/overlay rendering
+    python benchmark.py pipeline --render --preview-fps 15   # preview throttled as in the app
+    python benchmark.py pipeline --video rec.mp4  # recorded video through FaceMesh
+    python benchmark.py gestures --hours 4        # gesture recognizer over synthetic eye ratios
+    python benchmark.py calibration               # fixed vs auto-calibrated thresholds per user type
+    python benchmark.py idle                      # idle-mode frame/inference savings + wake latency
+    python benchmark.py pointing                  # Fitts'-law pointing: nose vs gaze cursor
+    python benchmark.py startup --max-first-frame 1.5   # time to first frame / landmarks, fails over budget
+    python benchmark.py streams --streams 1 2 4 8 --workers 1 2 4   # multi-station scaling on a worker pool
+    python benchmark.py service --subscribers 1 4 16   # landmark service fan-out, latency, slow clients
+    python benchmark.py text --chars 100 10000    # per-keystroke cost against document size
+    python benchmark.py soak --hours 8            # long session: fails on memory/thread growth or slowdown
+
+No window, camera, TTS or OS input is touched: speech and injection go to the
+Null backends.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import cv2
+
+import numpy as np
+
+import eye_detector
+from eye_detector import DetectorEngine
+from calibration import ThresholdCalibrator
+from display import WindowSchedule
+from gaze import GazeModel
+from landmark_service import LandmarkPublisher, LandmarkSubscriber
+from landmarks import LEFT_EYE, LEFT_IRIS, NOSE_TIP, RIGHT_EYE, RIGHT_IRIS, LandmarkResults
+from power import IdleFaceMesh, PresenceDetector
+from gestures import GestureRecognizer, replay
+from os_input import InputWorker, NullInput
+from predictor import load_predictor
+from replay import SyntheticFace, SyntheticLandmarkSource, VideoFileSource
+from serving import InferencePool, PooledFaceMesh, Stream
+from speech import NullSpeaker
+from startup import StartupTimer
+from text_buffer import TextBuffer, TextJournal
+
+PATHS = ["KEYBOARD", "CURSOR", "FLOATING_KB"]
+
+
+def latency_summary(samples):
+    """Per-frame latency samples (seconds) -> dict of fps and p50/p95/p99 in ms."""
+    samples = np.asarray(samples, dtype=np.float64)
+    total = samples.sum()
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000.0
+    return {
+        "frames": len(samples),
+        "fps": len(samples) / total if total > 0 else float("inf"),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+    }
+
+
+def print_summary(name, summary):
+    print(f"{name:<14} frames={summary['frames']:>7}  {summary['fps']:>9.1f} fps  "
+          f"p50={summary['p50_ms']:.3f}ms  p95={summary['p95_ms']:.3f}ms  p99={summary['p99_ms']:.3f}ms")
+
+
+def make_engine(path, face_mesh=None, camera_size=(eye_detector.CAM_W, eye_detector.CAM_H), recorder=None,
+                gaze=None):
+    mode = "CURSOR" if path == "FLOATING_KB" else path
+    engine = DetectorEngine(face_mesh, speaker=NullSpeaker(), os_input=NullInput(),
+                            camera_size=camera_size, mode=mode, recorder=recorder, gaze=gaze)
+    engine.floating_kb_active = path == "FLOATING_KB"
+    return engine
+
+
+def render_due(engine, frame, schedule, t):
+    """Renders what the app would: every window, or only those the schedule says are due."""
+    if schedule is None:
+        return engine.render(frame)
+    due = schedule.due(engine.window_names(), t)
+    return engine.render(frame, due) if due else {}
+
+
+def run_synthetic(path, seconds, fps, render, seed=0, recorder=None, schedule=None, preview=True):
+    """Times engine.update (+ render) per frame on scripted landmarks."""
+    source = SyntheticLandmarkSource(path, seconds=seconds, fps=fps, seed=seed)
+    engine = make_engine(path, recorder=recorder)
+    engine.show_preview = preview
+    blank = np.zeros((eye_detector.CAM_H, eye_detector.CAM_W, 3), dtype=np.uint8)
+    samples = np.empty(len(source), dtype=np.float64)
+    n = 0
+    while True:
+        ret, face, timestamp = source.read()
+        if not ret:
+            break
+        if path == "FLOATING_KB":
+            engine.floating_kb_active = True  # CLOSE_KB may get selected by the script
+        start = time.perf_counter()
+        engine.update(face, timestamp)
+        if render:
+            render_due(engine, blank.copy(), schedule, timestamp)
+        samples[n] = time.perf_counter() - start
+        n += 1
+    return samples[:n], engine
+
+
+def run_video(path, video, render, max_frames=None, schedule=None, preview=True):
+    """Times the full process_frame (flip, cvtColor, FaceMesh, decisions) on a recorded video."""
+    source = VideoFileSource(video)
+    face_mesh = eye_detector.create_face_mesh(source.width, source.height)
+    engine = make_engine(path, face_mesh, (source.width, source.height))
+    engine.show_preview = preview
+    samples = []
+    try:
+        while max_frames is None or len(samples) < max_frames:
+            ret, frame, timestamp = source.read()
+            if not ret:
+                break
+            if path == "FLOATING_KB":
+                engine.floating_kb_active = True
+            start = time.perf_counter()
+            frame = engine.process_frame(frame, timestamp)
+            if render:
+                render_due(engine, frame, schedule, timestamp)
+            samples.append(time.perf_counter() - start)
+    finally:
+        source.release()
+        face_mesh.close()
+    return np.asarray(samples), engine
+
+
+def cmd_pipeline(args):
+    for path in args.paths:
+        schedule = None
+        if args.preview_fps:
+            schedule = WindowSchedule({**eye_detector.DISPLAY_RATES, "Camera": args.preview_fps})
+        preview = not args.no_preview
+        if args.video:
+            samples, engine = run_video(path, args.video, args.render, args.max_frames, schedule, preview)
+        else:
+            recorder = None
+            if args.session_log:
+                recorder = eye_detector.create_recorder(f"{args.session_log}.{path.lower()}")
+            samples, engine = run_synthetic(path, args.seconds, args.fps, args.render, args.seed, recorder,
+                                            schedule, preview)
+            if recorder is not None:
+                recorder.close()
+        if len(samples) == 0:
+            print(f"{path:<14} no frames")
+            continue
+        print_summary(path, latency_summary(samples))
+        out = engine.os_input
+        print(f"{'':<14} taps={out.taps} clicks={out.clicks} scrolls={out.scrolls} "
+              f"speech={engine.speaker.spoken} typed={len(engine.typed_text)}")
+
+
+def synthetic_ratios(seconds, fps, seed=0):
+    """Open eyes (ratio ~3) with blinks, winks and the odd long close at random times."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fps)
+    times = np.arange(n) / fps
+    left = 3.0 + rng.normal(0, 0.1, n)
+    right = 3.0 + rng.normal(0, 0.1, n)
+    i = 0
+    while True:
+        i += int(rng.exponential(3.0 * fps)) + 1
+        if i >= n:
+            break
+        kind = rng.random()
+        length = int(rng.uniform(0.05, 1.2 if kind < 0.9 else 6.0) * fps) + 1
+        if kind < 0.6 or kind >= 0.9:
+            left[i:i + length] = right[i:i + length] = 5.0   # blink / long close
+        elif kind < 0.75:
+            left[i:i + length] = 5.0                        # left wink
+        else:
+            right[i:i + length] = 5.0                       # right wink
+        i += length
+    return times, left, right
+
+
+def cmd_gestures(args):
+    times, left, right = synthetic_ratios(args.hours * 3600, args.fps, args.seed)
+    recognizer = GestureRecognizer(eye_detector.EYE_CHANNELS, eye_detector.GESTURE_TABLE)
+    start = time.perf_counter()
+    events = replay(recognizer, times, left, right)
+    elapsed = time.perf_counter() - start
+    print(f"{len(times)} frames ({args.hours:g} h at {args.fps:g} fps) in {elapsed:.2f}s: "
+          f"{len(times) / elapsed:.0f} frames/s, {elapsed / len(times) * 1e6:.2f} us/frame")
+    for g, count in zip(recognizer.gestures, recognizer.counts):
+        print(f"  {g.name:<16} {count}")
+    print(f"  {len(events)} events")
+
+
+# Synthetic users: open-eye ratio (mean, sd), deliberate-blink peak ratio (mean, sd)
+USERS = {
+    "reference": ((3.0, 0.15), (5.0, 0.4)),
+    "narrow_eyes": ((3.7, 0.2), (5.6, 0.4)),    # squints cross the fixed threshold
+    "weak_blinks": ((2.4, 0.1), (3.9, 0.3)),    # many blinks never reach it
+}
+
+
+def labelled_user(user, seconds, fps, seed=0):
+    """Eye ratios with ground truth: (times, left, right, [(blink start, end)])."""
+    (open_mean, open_sd), (peak_mean, peak_sd) = USERS[user]
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fps)
+    times = np.arange(n) / fps
+    left = open_mean + rng.normal(0, open_sd, n)
+    right = open_mean + rng.normal(0, open_sd, n)
+    blinks = []
+    i = int(fps)
+    while i < n:
+        length = int(rng.uniform(0.35, 0.8) * fps)
+        if rng.random() < 0.15:
+            # Squint / frown: both eyes narrow briefly, not a selection
+            level = open_mean + rng.uniform(0.4, 0.8)
+            left[i:i + length] = level + rng.normal(0, open_sd, len(left[i:i + length]))
+            right[i:i + length] = level + rng.normal(0, open_sd, len(right[i:i + length]))
+        else:
+            peak = rng.normal(peak_mean, peak_sd)
+            left[i:i + length] = peak + rng.normal(0, 0.1, len(left[i:i + length]))
+            right[i:i + length] = peak + rng.normal(0, 0.1, len(right[i:i + length]))
+            blinks.append((times[i], times[min(i + length, n - 1)]))
+        i += length + int(rng.uniform(1.0, 3.0) * fps)
+    return times, left, right, blinks
+
+
+def score(events, blinks, minutes):
+    """Blink events against the true blinks: miss rate, false-trigger rate, correct selections/min."""
+    hits = set()
+    false = 0
+    for t in events:
+        k = next((k for k, (start, end) in enumerate(blinks) if start <= t <= end + 0.1), None)
+        if k is None or k in hits:
+            false += 1
+        else:
+            hits.add(k)
+    return {
+        "miss_rate": round(1 - len(hits) / max(len(blinks), 1), 3),
+        "false_trigger_rate": round(false / max(len(events), 1), 3),
+        "selections_per_minute": round(len(hits) / minutes, 2),
+    }
+
+
+def cmd_calibration(args):
+    for user in args.users:
+        times, left, right, blinks = labelled_user(user, args.minutes * 60, args.fps, args.seed)
+        fixed = GestureRecognizer(eye_detector.EYE_CHANNELS, eye_detector.GESTURE_TABLE)
+        adaptive = GestureRecognizer(eye_detector.EYE_CHANNELS, eye_detector.GESTURE_TABLE)
+        calibrator = eye_detector.create_calibrator()
+        blink = fixed.bit("blink")
+        fixed_events, adaptive_events = [], []
+        start = time.perf_counter()
+        for t, l, r in zip(times.tolist(), left.tolist(), right.tolist()):
+            if fixed.update(l, r, t) & blink:
+                fixed_events.append(t)
+            if calibrator.observe_eyes(l, r, t):
+                adaptive.scale_thresholds(calibrator.scale)
+            if adaptive.update(l, r, t) & blink:
+                adaptive_events.append(t)
+        elapsed = time.perf_counter() - start
+        print(f"{user:<14} {len(blinks)} blinks in {args.minutes:g} min  ({elapsed / len(times) * 1e6:.1f} us/frame)")
+        print(f"{'':<14} fixed      CLICK_RATIO={eye_detector.CLICK_RATIO:.2f}  {score(fixed_events, blinks, args.minutes)}")
+        print(f"{'':<14} calibrated CLICK_RATIO={calibrator.click_ratio:.2f}  {score(adaptive_events, blinks, args.minutes)}")
+        report = calibrator.report()
+        print(f"{'':<14} live proxy miss_rate={report['miss_rate']}")
+
+
+class ScriptedCamera:
+    """
+    Desk scene at fps; a face-sized blob is in view during `present` intervals. Honours
+    set_interval() like CameraCapture, so idle mode really skips frames.
+    """
+
+    def __init__(self, seconds, fps, present, seed=0):
+        rng = np.random.default_rng(seed)
+        self.fps = fps
+        self.frames = int(seconds * fps)
+        self.present = present
+        self.background = rng.integers(60, 120, (eye_detector.CAM_H, eye_detector.CAM_W, 3), dtype=np.uint8)
+        self.frame = self.background.copy()
+        self.noise = [rng.integers(0, 6, self.background.shape, dtype=np.uint8) for _ in range(4)]
+        self.interval = 0.0
+        self.index = 0
+        self._last = -1e9
+        self.decoded = 0
+
+    def set_interval(self, seconds):
+        self.interval = seconds
+
+    def is_present(self, t):
+        return any(start <= t < end for start, end in self.present)
+
+    def read(self):
+        """(ok, frame, timestamp), skipping frames the interval says are not decoded."""
+        while self.index < self.frames:
+            t = self.index / self.fps
+            self.index += 1
+            if self.interval and t - self._last < self.interval - 1e-9:
+                continue
+            self._last = t
+            self.decoded += 1
+            np.add(self.background, self.noise[self.index % 4], out=self.frame)  # Sensor noise
+            if self.is_present(t):
+                cv2.ellipse(self.frame, (320, 220), (90, 120), 0, 0, 360, (190, 170, 160), -1)
+            return True, self.frame, t
+        return False, None, 0.0
+
+
+class StubFaceMesh:
+    """
+    Finds the face whenever the scripted camera shows one. Inference cost is counted
+    (calls x cost), not spent, so half an hour of camera time runs in seconds.
+    """
+
+    def __init__(self, camera, cost=0.012):
+        self.camera = camera
+        self.cost = cost
+        self.calls = 0
+        self.face = SyntheticFace().set(0.5, 0.5, True, True)
+
+    def process_bgr(self, frame, timestamp=None):
+        self.calls += 1
+        return LandmarkResults([self.face] if self.camera.is_present(timestamp) else None, timestamp)
+
+    def close(self):
+        pass
+
+
+def cmd_idle(args):
+    # Present 2 min, away 10 min, back 3 min, away 20 min, back 1 min
+    present = [(0, 120), (720, 900), (2100, 2160)]
+    seconds = 2160 + 30
+    for idle in (False, True):
+        camera = ScriptedCamera(seconds, args.fps, present, args.seed)
+        stub = StubFaceMesh(camera, args.inference_ms / 1000)
+        face_mesh = stub
+        if idle:
+            face_mesh = IdleFaceMesh(stub, PresenceDetector(args.detector), camera,
+                                     idle_after=eye_detector.IDLE_AFTER, idle_fps=eye_detector.IDLE_FPS,
+                                     max_wake_latency=eye_detector.WAKE_LATENCY_LIMIT)
+        check_time = 0.0
+        while True:
+            ok, frame, t = camera.read()
+            if not ok:
+                break
+            idle_frame = idle and face_mesh.state == "idle"
+            start = time.perf_counter()
+            face_mesh.process_bgr(frame, t)
+            if idle_frame:
+                check_time += time.perf_counter() - start
+        minutes = seconds / 60
+        inference = stub.calls * stub.cost + check_time
+        label = f"idle ({args.detector})" if idle else "always on"
+        print(f"{label:<18} decoded/min={camera.decoded / minutes:7.0f}  facemesh/min={stub.calls / minutes:7.0f}  "
+              f"inference+checks={inference / seconds * 100:5.1f}% of a core")
+        if idle:
+            stats = face_mesh.stats()
+            # The stub's inference is free, so add its nominal cost back onto each wake-up
+            latencies = [x + stub.cost for x in face_mesh.wake_latencies]
+            print(f"{'':<18} presence check {check_time / max(face_mesh.idle_frames, 1) * 1e3:.2f} ms, "
+                  f"wakes={stats['wakes']} false_wakes={stats['false_wakes']} idle_fps={stats['idle_fps']}, "
+                  f"wake latency max {max(latencies, default=0):.3f}s (limit {face_mesh.max_wake_latency}s)")
+
+
+# --- Pointing (Fitts' law) ---
+
+SCREEN_CM = (53.0, 30.0)    # 24" monitor
+VIEW_CM = 60.0              # Eye to screen
+EYEBALL = 0.4               # Iris travel per sin(eye-in-head angle), in eye widths
+IRIS_NOISE = 0.0009         # FaceMesh iris-centre jitter, frame fractions (~0.6 px at 640)
+NOSE_NOISE = 0.0006
+CORNER_NOISE = 0.0004
+SEE_DELAY = 0.12            # Seconds before the user sees where the cursor is
+DWELL = 0.3                 # Cursor inside the target this long = selection
+TRIAL_TIMEOUT = 4.0
+
+
+class Movement:
+    """Minimum-jerk point-to-point movement."""
+
+    def __init__(self, start, end, t0, duration):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.t0 = t0
+        self.duration = duration
+
+    def at(self, t):
+        s = min(max((t - self.t0) / self.duration, 0.0), 1.0)
+        return self.start + (self.end - self.start) * (s * s * s * (10 - 15 * s + 6 * s * s))
+
+    def done(self, t):
+        return t >= self.t0 + self.duration
+
+
+def screen_angle(p):
+    """Normalized screen point -> (horizontal, vertical) visual angle in radians from the screen centre."""
+    return np.arctan((np.asarray(p) - 0.5) * SCREEN_CM / VIEW_CM)
+
+
+class PointingUser:
+    """
+    Simulated user. The head pose h (where the nose tip sits in the frame, also the
+    screen point the face points at) and the gaze point g move in minimum-jerk
+    submovements; landmarks are rendered from them with FaceMesh-sized jitter.
+
+    nose: closed loop on the cursor as seen SEE_DELAY late; each head submovement aims
+          at the remaining error and lands with noise proportional to its amplitude
+          (the optimized-submovement account of Fitts' law).
+    gaze: a main-sequence saccade to the target (undershoot fixed by a corrective
+          saccade), the head following a third of the way; if the cursor sits off the
+          target the user looks beside it to pull the cursor in.
+    """
+
+    def __init__(self, method, seed=0, reaction=0.2):
+        self.method = method
+        self.rng = np.random.default_rng(seed)
+        self.synth = SyntheticFace(seed)
+        self.reaction = reaction
+        self.h = np.array([0.5, 0.5])
+        self.g = np.array([0.5, 0.5])
+        self.head = None
+        self.saccade = None
+        self.target = self.aim = self.g.copy()
+        self.correct = False
+        self._next_head = 0.0
+        self._next_saccade = None
+        self._fixated = None
+        self._seen = []          # (t, cursor)
+
+    def show(self, target, t, correct=True):
+        """A new target appears at t; correct=False: just look at it (calibration)."""
+        self.target = np.asarray(target, dtype=np.float64)
+        self.aim = self.target.copy()
+        self.correct = correct
+        self._next_head = t + self.reaction
+        self._next_saccade = t + self.reaction
+        self._fixated = None
+
+    def step(self, t, cursor):
+        """Advances to t given the current cursor (normalized); returns this frame's face."""
+        self._seen.append((t, cursor))
+        while len(self._seen) > 2 and self._seen[1][0] <= t - SEE_DELAY - 0.1:
+            self._seen.pop(0)
+        seen = np.asarray(self._seen[-1][1])
+        for past_t, past in reversed(self._seen):
+            if past_t <= t - SEE_DELAY:
+                seen = np.asarray(past)
+                break
+        if self.method == "nose":
+            # Corrections are planned on a cursor that has come to rest (it can overshoot the head)
+            settled = float(np.hypot(*(seen - np.asarray(self._seen[0][1])))) < 0.003
+            self._steer_head(t, seen, settled)
+        else:
+            self._look(t, seen)
+
+        if self.head is not None:
+            self.h = self.head.at(t)
+        if self.saccade is not None:
+            self.g = self.saccade.at(t)
+        gaze = self.g + self.rng.normal(0, 0.002, 2)  # Fixational drift
+        iris = EYEBALL * np.sin(screen_angle(gaze) - screen_angle(self.h))
+        face = self.synth.set(self.h[0], self.h[1], True, True, (iris[0], 0.8 * iris[1]))
+        a = self.synth.array
+        for eye, iris_point in ((LEFT_EYE, LEFT_IRIS), (RIGHT_EYE, RIGHT_IRIS)):
+            a[[eye[0], eye[3]], :2] += self.rng.normal(0, CORNER_NOISE, (2, 2))
+            a[iris_point, :2] += self.rng.normal(0, IRIS_NOISE, 2)
+        a[NOSE_TIP, :2] += self.rng.normal(0, NOSE_NOISE, 2)
+        return face
+
+    def _steer_head(self, t, seen, settled):
+        if t < self._next_head or (self.head is not None and not self.head.done(t)) or not settled:
+            return
+        error = self.target - seen
+        amplitude = float(np.hypot(*error))
+        if amplitude < 0.004:
+            self._next_head = t + 0.05
+            return
+        end = self.h + error + self.rng.normal(0, 0.08 * amplitude + 0.001, 2)
+        duration = 0.12 + 1.0 * amplitude
+        self.head = Movement(self.h, end, t, duration)
+        self._next_head = t + duration + SEE_DELAY + 0.05
+        self.g = self.target.copy()  # The eyes are on the target throughout
+
+    def _look(self, t, seen):
+        if self._next_saccade is not None and t >= self._next_saccade:
+            amplitude = float(np.hypot(*np.degrees(screen_angle(self.aim) - screen_angle(self.g))))
+            undershoot = 0.0 if amplitude < 2 else self.rng.normal(0.08, 0.03)
+            end = self.aim + (self.g - self.aim) * undershoot + self.rng.normal(0, 0.004, 2)
+            duration = 0.021 + 0.0022 * amplitude
+            self.saccade = Movement(self.g, end, t, duration)
+            self._next_saccade = t + duration + 0.15 if undershoot > 0.03 else None
+            if self.head is None or self.head.done(t):
+                self.head = Movement(self.h, self.h + (self.aim - self.h) / 3, t + 0.03,
+                                     0.3 + 0.5 * float(np.hypot(*(self.aim - self.h))))
+            self._fixated = t + duration
+        elif self.correct and self._fixated is not None and t - self._fixated > 0.6:
+            # Cursor still beside the target: look the other way by the offset
+            self.aim = self.aim + 0.8 * (self.target - seen)
+            self._next_saccade = t
+
+
+def run_pointing(method, distances, widths, reps, fps, seed):
+    """Reciprocal pointing along the screen's horizontal midline. Returns trial rows and update times."""
+    rng = np.random.default_rng(seed)
+    gaze = GazeModel(eye_detector.GAZE_DEGREE, eye_detector.GAZE_RIDGE) if method == "gaze" else None
+    engine = make_engine("CURSOR", gaze=gaze)
+    screen = np.array([engine.screen_w, engine.screen_h], dtype=np.float64)
+    user = PointingUser(method, seed)
+    clock = {"t": 0.0}
+    update_times = []
+
+    def frame():
+        t = clock["t"]
+        face = user.step(t, np.asarray(engine.os_input.position) / screen)
+        start = time.perf_counter()
+        engine.update(face, t)
+        update_times.append(time.perf_counter() - start)
+        clock["t"] = t + 1.0 / fps
+        return t
+
+    shown = None
+    while gaze is not None and (not gaze.fitted or engine.gaze_calibration is not None):
+        calibration = engine.gaze_calibration
+        target = calibration.target if calibration is not None else (0.5, 0.5)
+        if target != shown:
+            user.show(target, clock["t"], correct=False)
+            shown = target
+        frame()
+
+    trials = []
+    conditions = [(d, w) for d in distances for w in widths]
+    rng.shuffle(conditions)
+    for distance, width in conditions:
+        ends = [np.array([0.5 - distance / 2, 0.5]), np.array([0.5 + distance / 2, 0.5])]
+        user.show(ends[0], clock["t"])
+        settle_until = clock["t"] + 1.5
+        while clock["t"] < settle_until:
+            frame()
+        start_x = np.asarray(engine.os_input.position)[0] / screen[0]
+        radius = width * screen[0] / 2
+        for rep in range(reps):
+            target = ends[(rep + 1) % 2]
+            onset = clock["t"]
+            user.show(target, onset)
+            inside_since = None
+            inside = []
+            selected = False
+            while clock["t"] - onset < TRIAL_TIMEOUT:
+                t = frame()
+                cursor = np.asarray(engine.os_input.position, dtype=np.float64)
+                if np.hypot(*(cursor - target * screen)) <= radius:
+                    if inside_since is None:
+                        inside_since = t
+                        inside = []
+                    inside.append(cursor / screen)
+                    if t - inside_since >= DWELL:
+                        selected = True
+                        break
+                else:
+                    inside_since = None
+            end_x = np.mean(inside, axis=0)[0] if selected else np.asarray(engine.os_input.position)[0] / screen[0]
+            trials.append({
+                "distance": distance, "width": width, "time": clock["t"] - onset, "selected": selected,
+                # Signed landing error along the movement and the distance actually covered
+                "dx": (end_x - target[0]) * np.sign(target[0] - 0.5), "amplitude": abs(end_x - start_x),
+            })
+            start_x = end_x
+    return trials, np.asarray(update_times), engine
+
+
+def fitts_summary(trials):
+    """Per (D, W) condition mean time and errors; regression MT = a + b * ID; effective throughput."""
+    rows = []
+    for d, w in sorted({(tr["distance"], tr["width"]) for tr in trials}):
+        group = [tr for tr in trials if tr["distance"] == d and tr["width"] == w]
+        hits = [tr for tr in group if tr["selected"]]
+        mt = float(np.mean([tr["time"] for tr in hits])) if hits else float("nan")
+        # ISO 9241-9 effective width/distance from where the selections actually landed
+        we = 4.133 * float(np.std([tr["dx"] for tr in group]))
+        de = float(np.mean([tr["amplitude"] for tr in group]))
+        rows.append({"D": d, "W": w, "ID": math.log2(d / w + 1), "MT": mt, "errors": len(group) - len(hits),
+                     "n": len(group), "IDe": math.log2(de / max(we, 1e-6) + 1)})
+    valid = [r for r in rows if not math.isnan(r["MT"])]
+    fit = None
+    if len(valid) >= 2:
+        ids = np.array([r["ID"] for r in valid])
+        mts = np.array([r["MT"] for r in valid])
+        b, a = np.polyfit(ids, mts, 1)
+        r2 = 1 - np.sum((mts - (a + b * ids)) ** 2) / max(np.sum((mts - mts.mean()) ** 2), 1e-12)
+        fit = {"a": a, "b": b, "r2": r2, "throughput": float(np.mean([r["IDe"] / r["MT"] for r in valid]))}
+    return rows, fit
+
+
+def cmd_pointing(args):
+    summaries = {}
+    for method in args.methods:
+        trials, update_times, engine = run_pointing(method, args.distances, args.widths, args.reps, args.fps,
+                                                    args.seed)
+        rows, fit = fitts_summary(trials)
+        summaries[method] = fit
+        print(f"{method:<5}   D      W      ID    MT(s)  errors")
+        for r in rows:
+            print(f"{'':<5} {r['D']:5.2f}  {r['W']:5.3f}  {r['ID']:4.2f}  {r['MT']:6.2f}  {r['errors']}/{r['n']}")
+        errors = sum(r["errors"] for r in rows) / max(sum(r["n"] for r in rows), 1)
+        cost = np.percentile(update_times, 50) * 1e6
+        if fit is not None:
+            print(f"{'':<5} MT = {fit['a']:.2f} + {fit['b']:.3f} * ID  (r2={fit['r2']:.2f})  "
+                  f"throughput {fit['throughput']:.2f} bits/s  errors {errors:.1%}  update p50 {cost:.0f} us")
+        if engine.gaze is not None:
+            features = engine.gaze_features.vector
+            start = time.perf_counter()
+            for _ in range(10000):
+                engine.gaze.predict(features)
+            predict = (time.perf_counter() - start) / 10000 * 1e6
+            print(f"{'':<5} calibration error {engine.gaze.error:.3f} of the screen (leave-one-dot-out), "
+                  f"predict {predict:.1f} us/frame")
+        print()
+
+
+# --- Startup ---
+
+MILESTONES = ["first_frame", "camera", "face_mesh", "first_inference", "first_landmarks"]
+
+
+class HeadlessDisplay:
+    """Display stand-in: notes when the first image would have been shown and which windows would be open."""
+
+    def __init__(self):
+        self.screen_size = (1920, 1080)
+        self.first_shown = None
+        self.open = set()
+
+        # Counters
+        self.shown = 0
+        self.created = 0
+        self.destroyed = 0
+
+    def submit(self, windows, active):
+        if windows and self.first_shown is None:
+            self.first_shown = time.time()
+        # Same window lifecycle as Display._apply
+        closing = self.open - set(active)
+        self.destroyed += len(closing)
+        self.open -= closing
+        for name in windows:
+            if name in active:
+                if name not in self.open:
+                    self.open.add(name)
+                    self.created += 1
+                self.shown += 1
+
+    def poll_key(self):
+        return 255
+
+    def close(self):
+        pass
+
+
+class SlowCamera:
+    """
+    CameraCapture stand-in whose opening takes `delay` seconds (webcams take from a few
+    hundred ms to seconds), then serves a looped video or black frames at fps.
+    """
+
+    def __init__(self, delay, video=None, fps=30.0):
+        time.sleep(delay)
+        self.source = VideoFileSource(video, loop=True) if video else None
+        self.size = (self.source.width, self.source.height) if video else (eye_detector.CAM_W, eye_detector.CAM_H)
+        self.interval = 1.0 / fps
+        self.frame = np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8)
+        self._next = time.time()
+
+    def read(self, timeout=1.0):
+        wait = self._next - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self._next = max(self._next + self.interval, time.time())
+        frame = self.source.read()[1] if self.source is not None else self.frame.copy()
+        return True, frame, time.time()
+
+    def set_interval(self, seconds):
+        pass
+
+    def stats(self):
+        return {"read": 0, "dropped": 0, "late": 0}
+
+    def release(self):
+        if self.source is not None:
+            self.source.release()
+
+
+def startup_child(args):
+    """One startup in a fresh process, as main() does it (parallel) or in the old order (sequential)."""
+    timer = StartupTimer(args.launched)
+    engine = DetectorEngine(None, speaker=NullSpeaker(), os_input=NullInput())
+    display = HeadlessDisplay()
+    open_camera = lambda: SlowCamera(args.camera_delay, args.video)
+    tasks = {}
+    face_mesh = None
+    if args.child == "sequential":
+        # Everything up front and no warm-up, then the first window
+        capture = open_camera()
+        timer.mark("camera")
+        backend = eye_detector.create_inference_backend(*capture.size, warm=False)
+        face_mesh = engine.face_mesh = eye_detector.create_face_mesh(*capture.size, backend=backend)
+        timer.mark("face_mesh")
+        eye_detector.get_screen_size()
+    else:
+        tasks = eye_detector.begin_startup(open_camera)
+        eye_detector.show_menu_until(tasks["camera"], engine, display, timer)
+        capture = tasks.pop("camera").result()
+        timer.mark("camera")
+    engine.cam_w, engine.cam_h = capture.size
+
+    deadline = time.time() + args.timeout
+    while time.time() < deadline:
+        if face_mesh is None and tasks["face_mesh"].done():
+            backend = tasks.pop("face_mesh").result()
+            try:
+                face_mesh = engine.face_mesh = eye_detector.create_face_mesh(*capture.size, backend=backend)
+            except BaseException:
+                if backend is not None:
+                    backend.close()
+                raise
+            timer.mark("face_mesh")
+        ret, frame, t = capture.read()
+        frame = engine.process_frame(frame, t)
+        display.submit(engine.render(frame), engine.window_names())
+        if display.first_shown is not None:
+            timer.mark("first_frame", display.first_shown)
+        if face_mesh is not None:
+            timer.mark("first_inference")
+            if engine.face_found:
+                timer.mark("first_landmarks")
+            if engine.face_found or args.video is None:
+                break
+    capture.release()
+    if face_mesh is not None:
+        face_mesh.close()
+    eye_detector.finish_startup(tasks)
+    print(json.dumps(timer.marks))
+
+
+def cmd_startup(args):
+    if args.child:
+        return startup_child(args)
+    # Without a face video nothing is ever found: time to first landmarks = first inference
+    landmarks = "first_landmarks" if args.video else "first_inference"
+    results = {mode: {name: [] for name in MILESTONES} for mode in ("sequential", "parallel")}
+    for _ in range(args.runs):
+        for mode in results:
+            command = [sys.executable, __file__, "startup", "--child", mode, "--launched", repr(time.time()),
+                       "--camera-delay", str(args.camera_delay), "--timeout", str(args.timeout)]
+            if args.video:
+                command += ["--video", args.video]
+            out = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout + 60)
+            if out.returncode != 0:
+                raise SystemExit(f"startup child failed:\n{out.stderr}")
+            marks = json.loads(out.stdout.strip().splitlines()[-1])
+            for name, seconds in marks.items():
+                results[mode][name].append(seconds)
+
+    print(f"{args.runs} runs, camera opens in {args.camera_delay:.2f}s; p50 (max) seconds from launch")
+    print(f"{'':<12}" + "".join(f"{name:>18}" for name in MILESTONES))
+    for mode, marks in results.items():
+        cells = [f"{np.median(v):8.3f} ({max(v):5.2f})" if v else f"{'-':>16}" for v in marks.values()]
+        print(f"{mode:<12}" + "".join(f"{c:>18}" for c in cells))
+
+    failed = []
+    parallel = results["parallel"]
+    for name, budget in (("first_frame", args.max_first_frame), (landmarks, args.max_first_landmarks)):
+        if budget is not None and (not parallel[name] or np.median(parallel[name]) > budget):
+            failed.append(f"{name} over {budget}s")
+    if failed:
+        print(f"REGRESSION: {', '.join(failed)}")
+        raise SystemExit(1)
+
+
+# --- Multi-stream serving ---
+
+def cmd_streams(args):
+    width, height = eye_detector.CAM_W, eye_detector.CAM_H
+    source = "video" if args.video else "blank frames (full-frame detection every inference)"
+    print(f"{args.seconds:.0f}s per run, {args.fps:.0f} fps per stream, {source}, "
+          f"latency limit {args.latency_limit}s, {os.cpu_count()} CPUs")
+    for workers in args.workers:
+        pool = InferencePool(workers, width, height, **eye_detector.FACE_MESH_OPTIONS).start()
+        try:
+            for n in args.streams:
+                streams = []
+                for i in range(n):
+                    camera = (VideoFileSource(args.video, loop=True, realtime=True) if args.video
+                              else SlowCamera(0.0, fps=args.fps))
+                    backend = PooledFaceMesh(pool)
+                    engine = make_engine("KEYBOARD", eye_detector.create_face_mesh(width, height, backend=backend))
+                    streams.append(Stream(f"s{i}", camera, engine, backend, args.latency_limit))
+                for stream in streams:
+                    stream.start()
+                time.sleep(args.seconds)
+                stats = [stream.stats() for stream in streams]
+                for stream in streams:
+                    stream.stop()
+                fps = [s["fps"] for s in stats]
+                p95 = [s["latency_p95"] for s in stats if s["latency_p95"] is not None]
+                stale = sum(s["stale"] for s in stats) / max(sum(s["frames"] + s["stale"] for s in stats), 1)
+                print(f"workers={workers}  streams={n:<3} aggregate {sum(fps):6.1f} fps  "
+                      f"per stream {min(fps):5.1f}-{max(fps):5.1f} fps  "
+                      f"p95 latency {max(p95, default=float('nan')) * 1000:6.1f} ms (worst stream)  "
+                      f"dropped stale {stale:.1%}")
+        finally:
+            pool.close()
+
+
+# --- Landmark service ---
+
+def service_consumer(args):
+    """One subscriber in its own process: delivery latency of every record, optionally reading slowly."""
+    subscriber = LandmarkSubscriber(args.consumer, timeout=args.seconds + 10)
+    latencies, batches = [], 0
+    while True:
+        records, _ = subscriber.read()
+        if records is None:
+            break
+        now = time.time()
+        latencies.extend(now - records["t"])
+        batches += 1
+        if args.slow:
+            time.sleep(args.slow)
+    subscriber.close()
+    latencies = np.asarray(latencies)
+    print(json.dumps({"records": subscriber.records, "dropped": subscriber.dropped, "batches": batches,
+                      "p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                      "p95": float(np.percentile(latencies, 95)) if len(latencies) else None}))
+
+
+def cmd_service(args):
+    if args.consumer:
+        return service_consumer(args)
+    gestures = [g.name for g in eye_detector.GESTURE_TABLE]
+    path = f"/tmp/eye_detector_bench_{os.getpid()}.sock"
+    print(f"{args.seconds:.0f}s at {args.fps:.0f} fps, {'full mesh' if args.full_mesh else 'eye + nose points'}")
+    for n in [0] + args.subscribers:
+        source = SyntheticLandmarkSource("KEYBOARD", seconds=args.seconds, fps=args.fps, seed=args.seed)
+        engine = make_engine("KEYBOARD")
+        publisher = engine.publisher = LandmarkPublisher(path, gestures, full_mesh=args.full_mesh)
+        slow = min(args.slow_clients, n)
+        consumers = [subprocess.Popen([sys.executable, __file__, "service", "--consumer", path,
+                                       "--seconds", str(args.seconds)]
+                                      + ["--slow", str(args.slow if i < slow else 0)],
+                                      stdout=subprocess.PIPE, text=True) for i in range(n)]
+        deadline = time.time() + 30
+        while len(publisher.clients) < n and time.time() < deadline:
+            time.sleep(0.01)
+        costs = []
+        start = time.time()
+        for i in range(len(source)):
+            wait = start + i / args.fps - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            ret, face, _ = source.read()
+            t = time.perf_counter()
+            engine.update(face, time.time())
+            costs.append(time.perf_counter() - t)
+        publisher.close()
+        results = [json.loads(c.communicate()[0].strip().splitlines()[-1]) for c in consumers]
+        line = f"subscribers={n:<3} update p50 {np.percentile(costs, 50) * 1e6:6.1f} us"
+        for label, group in (("", results[slow:]), ("slow ", results[:slow])):
+            if group:
+                frames = sum(r["records"] for r in group) / len(group)
+                line += (f"  {label}clients: {frames / args.seconds:5.1f} fps, "
+                         f"p95 latency {max((r['p95'] or 0) for r in group) * 1000:5.2f} ms, "
+                         f"{sum(r['records'] for r in group) / max(sum(r['batches'] for r in group), 1):4.1f} "
+                         f"records/read, dropped {sum(r['dropped'] for r in group)}")
+        print(line)
+    record = publisher.dtype.itemsize
+    sample = {name: publisher._ring[0][name].tolist() for name in publisher.dtype.names}
+    print(f"record {record} bytes vs {len(json.dumps(sample))} bytes as JSON")
+
+
+# --- Text buffer ---
+
+def old_str_keystroke(text, char, width=30):
+    """What a typed character cost before text_buffer: rebuild the str, find the word, re-slice every line."""
+    text += char
+    re.search(r"[A-Za-z]*$", text).group()
+    lines = [text[i:i + width] for i in range(0, len(text), width)]
+    lines[-3:]
+    return text
+
+
+def cmd_text(args):
+    """Per-keystroke cost (edit, current word, suggestions, keyboard text redraw) against document size."""
+    rng = np.random.default_rng(args.seed)
+    words = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog"]
+    predictor = load_predictor(eye_detector.PREDICTION_TRIE, eye_detector.PREDICTION_WORD_LIST)
+    frame = np.zeros((eye_detector.CAM_H, eye_detector.CAM_W, 3), dtype=np.uint8)
+    keys = [k for k in "HELLO"] + ["Space"]
+    print(f"{args.keys} keystrokes per size; p50 / p95 per keystroke frame")
+    for size in args.chars:
+        document = " ".join(rng.choice(words, size // 4 + 1))[:size]
+        costs = {}
+        for where in ("end", "middle"):
+            engine = make_engine("KEYBOARD")
+            engine.predictor = predictor
+            engine.text.insert(document)
+            if where == "middle":
+                engine.text.move_to(size // 2)
+            samples = []
+            for i in range(args.keys):
+                start = time.perf_counter()
+                engine._type_on_screen(keys[i % len(keys)], i * 0.5)
+                engine.render(frame, {"Keyboard"})
+                samples.append(time.perf_counter() - start)
+            costs[where] = np.percentile(samples, [50, 95]) * 1e6
+        text, samples = document, []
+        for i in range(args.keys):
+            start = time.perf_counter()
+            text = old_str_keystroke(text, "a")
+            samples.append(time.perf_counter() - start)
+        old = np.percentile(samples, [50, 95]) * 1e6
+        print(f"{size:>8} chars  at end {costs['end'][0]:7.1f} / {costs['end'][1]:7.1f} us  "
+              f"mid-text {costs['middle'][0]:7.1f} / {costs['middle'][1]:7.1f} us  "
+              f"(old str handling alone {old[0]:8.1f} / {old[1]:8.1f} us)")
+    if predictor is not None:
+        predictor.close()
+
+    path = f"/tmp/eye_detector_bench_{os.getpid()}.journal"
+    journal = TextJournal(path, eye_detector.JOURNAL_FSYNC_INTERVAL, eye_detector.JOURNAL_FSYNC_BATCH)
+    buffer = TextBuffer(journal=journal)
+    samples = []
+    for i in range(args.keys):
+        start = time.perf_counter()
+        buffer.insert("a")
+        samples.append(time.perf_counter() - start)
+    journal.close()
+    restored = TextJournal(path)
+    restored.close()
+    os.unlink(path)
+    print(f"journal: insert p95 {np.percentile(samples, 95) * 1e6:.1f} us, {journal.records} records, "
+          f"{journal.syncs} fsyncs, restored {len(restored.restored[0])} characters")
+
+
+# --- Soak ---
+
+def current_rss():
+    """Resident set size in bytes; the peak where /proc isn't available (a leak still shows as growth)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def soak_frames(args):
+    """
+    (path, face or BGR frame, timestamp) for args.hours of simulated use, switching path
+    every args.segment_minutes: synthetic landmarks with the odd frame out of view, or
+    the looped --video for FaceMesh.
+    """
+    total = args.hours * 3600.0
+    video = VideoFileSource(args.video, loop=True) if args.video else None
+    offset, segment = 0.0, 0
+    try:
+        while offset < total:
+            path = PATHS[segment % len(PATHS)]
+            seconds = min(args.segment_minutes * 60.0, total - offset)
+            if video is not None:
+                start = video.frame_index / video.fps
+                while True:
+                    ret, frame, t = video.read()
+                    if not ret or t - start >= seconds:
+                        break
+                    yield path, frame, offset + t - start
+            else:
+                source = SyntheticLandmarkSource(path, seconds=seconds, fps=args.fps, seed=args.seed + segment,
+                                                 absent_fraction=args.absent)
+                while True:
+                    ret, face, t = source.read()
+                    if not ret:
+                        break
+                    yield path, face, offset + t
+            offset += seconds
+            segment += 1
+    finally:
+        if video is not None:
+            video.release()
+
+
+def soak_sample(minute, path, frame_times, baseline=None):
+    sample = {
+        "minute": minute,
+        "path": path,
+        "rss": current_rss(),
+        "traced": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        "threads": threading.active_count(),
+        "p50": float(np.percentile(frame_times, 50)),
+        "p95": float(np.percentile(frame_times, 95)),
+    }
+    line = (f"{minute:7.0f} min  {path:<12} rss {(sample['rss'] or 0) / 2**20:7.1f} MB  threads {sample['threads']:>3}  "
+            f"frame p50 {sample['p50'] * 1000:6.3f} ms  p95 {sample['p95'] * 1000:6.3f} ms")
+    if sample["traced"] is not None:
+        line += f"  traced {sample['traced'] / 2**20:7.2f} MB"
+    if baseline is not None and sample["traced"] is not None:
+        line += f" ({(sample['traced'] - baseline['traced']) / 2**20:+.2f})"
+    print(line)
+    return sample
+
+
+def cmd_soak(args):
+    """
+    Hours of simulated use through one engine, as the main loop runs it: the input thread
+    (on a Null backend), speech stub, word prediction, threshold calibration, the window
+    schedule and window lifecycle, optionally the session log. Growth is measured from
+    the first sample after the warm-up (by default one pass through every path), so
+    start-up allocations and caches filling on first use (keyboard views, key tiles)
+    don't count.
+    """
+    if args.no_tracemalloc:
+        print("tracemalloc off: RSS, threads and frame time only")
+    else:
+        tracemalloc.start(args.traceback)
+    face_mesh = None
+    if args.video:
+        probe = VideoFileSource(args.video)
+        size = (probe.width, probe.height)
+        args.fps = probe.fps
+        probe.release()
+        face_mesh = eye_detector.create_face_mesh(*size)
+    else:
+        size = (eye_detector.CAM_W, eye_detector.CAM_H)
+    recorder = eye_detector.create_recorder(args.session_log) if args.session_log else None
+    calibrator = eye_detector.create_calibrator()
+    predictor = load_predictor(eye_detector.PREDICTION_TRIE, eye_detector.PREDICTION_WORD_LIST)
+    os_input = InputWorker(NullInput(), dead_zone=eye_detector.INPUT_DEAD_ZONE,
+                           refresh_hz=eye_detector.INPUT_REFRESH_HZ).start()
+    engine = DetectorEngine(face_mesh, speaker=NullSpeaker(), os_input=os_input, camera_size=size,
+                            predictor=predictor, calibrator=calibrator, recorder=recorder)
+    schedule = WindowSchedule(eye_detector.DISPLAY_RATES)
+    display = HeadlessDisplay()
+    blank = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+    window = int(args.sample_minutes * 60 * args.fps)
+    frame_times = np.empty(window, dtype=np.float64)
+    warm_up = args.warm_up_minutes if args.warm_up_minutes is not None else args.segment_minutes * len(PATHS)
+    samples, baseline, snapshot = [], None, None
+    n = 0
+    print(f"{args.hours:g} h simulated at {args.fps:.0f} fps, {args.segment_minutes:g} min per path "
+          f"({' > '.join(PATHS)}), sample every {args.sample_minutes:g} min")
+    started = time.time()
+    try:
+        for path, item, t in soak_frames(args):
+            if engine.selected_mode != ("CURSOR" if path == "FLOATING_KB" else path):
+                # The user went back to the menu and picked the next mode
+                engine.selected_mode = "CURSOR" if path == "FLOATING_KB" else path
+            engine.floating_kb_active = path == "FLOATING_KB"
+            start = time.perf_counter()
+            if face_mesh is not None:
+                frame = engine.process_frame(item, t)
+            else:
+                engine.update(item, t)
+                frame = blank.copy()
+            display.submit(render_due(engine, frame, schedule, t), engine.window_names())
+            frame_times[n % window] = time.perf_counter() - start
+            n += 1
+            if n % window == 0:
+                sample = soak_sample(n / args.fps / 60.0, path, frame_times, baseline)
+                if sample["minute"] < warm_up - 1e-6:
+                    continue
+                samples.append(sample)
+                if baseline is None:
+                    baseline = sample
+                    if tracemalloc.is_tracing():
+                        snapshot = tracemalloc.take_snapshot()
+    finally:
+        os_input.close()
+        if recorder is not None:
+            recorder.close()
+        if face_mesh is not None:
+            face_mesh.close()
+    elapsed = time.time() - started
+    print(f"{n} frames in {elapsed:.0f}s ({n / max(elapsed, 1e-9):.0f} fps)  typed={len(engine.typed_text)} "
+          f"taps={os_input.backend.taps} clicks={os_input.backend.clicks} speech={engine.speaker.spoken}  "
+          f"windows created={display.created} destroyed={display.destroyed} open={len(display.open)}")
+    if len(samples) < 2:
+        raise SystemExit("soak too short: needs two sample windows after the warm-up "
+                         "(--hours / --warm-up-minutes / --sample-minutes)")
+
+    last = samples[-1]
+    # Frame cost depends on the mode: each path's last window against its first after the warm-up
+    first_p95, last_p95 = {}, {}
+    for sample in samples:
+        first_p95.setdefault(sample["path"], sample["p95"])
+        last_p95[sample["path"]] = sample["p95"]
+    growth = {"rss": (last["rss"] - baseline["rss"]) / 2**20 if last["rss"] is not None else None,
+              "traced": (last["traced"] - baseline["traced"]) / 2**20 if last["traced"] is not None else None,
+              "threads": last["threads"] - baseline["threads"],
+              "drift": max(last_p95[path] / first_p95[path] for path in last_p95)}
+    print(f"growth since minute {baseline['minute']:.0f}: "
+          + (f"rss {growth['rss']:+.1f} MB  " if growth["rss"] is not None else "")
+          + (f"traced {growth['traced']:+.2f} MB  " if growth["traced"] is not None else "")
+          + f"threads {growth['threads']:+d}  frame p95 x{growth['drift']:.2f}")
+
+    failed = []
+    for name, budget, unit in (("rss", args.max_rss_growth, " MB"), ("traced", args.max_traced_growth, " MB"),
+                               ("threads", args.max_thread_growth, ""), ("drift", args.max_drift, "x")):
+        if budget is not None and growth[name] is not None and growth[name] > budget:
+            failed.append(f"{name} grew {growth[name]:.2f}{unit} (budget {budget}{unit})")
+    if snapshot is not None and (failed or args.top):
+        print("top allocators since the baseline:")
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[:args.top or 10]:
+            print(f"  {stat}")
+    if failed:
+        print(f"REGRESSION: {'; '.join(failed)}")
+        raise SystemExit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pipeline", help="per-frame throughput and latency percentiles per path")
+    p.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS)
+    p.add_argument("--seconds", type=float, default=120.0, help="simulated seconds per path")
+    p.add_argument("--fps", type=float, default=30.0, help="simulated camera rate")
+    p.add_argument("--render", action="store_true", help="include overlay/keyboard rendering")
+    p.add_argument("--preview-fps", type=float, default=None,
+                   help="with --render: redraw the camera preview at this rate, as the app does")
+    p.add_argument("--no-preview", action="store_true", help="with --render: keyboards only")
+    p.add_argument("--video", help="replay a recorded video through FaceMesh instead of synthetic landmarks")
+    p.add_argument("--max-frames", type=int, default=None)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--session-log", help="also record a session log per path (PREFIX.keyboard, ...)")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("gestures", help="gesture recognizer replay throughput")
+    p.add_argument("--hours", type=float, default=1.0, help="hours of synthetic eye ratios")
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_gestures)
+
+    p = sub.add_parser("idle", help="idle-mode frame/FaceMesh savings and wake-up latency")
+    p.add_argument("--detector", choices=["motion", "cascade"], default=eye_detector.IDLE_DETECTOR)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--inference-ms", type=float, default=12.0, help="simulated FaceMesh cost")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_idle)
+
+    p = sub.add_parser("pointing", help="Fitts'-law pointing benchmark: nose vs gaze cursor (simulated user)")
+    p.add_argument("--methods", nargs="+", choices=["nose", "gaze"], default=["nose", "gaze"])
+    p.add_argument("--distances", nargs="+", type=float, default=[0.15, 0.3, 0.6], help="screen widths")
+    p.add_argument("--widths", nargs="+", type=float, default=[0.025, 0.05, 0.1], help="target diameters, screen widths")
+    p.add_argument("--reps", type=int, default=10)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_pointing)
+
+    p = sub.add_parser("startup", help="time to first frame / first landmarks, old sequential vs parallel startup")
+    p.add_argument("--runs", type=int, default=5, help="fresh processes per mode")
+    p.add_argument("--camera-delay", type=float, default=0.5, help="simulated camera open time, seconds")
+    p.add_argument("--video", help="face video to serve as the camera (first landmarks; default black frames)")
+    p.add_argument("--max-first-frame", type=float, default=None, help="budget for the parallel p50; exit 1 if over")
+    p.add_argument("--max-first-landmarks", type=float, default=None,
+                   help="budget for the parallel p50 (first inference without --video); exit 1 if over")
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--child", choices=["sequential", "parallel"], help=argparse.SUPPRESS)
+    p.add_argument("--launched", type=float, default=None, help=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser("streams", help="aggregate fps and per-stream p95 latency, streams x pool workers")
+    p.add_argument("--streams", nargs="+", type=int, default=[1, 2, 4])
+    p.add_argument("--workers", nargs="+", type=int, default=[1, 2])
+    p.add_argument("--seconds", type=float, default=5.0, help="per streams x workers combination")
+    p.add_argument("--fps", type=float, default=30.0, help="camera rate per stream (blank-frame sources)")
+    p.add_argument("--latency-limit", type=float, default=eye_detector.SERVING_LATENCY_LIMIT)
+    p.add_argument("--video", help="face video played in real time by every stream (default blank frames)")
+    p.set_defaults(func=cmd_streams)
+
+    p = sub.add_parser("service", help="landmark service: publish cost, client fps/latency, slow-client drops")
+    p.add_argument("--subscribers", nargs="+", type=int, default=[1, 4, 16])
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--full-mesh", action="store_true")
+    p.add_argument("--slow-clients", type=int, default=1, help="how many subscribers read slowly")
+    p.add_argument("--slow", type=float, default=0.5, help="seconds a slow subscriber sleeps per batch")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--consumer", help=argparse.SUPPRESS)
+    p.set_defaults(func=cmd_service)
+
+    p = sub.add_parser("text", help="per-keystroke cost against document size (gap buffer vs old str)")
+    p.add_argument("--chars", nargs="+", type=int, default=[100, 1000, 10000, 100000])
+    p.add_argument("--keys", type=int, default=300, help="keystrokes timed per size")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_text)
+
+    p = sub.add_parser("soak", help="hours of simulated use: RSS, heap, thread and frame-time growth budgets")
+    p.add_argument("--hours", type=float, default=1.0, help="simulated hours")
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--segment-minutes", type=float, default=10.0, help="simulated minutes per path before switching")
+    p.add_argument("--sample-minutes", type=float, default=5.0,
+                   help="simulated minutes per sample window (best a divisor of --segment-minutes)")
+    p.add_argument("--warm-up-minutes", type=float, default=None,
+                   help="growth is measured from here (default: one segment per path)")
+    p.add_argument("--absent", type=float, default=0.02, help="fraction of frames without a face")
+    p.add_argument("--video", help="loop a recorded video through FaceMesh instead of synthetic landmarks")
+    p.add_argument("--session-log", help="also record a session log to this path")
+    p.add_argument("--max-rss-growth", type=float, default=eye_detector.SOAK_MAX_RSS_GROWTH, help="MB")
+    p.add_argument("--max-traced-growth", type=float, default=eye_detector.SOAK_MAX_TRACED_GROWTH,
+                   help="MB of Python heap (tracemalloc)")
+    p.add_argument("--max-thread-growth", type=int, default=0)
+    p.add_argument("--max-drift", type=float, default=eye_detector.SOAK_MAX_DRIFT,
+                   help="frame-time p95, each path's last sample window over its first")
+    p.add_argument("--top", type=int, default=0, help="always list this many top allocators (default: on failure)")
+    p.add_argument("--traceback", type=int, default=1, help="tracemalloc frames per allocation")
+    p.add_argument("--no-tracemalloc", action="store_true", help="faster; RSS, threads and frame time only")
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_soak)
+
+    p = sub.add_parser("calibration", help="miss/false-trigger rates, fixed vs auto-calibrated thresholds")
+    p.add_argument("--users", nargs="+", choices=list(USERS), default=list(USERS))
+    p.add_argument("--minutes", type=float, default=10.0)
+    p.add_argument("--fps", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_calibration)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Online per-user threshold calibration.
+
+The fixed CLICK_RATIO / SCROLL_RATIO / MOVE_THRESHOLD suit one face. Here they follow
+the user instead: P² streaming quantiles (Jain & Chlamtac) track, in constant memory,
+
+- the open-eye ratio level and spread (median and 16th percentile of all frames: blinks
+  only ever push ratios up, so the lower half is clean and median + 3 x (median - p16)
+  stands in for the open-eye tail),
+- the low tail of the peak ratio of each deliberate-looking closure (weak blinks),
+- the median frame-to-frame nose step during keyboard navigation (landmark jitter).
+
+P² alone weighs every sample since the start the same, so after a few saved sessions a
+new one would barely move it. Each estimator therefore has a horizon: when its count
+reaches it, the marker positions are scaled down to half (the estimate stays where it
+is), and new samples move it as much as after horizon/2 samples. Older behaviour fades
+out geometrically. A restored profile starts at a quarter of the horizon, so the current
+session takes over within minutes.
+
+Every few seconds the blink threshold is moved part of the way toward a point between
+the open tail and the weak-blink tail, and the move threshold toward a multiple of the
+jitter, both clamped to safe bounds. All ratio thresholds scale together, so winks and
+long closes keep their configured relation to blinks.
+
+State (quantile markers and current thresholds) is saved per user as a small JSON profile.
+Without ground truth the live rates are proxies: a miss is a closure that peaked just
+under the threshold (the user tried and it didn't register), a false trigger is a
+selection undone with Delete right away. benchmark.py calibration measures the real
+rates on labelled synthetic users.
+"""
+import json
+import os
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile p from five markers; add() is O(1). horizon: None = never forget."""
+
+    def __init__(self, p, horizon=None):
+        self.p = p
+        self.horizon = horizon
+        self.reset()
+
+    def reset(self):
+        p = self.p
+        self.count = 0
+        self.q = [0.0] * 5                              # marker heights
+        self.n = [0, 1, 2, 3, 4]                        # marker positions
+        self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        q, n = self.q, self.n
+        if self.count < 5:
+            q[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                q.sort()
+            return
+        self.count += 1
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired, step = self.desired, self._step
+        for i in range(5):
+            desired[i] += step[i]
+
+        # Nudge the middle markers toward their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])  # Linear fallback
+                q[i] = height
+                n[i] += d
+
+        if self.horizon is not None and self.count >= self.horizon:
+            self.shrink(self.horizon // 2)
+
+    def shrink(self, count):
+        """Scales the markers down to `count` samples: same estimate, but new samples weigh more."""
+        if count < 5 or self.count <= count:
+            return
+        f = (count - 1) / (self.count - 1)
+        n = self.n
+        n[4] = count - 1
+        for i in (1, 2, 3):
+            n[i] = min(max(round(n[i] * f), n[i - 1] + 1), n[4] - (4 - i))
+        self.desired = [d * f for d in self.desired]
+        self.count = count
+
+    def value(self):
+        """Current estimate; None before any sample."""
+        if self.count >= 5:
+            return self.q[2]
+        if self.count == 0:
+            return None
+        first = sorted(self.q[:self.count])
+        return first[min(int(self.p * self.count), self.count - 1)]
+
+    def state(self):
+        return {"p": self.p, "count": self.count, "q": self.q, "n": self.n, "desired": self.desired}
+
+    @classmethod
+    def from_state(cls, state, horizon=None):
+        est = cls(state["p"], horizon)
+        est.count = state["count"]
+        est.q = list(state["q"])
+        est.n = list(state["n"])
+        est.desired = list(state["desired"])
+        return est
+
+
+class ThresholdCalibrator:
+    """
+    Feed observe_eyes() every frame, observe_nose() while navigating and selection() per
+    typed key; retune() (called by observe_eyes every retune_every frames) returns True
+    when click_ratio / move_threshold changed.
+    """
+
+    def __init__(self, click_ratio=4.0, scroll_ratio=4.5, move_threshold=0.003,
+                 ratio_bounds=(3.3, 5.5), move_bounds=(0.0015, 0.006), margin=0.4,
+                 jitter_margin=6.0, rate=0.25, near_miss=0.85, blink_durations=(0.1, 1.5),
+                 min_closures=8, min_frames=300, retune_every=90, undo_window=2.0,
+                 frame_memory=9000, closure_memory=120):
+        self.base_click_ratio = click_ratio
+        self.scroll_factor = scroll_ratio / click_ratio
+        self.click_ratio = click_ratio
+        self.move_threshold = move_threshold
+        self.ratio_bounds = ratio_bounds
+        self.move_bounds = move_bounds
+        self.margin = margin                  # 0 = right above open eyes, 1 = at the weak-blink level
+        self.jitter_margin = jitter_margin    # move threshold = this x median nose step
+        self.rate = rate                      # fraction of the way to the target per retune
+        self.near_miss = near_miss            # closures peaking above near_miss x threshold are tracked
+        self.blink_durations = blink_durations
+        self.min_closures = min_closures
+        self.min_frames = min_frames
+        self.retune_every = retune_every
+        self.undo_window = undo_window
+
+        # Horizons (module docstring): frames (two ratios each) and closures
+        self.open_ratio = P2Quantile(0.5, 2 * frame_memory)
+        self.open_low = P2Quantile(0.16, 2 * frame_memory)
+        self.closed_peak = P2Quantile(0.25, closure_memory)
+        self.jitter = P2Quantile(0.5, frame_memory)
+
+        self._close_start = None
+        self._close_peak = 0.0
+        self._open_hi = 0.0      # closures must rise above the open-eye tail too
+        self._nose_x = None
+        self._nose_y = 0.0
+        self._frames = 0
+        self._last_selection = -1e9
+        self.first_time = None
+        self.last_time = None
+
+        # Counters
+        self.triggers = 0        # closures that crossed the threshold
+        self.near_misses = 0     # closures that peaked just under it
+        self.selections = 0
+        self.false_triggers = 0
+        self.retunes = 0
+
+    @property
+    def scale(self):
+        """Factor for the configured ratio thresholds (GestureRecognizer.scale_thresholds)."""
+        return self.click_ratio / self.base_click_ratio
+
+    @property
+    def scroll_ratio(self):
+        return self.click_ratio * self.scroll_factor
+
+    # --- Observations ---
+
+    def observe_eyes(self, left, right, t):
+        if self.first_time is None:
+            self.first_time = t
+        self.last_time = t
+        candidate = max(self.near_miss * self.click_ratio, self._open_hi)
+        level = min(left, right)  # Both eyes must close for a blink
+        if level > candidate:
+            if self._close_start is None:
+                self._close_start = t
+                self._close_peak = level
+            elif level > self._close_peak:
+                self._close_peak = level
+        else:
+            if self._close_start is not None:
+                duration = t - self._close_start
+                if self.blink_durations[0] <= duration <= self.blink_durations[1]:
+                    self.closed_peak.add(self._close_peak)
+                    if self._close_peak > self.click_ratio:
+                        self.triggers += 1
+                    else:
+                        self.near_misses += 1
+                self._close_start = None
+        self.open_ratio.add(left)
+        self.open_ratio.add(right)
+        self.open_low.add(left)
+        self.open_low.add(right)
+
+        self._frames += 1
+        if self._frames % self.retune_every == 0:
+            return self.retune()
+        return False
+
+    def observe_nose(self, x, y):
+        if self._nose_x is not None:
+            self.jitter.add(abs(x - self._nose_x) + abs(y - self._nose_y))
+        self._nose_x, self._nose_y = x, y
+
+    def nose_reset(self):
+        """Call when navigation stops, so the next step isn't measured across the gap."""
+        self._nose_x = None
+
+    def selection(self, key, t):
+        """A typed key; Delete shortly after another selection counts as undoing a false trigger."""
+        if key == "Delete" and t - self._last_selection <= self.undo_window:
+            self.false_triggers += 1
+            self.selections = max(self.selections - 1, 0)
+            self._last_selection = -1e9
+        else:
+            self.selections += 1
+            self._last_selection = t
+
+    # --- Adaptation ---
+
+    def retune(self):
+        changed = False
+        open_mid = self.open_ratio.value()
+        open_hi = open_mid + 3 * (open_mid - self.open_low.value()) if open_mid is not None else None
+        if self.open_ratio.count >= self.min_frames:
+            self._open_hi = min(open_hi, self.click_ratio)
+        closed_lo = self.closed_peak.value()
+        if (self.closed_peak.count >= self.min_closures and self.open_ratio.count >= self.min_frames
+                and closed_lo > open_hi):
+            target = open_hi + self.margin * (closed_lo - open_hi)
+            target = min(max(target, self.ratio_bounds[0]), self.ratio_bounds[1])
+            new = self.click_ratio + self.rate * (target - self.click_ratio)
+            changed |= abs(new - self.click_ratio) > 1e-4
+            self.click_ratio = new
+
+        if self.jitter.count >= self.min_frames:
+            target = self.jitter_margin * self.jitter.value()
+            target = min(max(target, self.move_bounds[0]), self.move_bounds[1])
+            new = self.move_threshold + self.rate * (target - self.move_threshold)
+            changed |= abs(new - self.move_threshold) > 1e-6
+            self.move_threshold = new
+
+        self.retunes += changed
+        return changed
+
+    # --- Reporting ---
+
+    def report(self):
+        minutes = (self.last_time - self.first_time) / 60.0 if self.first_time is not None else 0.0
+        attempts = self.triggers + self.near_misses
+        return {
+            "click_ratio": round(self.click_ratio, 3),
+            "scroll_ratio": round(self.scroll_ratio, 3),
+            "move_threshold": round(self.move_threshold, 5),
+            "miss_rate": round(self.near_misses / attempts, 3) if attempts else 0.0,
+            "false_trigger_rate": round(self.false_triggers / max(self.selections + self.false_triggers, 1), 3),
+            "selections_per_minute": round(self.selections / minutes, 2) if minutes > 0 else 0.0,
+        }
+
+    # --- Profiles ---
+
+    def save(self, path):
+        state = {
+            "click_ratio": self.click_ratio,
+            "move_threshold": self.move_threshold,
+            "open_ratio": self.open_ratio.state(),
+            "open_low": self.open_low.state(),
+            "closed_peak": self.closed_peak.state(),
+            "jitter": self.jitter.state(),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restores a saved profile; returns False (keeping the defaults) if there is none."""
+        if not os.path.exists(path):
+            return False
+        with open(path) as f:
+            state = json.load(f)
+        self.click_ratio = min(max(state["click_ratio"], self.ratio_bounds[0]), self.ratio_bounds[1])
+        self.move_threshold = min(max(state["move_threshold"], self.move_bounds[0]), self.move_bounds[1])
+        for name in ("open_ratio", "open_low", "closed_peak", "jitter"):
+            horizon = getattr(self, name).horizon
+            est = P2Quantile.from_state(state[name], horizon)
+            if horizon is not None:
+                est.shrink(horizon // 4)  # Earlier sessions count, but this one takes over soon
+            setattr(self, name, est)
+        return True
+
+
+def profile_path(directory, name):
+    return os.path.join(os.path.expanduser(directory), f"{name}.json")
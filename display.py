@@ -0,0 +1,171 @@
+"""
+OpenCV window output, decoupled from detection.
+
+WindowSchedule decides which windows need a fresh image at time t, each at its own rate
+(the camera preview at ~15 fps is plenty; the keyboard follows every selection change),
+so the engine only renders what will actually be shown.
+
+Display owns the windows: each is created once when it first becomes active, updated
+with the latest image, and destroyed once it stops being active, instead of the
+destroy-everything-not-drawn-this-frame dance. With threaded=True a GUI thread does the
+imshow/waitKey calls, so slow window updates never delay inference; key presses come
+back through poll_key(). (macOS needs HighGUI on the main thread, so there the same
+work runs inline, still throttled.)
+"""
+import collections
+import threading
+import time
+
+import cv2
+
+NO_KEY = 255  # cv2.waitKey(1) & 0xFF when nothing was pressed
+
+
+class WindowSchedule:
+    """Per-window refresh rates; windows without a rate are refreshed every frame."""
+
+    def __init__(self, rates=None):
+        self.rates = dict(rates or {})
+        self._last = {}
+
+    def due(self, names, t):
+        """Subset of names whose image should be redrawn at time t (marks them as drawn)."""
+        due = set()
+        for name in names:
+            rate = self.rates.get(name)
+            last = self._last.get(name)
+            if rate is None or last is None or t - last >= 1.0 / rate or t < last:
+                self._last[name] = t
+                due.add(name)
+        for name in list(self._last):
+            if name not in names:
+                del self._last[name]  # Redraw at once when it comes back
+        return due
+
+
+class Display:
+    """Shows window images; submit() never blocks on the GUI when threaded."""
+
+    def __init__(self, screen_size, threaded=True, metrics=None, topmost=("Floating Keyboard",),
+                 fullscreen=("Gaze Calibration",)):
+        self.screen_size = screen_size
+        self.threaded = threaded
+        self.metrics = metrics
+        self.topmost = set(topmost)
+        self.fullscreen = set(fullscreen)
+        self.open = set()
+        self.first_shown = None   # time.time() of the first imshow (startup time-to-first-frame)
+        self._pending = {}
+        self._active = None
+        self._keys = collections.deque(maxlen=32)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+        # Counters
+        self.shown = 0
+        self.replaced = 0     # images superseded before the GUI thread got to them
+        self.created = 0
+        self.destroyed = 0
+
+    def start(self):
+        if self.threaded:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="display", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, windows, active):
+        """windows: {name: image} redrawn this frame; active: every name that should stay open."""
+        with self._lock:
+            for name, img in windows.items():
+                if name in self._pending:
+                    self.replaced += 1
+                # The keyboard views reuse their image buffer, so hand over a copy
+                self._pending[name] = img if name in ("Camera", "Mode Selection", "Gaze Calibration") else img.copy()
+            self._active = set(active)
+        if self.threaded:
+            self._wake.set()
+        else:
+            self._tick()
+
+    def poll_key(self):
+        """Oldest unread key press, NO_KEY if none."""
+        try:
+            return self._keys.popleft()
+        except IndexError:
+            return NO_KEY
+
+    def close(self):
+        if self._thread is not None:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout=1.0)
+        for name in list(self.open):
+            self._destroy(name)
+
+    # --- GUI side ---
+
+    def _run(self):
+        while self._running:
+            self._tick()
+            # waitKey above pumps events every few ms; new images wake us sooner
+            self._wake.wait(0.005)
+            self._wake.clear()
+        cv2.waitKey(1)
+
+    def _tick(self):
+        start = time.perf_counter()
+        shown = self._apply()
+        key = cv2.waitKey(1) & 0xFF
+        if key != NO_KEY:
+            self._keys.append(key)
+        if self.metrics is not None and (shown or not self.threaded):
+            self.metrics.observe("imshow_waitkey", time.perf_counter() - start)
+
+    def _apply(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            active = self._active
+        if active is None:
+            return 0
+        for name in list(self.open):
+            if name not in active:
+                self._destroy(name)
+        for name, img in pending.items():
+            if name not in active:
+                continue
+            if name not in self.open:
+                self._create(name, img)
+            cv2.imshow(name, img)
+            self.shown += 1
+            if self.first_shown is None:
+                self.first_shown = time.time()
+        return len(pending)
+
+    def _create(self, name, img):
+        if name in self.fullscreen:
+            # Screen-sized window scaling whatever image it gets (the gaze dots must land on screen coordinates)
+            cv2.namedWindow(name, cv2.WINDOW_NORMAL)
+            cv2.setWindowProperty(name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        else:
+            cv2.namedWindow(name, cv2.WINDOW_AUTOSIZE)
+        self.open.add(name)
+        self.created += 1
+        if name in self.topmost:
+            # FIX: Window position aur always-on-top set kiya (once, when the window appears)
+            try:
+                h, w = img.shape[:2]
+                cv2.setWindowProperty(name, cv2.WND_PROP_TOPMOST, 1)
+                cv2.moveWindow(name, self.screen_size[0] - w - 10, self.screen_size[1] - h - 10)
+            except cv2.error:
+                pass
+
+    def _destroy(self, name):
+        try:
+            cv2.destroyWindow(name)
+        except cv2.error:
+            pass  # Already closed by the user
+        self.open.discard(name)
+        self.destroyed += 1
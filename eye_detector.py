@@ -1,616 +1,1197 @@
+import time
+STARTED = time.time()  # Startup milestones are measured from here (before the heavy imports)
+
 import cv2
-import mediapipe as mp # type: ignore
+import math
+import os
+import sys
 import numpy as np
-import time
 import warnings
-import pyttsx3 
-import screeninfo 
-from pynput.mouse import Controller, Button 
-from pynput.keyboard import Controller as K_Controller, Key 
-import threading 
+from frame_capture import CameraCapture
+from inference_worker import FaceMeshWorker
+from keyboard_view import FLOATING_STYLE, KEYBOARD_STYLE, MAX_TEXT_CHARS, KeyboardView
+from landmarks import FEATURE_POINTS, LEFT_EYE, LEFT_IRIS, NOSE_TIP, RIGHT_EYE, RIGHT_IRIS, LandmarkAccessor
+from metrics import Metrics, MetricsExporter
+from filters import create_filter
+from flow_tracker import FlowFaceMesh
+from gestures import Channel, Gesture, GestureRecognizer
+from calibration import ThresholdCalibrator, profile_path
+from gaze import GazeCalibration, GazeFeatures, GazeModel
+from roi_tracker import RoiFaceMesh
+from power import IdleFaceMesh, PresenceDetector
+from os_input import NullInput
+from speech import NullSpeaker
+from startup import StartupTimer, Task, warm_up
+from text_buffer import TextBuffer, TextJournal
 
 warnings.filterwarnings("ignore")
 
-# --- INITIAL SETUP ---
-mouse = Controller() 
-keyboard_os = K_Controller() 
-
-tts_engine = pyttsx3.init()
-tts_engine.setProperty('rate', 180) 
-
-# Mediapipe setup 
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
+# Mediapipe setup
+FACE_MESH_OPTIONS = dict(
     max_num_faces=1,
     refine_landmarks=True,
     min_detection_confidence=0.7,
     min_tracking_confidence=0.7
 )
-
-# Eye & nose landmarks 
-LEFT_EYE = [33, 160, 158, 133, 153, 144]
-RIGHT_EYE = [362, 385, 387, 263, 373, 380]
-NOSE_TIP = 1 
+# Run FaceMesh in a separate process (shared-memory frames) so it doesn't share the GIL with UI/TTS/pynput
+USE_INFERENCE_PROCESS = True
+# Pipelined: frame N+1 is inferred while frame N is acted on (results are one frame behind)
+INFERENCE_PIPELINED = True
+# ROI tracking: after the first detection only a padded face crop (resized to ROI_INPUT_SIZE) is sent to FaceMesh
+USE_ROI_TRACKING = True
+ROI_INPUT_SIZE = 192          # Starting size; steps between 128 and 256 with measured inference time
+ROI_INFERENCE_BUDGET = 0.012  # Seconds per inference to aim for
+# Run FaceMesh every Nth frame and track eyes + nose with optical flow in between (1 = every frame)
+FLOW_KEYFRAME_INTERVAL = 3
+FLOW_MAX_ERROR = 12.0         # LK error above which FaceMesh is re-run immediately
+FLOW_BLINK_MARGIN = 0.9       # FaceMesh takes over past this share of the (calibrated) click ratio
 
 # Keyboard layout (CLOSE_KB se keyboard band hoga)
 keyboard = [
     list("QWERTYUIOP"),
     list("ASDFGHJKL"),
     list("ZXCVBNM"),
-    ["Space", "Delete", "Shift", "Enter", "CLOSE_KB"] 
+    ["Space", "Delete", "Shift", "Enter", "CLOSE_KB"]
 ]
 rows = len(keyboard)
+# Alternative layout from `python layouts.py optimize` (JSON); None = the grid above
+KEYBOARD_LAYOUT_FILE = None
 
-# --- GLOBAL VARIABLES ---
-selected_mode = None 
-selected_row = 0
-selected_col = 0
-typed_text = ""
-shift_on = False
-blink_detected = False
+# Word prediction: top-k completions of the current word as an extra key row
+ENABLE_PREDICTION = True
+PREDICTION_SLOTS = 4
+WORD_KEYS = [f"WORD{i + 1}" for i in range(PREDICTION_SLOTS)]
+PREDICTION_WORD_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "words.txt")
+# Compiled from the word list on first use: per user, as the script's directory may be read-only
+PREDICTION_TRIE = os.path.join(os.path.expanduser("~"), ".cache", "eye_detector", "words.trie")
 
 # Movement, Scroll & Blink thresholds (Aapki final tuning)
-MOVE_THRESHOLD = 0.003   
-SCROLL_RATIO = 4.5      
-CLICK_RATIO = 4.0       
-SCROLL_AMOUNT = 2       
-MAX_EYE_CLOSE_TIME = 10.0   
-KEYBOARD_TRIGGER_TIME = 5.0 
-BLINK_CLICK_DELAY = 0.5 
-FLOATING_KB_ACTIVE = False 
-
-# Additional variables
-os_cursor_lock_pos = (0, 0) 
+MOVE_THRESHOLD = 0.003
+SCROLL_RATIO = 4.5
+CLICK_RATIO = 4.0
+SCROLL_AMOUNT = 2
+MAX_EYE_CLOSE_TIME = 10.0
+KEYBOARD_TRIGGER_TIME = 5.0
+BLINK_CLICK_DELAY = 0.5
 
 # Blink detection variables (Common to all modes)
-blink_state = "open"
-blink_start_time = 0
 min_blink_duration = 0.3
 max_blink_duration = 1.5
 
-# Cursor Mode variables
-both_eyes_closed_start_time = 0 
-last_blink_click_time = time.time() 
+# Gestures: channels say when eyes count as closed, the table says which closures fire events
+EYE_CHANNELS = [
+    Channel("both", left_above=CLICK_RATIO, right_above=CLICK_RATIO),        # blinks
+    Channel("closed", left_above=SCROLL_RATIO, right_above=SCROLL_RATIO),    # long close (floating KB)
+    Channel("left", left_above=SCROLL_RATIO, right_below=SCROLL_RATIO),      # left wink (scroll up)
+    Channel("right", right_above=SCROLL_RATIO, left_below=SCROLL_RATIO),     # right wink (scroll down)
+]
+GESTURE_TABLE = [
+    Gesture("blink", "both", min_duration=min_blink_duration, max_duration=max_blink_duration),  # select / type
+    Gesture("click", "both", min_duration=0.1, max_duration=0.5),          # cursor-mode click
+    Gesture("double_blink", "both", min_duration=0.05, max_duration=0.3, count=2, max_gap=0.5),
+    Gesture("wink_left", "left", min_duration=0.2, max_duration=max_blink_duration),
+    Gesture("wink_right", "right", min_duration=0.2, max_duration=max_blink_duration),
+    Gesture("sustained_close", "closed", trigger="hold", min_duration=KEYBOARD_TRIGGER_TIME),
+]
+DOUBLE_BLINK_KEY = None  # e.g. "Enter": a quick double blink presses this key while typing
+# KEYBOARD mode: a left / right wink presses these keys, e.g. ("Left", "Right") (or --wink-cursor) to move
+# the text cursor; None = winks do nothing (a squint or one-sided blink would jump the cursor mid-word).
+# Layouts may also have any of the TEXT_CURSOR_KEYS (arrow keys in the OS on the floating KB)
+KEYBOARD_WINK_KEYS = None
+TEXT_CURSOR_KEYS = ("Left", "Right", "Up", "Down", "Home", "End")
+
+# Calibration: blink/scroll ratios and MOVE_THRESHOLD follow this user's eyes and nose jitter,
+# within these bounds, and are saved per profile (--profile NAME)
+AUTO_CALIBRATE = True
+CALIBRATION_DIR = os.path.join(os.path.expanduser("~"), ".config", "eye_detector", "profiles")
+CALIBRATION_PROFILE = "default"  # None = start from the defaults every time, save nothing
+CLICK_RATIO_BOUNDS = (3.3, 5.5)
+MOVE_THRESHOLD_BOUNDS = (0.0015, 0.006)
+
+# Gaze cursor (--gaze): CURSOR mode follows the irises (plus head pose) instead of the nose tip.
+# The per-user mapping is fitted after a short follow-the-dot calibration, saved with the
+# profile; 'g' recalibrates
+GAZE_CURSOR = False
+GAZE_CALIBRATION_GRID = (4, 3)   # Dots: columns x rows
+GAZE_DEGREE = 2                  # Polynomial degree in the iris offsets (head pose terms are linear)
+GAZE_RIDGE = 1e-3                # Regularization: larger = smoother but less exact mapping
 
-# Keyboard Navigation Variables 
-last_move_time = time.time()
-move_delay = 0.2 
+# Session log: per-frame landmarks, ratios and decisions for debugging ghost clicks / slow typing
+SESSION_LOG = None        # e.g. "session.edlog" (or --session-log); read with session_log.py
+SESSION_LOG_BATCH = 256   # Records per disk write
+
+# Typed text journal: every edit in KEYBOARD mode is appended here (or --journal PATH) and the
+# text is restored on the next start, so a crash loses nothing; None = not kept
+TEXT_JOURNAL = os.path.join(os.path.expanduser("~"), ".config", "eye_detector", "typed_text.journal")
+JOURNAL_FSYNC_INTERVAL = 1.0   # Seconds; edits reach the file at once, the disk at least this often
+JOURNAL_FSYNC_BATCH = 32       # ...or after this many edits
+
+# Landmark service: per-frame points, eye ratios and gesture events for other local programs
+# on a UNIX socket (or --landmark-service PATH); read with landmark_service.py
+LANDMARK_SERVICE = None            # e.g. "/tmp/eye_detector.sock"
+LANDMARK_SERVICE_FULL_MESH = False # All 478 landmarks per frame instead of the 13 eye/nose points
+
+# Keyboard Navigation Variables
+move_delay = 0.2
 # NEW DELAY: Keyboard Mode Selection ko slow karne ke liye (0.4s)
 KB_NAVIGATION_DELAY = 0.4
-nose_history = []
-stable_nose_position = None
-stabilization_frames = 5 
-min_movement_frames = 1
-left_counter = right_counter = up_counter = down_counter = 0
+stabilization_frames = 5
+
+# Nose smoothing per mode: (filter, kwargs) from filters.FILTERS
+# (none, moving_average, exponential, one_euro, kalman; kalman's predict = seconds of lookahead)
+NOSE_FILTERS = {
+    "KEYBOARD": ("moving_average", dict(window=stabilization_frames)),
+    "FLOATING_KB": ("moving_average", dict(window=stabilization_frames)),
+    "CURSOR": ("kalman", dict(process_noise=0.02, measurement_noise=4e-6, predict=0.05)),
+    "GAZE": ("one_euro", dict(min_cutoff=0.1, beta=0.3)),  # Gaze point (normalized screen), --gaze
+}
+
+# Idle mode: after IDLE_AFTER seconds without a face FaceMesh stops and the camera is sampled
+# IDLE_FPS times a second by a cheap presence check until someone shows up
+ENABLE_IDLE = True
+IDLE_AFTER = 10.0
+IDLE_FPS = 4
+IDLE_DETECTOR = "motion"     # "motion" (frame difference) or "cascade" (Haar face detector)
+WAKE_LATENCY_LIMIT = 0.5     # Seconds from arrival to tracking; IDLE_FPS is raised when exceeded
+
+# Startup: the mode menu appears at once; the camera, FaceMesh (warmed up on a blank frame),
+# pynput and screen detection come up in parallel behind it
+WARM_UP_FACE_MESH = True
+STARTUP_TIMEOUT = 30.0    # Seconds to wait for the camera before giving up
+
+# Several stations on one box (python serving.py SOURCE ...): FaceMesh workers shared by all
+# streams, granted round-robin; frames older than the limit when their turn comes are dropped
+SERVING_WORKERS = 2
+SERVING_LATENCY_LIMIT = 0.15  # Seconds, capture to decisions, per stream
+
+# Long-session soak test (python benchmark.py soak): allowed growth from the first sample
+# window to the last before it fails
+SOAK_MAX_RSS_GROWTH = 20.0       # MB
+SOAK_MAX_TRACED_GROWTH = 2.0     # MB of Python heap
+SOAK_MAX_DRIFT = 1.5             # Frame-time p95, last window / first, per path
+
+# Camera resolution
+CAM_W, CAM_H = 640, 480
+# Camera I/O on its own thread: the loop always gets the newest frame, stale ones are dropped
+FRAME_LATE_AFTER = 0.1  # Seconds; frames older than this when processed count as late
+
+# Display: windows are updated by their own thread, each at most this often (None = every frame)
+SHOW_PREVIEW = True       # False (--no-preview): no camera window, only the keyboards
+DISPLAY_THREAD = True     # macOS always draws on the main thread (HighGUI requirement)
+DISPLAY_RATES = {"Camera": 15, "Mode Selection": 15, "Keyboard": None, "Floating Keyboard": None}
+
+# Metrics: per-stage latency overlay ('m' toggles it) and optional Prometheus export
+SHOW_METRICS_OVERLAY = False
+METRICS_FILE = None   # e.g. "eye_detector.prom"
+METRICS_PORT = None   # e.g. 9108 -> http://127.0.0.1:9108/metrics
+
+# OS input runs on its own thread: moves are coalesced, tiny ones dropped, and the
+# pointer glides between landmark updates at display rate
+INPUT_DEAD_ZONE = 2       # Pixels; smaller cursor moves are ignored
+INPUT_REFRESH_HZ = 60     # Pointer interpolation rate; None = jump straight to each target
+
+# Speech: one TTS thread; fixed phrases are pre-rendered once and replayed from memory
+SPEECH_RATE = 180
+SPEECH_QUEUE_SIZE = 8
+SPEECH_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "eye_detector", "tts")  # None = no cache
+SPEECH_PHRASES = [
+    "Keyboard Mode Selected", "Cursor Mode Selected", "Keyboard is on", "Keyboard Closed",
+    "Click", "Space", "Deleted", "Enter", "Shift On", "Shift Off", "Text cleared",
+    "Left", "Right", "Up", "Down", "Home", "End",
+    "Follow the dot", "Gaze calibrated",
+]
+SPEECH_VOCABULARY = SPEECH_PHRASES + [key for row in keyboard for key in row if len(key) == 1]
 
 # --- CORE FUNCTIONS ---
 
 def blink_ratio(landmarks, eye_points):
-    """Calculates the ratio of horizontal to vertical eye distance."""
-    coords = [(landmarks[p].x, landmarks[p].y) for p in eye_points]
-    horizontal = np.linalg.norm(np.array(coords[0]) - np.array(coords[3]))
-    vertical = (np.linalg.norm(np.array(coords[1]) - np.array(coords[5])) +
-                np.linalg.norm(np.array(coords[2]) - np.array(coords[4]))) / 2
+    """Calculates the ratio of horizontal to vertical eye distance (single eye; the engine uses LandmarkAccessor)."""
+    p = [landmarks[i] for i in eye_points]
+    horizontal = math.hypot(p[0].x - p[3].x, p[0].y - p[3].y)
+    vertical = (math.hypot(p[1].x - p[5].x, p[1].y - p[5].y) +
+                math.hypot(p[2].x - p[4].x, p[2].y - p[4].y)) / 2
     return horizontal / vertical if vertical != 0 else 0
 
-def speak_non_blocking(text):
-    """Speaks the text in a separate thread to prevent main loop from freezing."""
-    def run_speech(t):
+def create_inference_backend(width=CAM_W, height=CAM_H, warm=WARM_UP_FACE_MESH):
+    """The bare FaceMesh: worker process if possible, otherwise in-process; warmed up on a blank frame."""
+    face_mesh = None
+    if USE_INFERENCE_PROCESS:
         try:
-            tts_engine.say(t) 
-            tts_engine.runAndWait()
-        except:
-            pass 
-    
-    if text:
-        thread = threading.Thread(target=run_speech, args=(text,), daemon=True) 
-        thread.start()
-
-def handle_keyboard_input(key, shift_status):
+            face_mesh = FaceMeshWorker(width, height, pipelined=INFERENCE_PIPELINED, **FACE_MESH_OPTIONS).start()
+        except Exception as e:
+            print(f"Inference worker unavailable ({e}), running FaceMesh in-process")
+    if face_mesh is None:
+        import mediapipe as mp # type: ignore
+        face_mesh = mp.solutions.face_mesh.FaceMesh(**FACE_MESH_OPTIONS)
+    if warm:
+        warm_up(face_mesh, width, height)
+    return face_mesh
+
+def create_face_mesh(width=CAM_W, height=CAM_H, capture=None, metrics=None, track_iris=False, backend=None):
     """
-    Takes the selected key and types it into the OS using pynput.
-    Returns: (updated_shift_status, text_to-speak)
+    Builds the FaceMesh pipeline: the backend, ROI-tracked and flow-tracked if enabled.
+    capture: CameraCapture whose frame rate idle mode lowers (None = no idle mode).
+    track_iris: optical flow also follows the iris centres (gaze cursor) between keyframes.
+    backend: from create_inference_backend() (e.g. started in the background); None = start one now.
+    The pipeline owns backend once this returns; if it raises, backend is still the caller's to close.
     """
-    text_to_speak = ""
-    updated_shift_status = shift_status
-    
-    if key == "Space":
-        keyboard_os.tap(Key.space)
-        text_to_speak = "Space"
-    elif key == "Delete":
-        keyboard_os.tap(Key.backspace)
-        text_to_speak = "Deleted"
-    elif key == "Shift":
-        updated_shift_status = not shift_status
-        text_to_speak = "Shift On" if updated_shift_status else "Shift Off"
-    elif key == "Enter":
-        keyboard_os.tap(Key.enter)
-        text_to_speak = "Enter"
-    elif key == "CLOSE_KB": 
-        global FLOATING_KB_ACTIVE
-        FLOATING_KB_ACTIVE = False
-        text_to_speak = "Keyboard Closed"
-    else:
-        char = key if shift_status else key.lower()
-        keyboard_os.tap(char)
-        text_to_speak = char
-    
-    return updated_shift_status, text_to_speak
-
-
-# --- CAMERA & SCREEN SETUP ---
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open camera")
-    exit()
-
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-CAM_W = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-CAM_H = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-try:
-    screen = screeninfo.get_monitors()[0]
-    SCREEN_W, SCREEN_H = screen.width, screen.height
-except Exception:
-    SCREEN_W, SCREEN_H = 1920, 1080 
+    replaced = None
+    if backend is not None and hasattr(backend, "shape") and (backend.shape[0] < height or backend.shape[1] < width):
+        # Started for CAM_W x CAM_H but the camera opened larger (closed once the new pipeline stands)
+        replaced, backend = backend, None
+    base = backend if backend is not None else create_inference_backend(width, height)
+    try:
+        face_mesh = base
+        if USE_ROI_TRACKING:
+            face_mesh = RoiFaceMesh(face_mesh, (width, height), input_size=ROI_INPUT_SIZE,
+                                    inference_budget=ROI_INFERENCE_BUDGET)
+        if FLOW_KEYFRAME_INTERVAL > 1:
+            # Blink check slightly below CLICK_RATIO so FaceMesh takes over before a blink registers
+            # (DetectorEngine.apply_calibration() moves it with the calibrated ratio)
+            points = FEATURE_POINTS + [LEFT_IRIS, RIGHT_IRIS] if track_iris else FEATURE_POINTS
+            face_mesh = FlowFaceMesh(face_mesh, (width, height), points,
+                                     every_n=FLOW_KEYFRAME_INTERVAL, max_error=FLOW_MAX_ERROR,
+                                     blink_ratio=CLICK_RATIO * FLOW_BLINK_MARGIN)
+        if ENABLE_IDLE and capture is not None:
+            face_mesh = IdleFaceMesh(face_mesh, PresenceDetector(IDLE_DETECTOR), capture, idle_after=IDLE_AFTER,
+                                     idle_fps=IDLE_FPS, max_wake_latency=WAKE_LATENCY_LIMIT, metrics=metrics)
+    except BaseException:
+        if base is not backend:
+            base.close()  # Started here
+        raise
+    if replaced is not None:
+        replaced.close()
+    return face_mesh
+
+def create_calibrator():
+    return ThresholdCalibrator(CLICK_RATIO, SCROLL_RATIO, MOVE_THRESHOLD,
+                               ratio_bounds=CLICK_RATIO_BOUNDS, move_bounds=MOVE_THRESHOLD_BOUNDS,
+                               blink_durations=(0.1, max_blink_duration))
+
+def create_gaze_model(profile=None):
+    """Gaze mapping, restored from the profile if it has one (otherwise calibrated on first use)."""
+    model = GazeModel(GAZE_DEGREE, GAZE_RIDGE)
+    if profile:
+        try:
+            model.load(profile_path(CALIBRATION_DIR, f"{profile}.gaze"))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Unreadable or damaged: recalibrate (the next save replaces it)
+            print(f"Gaze profile '{profile}' ignored ({e!r}), calibrating afresh")
+            model = GazeModel(GAZE_DEGREE, GAZE_RIDGE)
+    return model
+
+def create_recorder(path, layout=None):
+    from session_log import SessionRecorder
+    keys = [k for row in (layout or keyboard) for k in row] + WORD_KEYS
+    if DOUBLE_BLINK_KEY and DOUBLE_BLINK_KEY not in keys:
+        keys.append(DOUBLE_BLINK_KEY)
+    return SessionRecorder(path, keys, [g.name for g in GESTURE_TABLE], batch=SESSION_LOG_BATCH,
+                           info={"camera": [CAM_W, CAM_H]})
+
+def open_camera(index=0, width=CAM_W, height=CAM_H):
+    """Opens the camera and starts its capture thread (slow: up to seconds on some webcams). None if missing."""
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return CameraCapture(cap, slots=3, late_after=FRAME_LATE_AFTER).start()
+
+def begin_startup(camera=open_camera):
+    """Starts the slow steps at once, each on its own thread: {name: Task}."""
+    return {
+        "camera": Task("camera", camera),
+        "face_mesh": Task("face_mesh", create_inference_backend, CAM_W, CAM_H),
+        "screen": Task("screen", get_screen_size),
+    }
+
+def show_menu_until(task, engine, display, timer, timeout=STARTUP_TIMEOUT):
+    """
+    Shows the mode menu on a blank canvas until `task` is done (so the first window does
+    not wait for the camera). Keys work meanwhile. Returns False on timeout or quit.
+    """
+    blank = np.zeros((engine.cam_h, engine.cam_w, 3), dtype=np.uint8)
+    deadline = time.time() + timeout
+    while not task.done():
+        display.submit(engine.render(blank), engine.window_names())
+        if display.first_shown is not None:
+            timer.mark("first_frame", display.first_shown)
+        engine.handle_key_press(display.poll_key())
+        if engine.quit_requested or time.time() > deadline:
+            return False
+        time.sleep(0.03)
+    return True
+
+def finish_startup(tasks, timeout=5.0):
+    """Releases whatever the background steps produced that was never put to use (early exit)."""
+    for name in ("camera", "face_mesh"):
+        if name not in tasks:
+            continue
+        try:
+            resource = tasks[name].result(timeout)
+        except Exception:
+            continue
+        if hasattr(resource, "release"):
+            resource.release()  # CameraCapture
+        elif resource is not None:
+            resource.close()
+
+def get_screen_size():
+    try:
+        import screeninfo
+        screen = screeninfo.get_monitors()[0]
+        return screen.width, screen.height
+    except Exception:
+        return 1920, 1080
 
 # --- MODE SELECTION LOGIC (Restored) ---
 
 def draw_mode_menu(img, selected):
     """Draws the startup menu with mode options."""
     h, w, _ = img.shape
-    cv2.putText(img, "SELECT MODE (Blink to choose)", (w//2 - 250, 50), 
+    cv2.putText(img, "SELECT MODE (Blink to choose)", (w//2 - 250, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-    
+
     modes = ["1: Virtual Keyboard (Typing)", "2: Desktop Cursor (Navigation)"]
-    
+
     for i, mode in enumerate(modes):
-        color = (0, 255, 0) if i == selected else (255, 255, 255) 
+        color = (0, 255, 0) if i == selected else (255, 255, 255)
         bg_color = (0, 100, 0) if i == selected else (0, 0, 0)
-        
+
         cv2.rectangle(img, (w//2 - 200, 100 + i*150), (w//2 + 200, 200 + i*150), bg_color, -1)
         cv2.rectangle(img, (w//2 - 200, 100 + i*150), (w//2 + 200, 200 + i*150), color, 3)
-        cv2.putText(img, mode, (w//2 - 190, 160 + i*150), 
+        cv2.putText(img, mode, (w//2 - 190, 160 + i*150),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
-def handle_mode_selection():
-    """Manages the mode selection loop before the main application starts."""
-    global selected_mode, both_eyes_closed_start_time, selected_row, selected_col, blink_state
-    
-    current_selection = 0 # 0 for Keyboard, 1 for Cursor
-    blink_state_select = "open"
-    
-    while selected_mode is None:
-        ret, frame = cap.read()
-        if not ret: break
-        
-        frame = cv2.flip(frame, 1)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_frame)
-        
-        temp_frame = frame.copy()
-        draw_mode_menu(temp_frame, current_selection)
-
-        if results.multi_face_landmarks:
-            face = results.multi_face_landmarks[0]
-            nose = face.landmark[NOSE_TIP]
-            current_time = time.time()
-            
-            # Simple nose movement for menu navigation (Up/Down)
-            if nose.y < 0.35 and current_selection == 1:
-                current_selection = 0
-            elif nose.y > 0.65 and current_selection == 0:
-                current_selection = 1
-                
-            # Blink detection for selection
-            left_blink = blink_ratio(face.landmark, LEFT_EYE)
-            right_blink = blink_ratio(face.landmark, RIGHT_EYE)
-            eyes_closed = (left_blink > CLICK_RATIO and right_blink > CLICK_RATIO)
-            
-            if blink_state_select == "open" and eyes_closed:
-                blink_state_select = "closed"
-                both_eyes_closed_start_time = current_time
-            
-            elif blink_state_select == "closed" and not eyes_closed:
-                blink_duration = current_time - both_eyes_closed_start_time
-                if min_blink_duration <= blink_duration <= max_blink_duration:
-                    if current_selection == 0:
-                        selected_mode = "KEYBOARD"
-                        speak_non_blocking("Keyboard Mode Selected")
-                    elif current_selection == 1:
-                        selected_mode = "CURSOR"
-                        speak_non_blocking("Cursor Mode Selected")
-                
-                blink_state_select = "open"
-            
-            elif not eyes_closed and blink_state_select != "open":
-                blink_state_select = "open"
-                
-        cv2.imshow("Mode Selection", temp_frame)
-        
-        if cv2.waitKey(1) & 0xFF == 27: # ESC key to quit
-            break
-            
-    cv2.destroyWindow("Mode Selection")
-    
-# --- EXECUTE MODE SELECTION ---
-handle_mode_selection()
-
-# Agar user ne ESC press kiya toh exit
-if selected_mode is None:
-    cap.release()
-    cv2.destroyAllWindows()
-    exit()
+# --- DETECTION ENGINE ---
 
-# --- MAIN APPLICATION LOOP ---
-try:
-    print(f"Starting in {selected_mode} Mode...")
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret: break
-            
-        frame = cv2.flip(frame, 1)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_frame)
-
-        current_time = time.time()
-        blink_detected = False
-        
-        if results.multi_face_landmarks:
-            face = results.multi_face_landmarks[0]
-            
-            left_blink_ratio = blink_ratio(face.landmark, LEFT_EYE)
-            right_blink_ratio = blink_ratio(face.landmark, RIGHT_EYE)
-            nose = face.landmark[NOSE_TIP]
-            
-            # --- CURSOR MODE LOGIC (Integrated Floating KB) ---
-            if selected_mode == "CURSOR":
-                
-                # --- A. Floating KB Trigger/Warning ---
-                eyes_closed_now = (left_blink_ratio > SCROLL_RATIO and right_blink_ratio > SCROLL_RATIO)
-                
-                if eyes_closed_now:
-                    if both_eyes_closed_start_time == 0:
-                        both_eyes_closed_start_time = current_time
-                    
-                    elapsed_time = current_time - both_eyes_closed_start_time
-
-                    if not FLOATING_KB_ACTIVE and elapsed_time >= KEYBOARD_TRIGGER_TIME and elapsed_time < MAX_EYE_CLOSE_TIME:
-                        # 5 seconds: KEYBOARD OPEN TOGGLE
-                        
-                        # FIX 1: Current OS cursor position lock kiya
-                        os_cursor_lock_pos = mouse.position 
-
-                        FLOATING_KB_ACTIVE = True
-                        # FIX: Voice confirmation for KB ON (Already present, confirming its existence)
-                        speak_non_blocking("Keyboard is on") 
-                        selected_row = 0
-                        selected_col = 0
-                        
-                    elif elapsed_time >= MAX_EYE_CLOSE_TIME:
-                        # 10 seconds: Warning dena
-                        cv2.putText(frame, "⚠️ OPEN YOUR EYES! (Resting too long) ⚠️", (10, CAM_H - 10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-                        FLOATING_KB_ACTIVE = False 
-                        
-                    elif not FLOATING_KB_ACTIVE:
-                         # 0 se 5 seconds ke beech ka feedback
-                         cv2.putText(frame, f"Triggering KB in: {KEYBOARD_TRIGGER_TIME - elapsed_time:.1f}s", (10, CAM_H - 10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
-                        
+class DetectorEngine:
+    """
+    Mode menu + main-loop decision logic for one user, without any camera, window or OS dependency.
+    Feed it frames with process_frame() or landmarks with update(); render() returns the window images.
+    """
+
+    def __init__(self, face_mesh=None, speaker=None, os_input=None, screen_size=(1920, 1080),
+                 camera_size=(CAM_W, CAM_H), mode=None, layout=None, metrics=None, predictor=None,
+                 calibrator=None, recorder=None, gaze=None, journal=None, wink_keys=KEYBOARD_WINK_KEYS):
+        self.face_mesh = face_mesh
+        self.metrics = metrics or Metrics()
+        self.show_metrics = SHOW_METRICS_OVERLAY
+        self.show_preview = SHOW_PREVIEW
+        self.speaker = speaker or NullSpeaker()
+        self.os_input = os_input or NullInput()
+        self.screen_w, self.screen_h = screen_size
+        self.cam_w, self.cam_h = camera_size
+        self.predictor = predictor
+        self.layout = layout or keyboard
+        if predictor is not None and WORD_KEYS not in self.layout:
+            self.layout = [WORD_KEYS] + self.layout
+        self.rows = len(self.layout)
+        self._keyboard_views = {}  # pre-rendered keyboard images, see keyboard_view.py
+
+        self.selected_mode = mode
+        self.selected_row = 0
+        self.selected_col = 0
+        self.text = TextBuffer(MAX_TEXT_CHARS, journal)   # KEYBOARD mode text, restored from the journal
+        self.os_word = ""      # letters typed into the OS since the last space (floating KB)
+        self.suggestions = []
+        self.refresh_suggestions()
+        self.shift_on = False
+        self.blink_detected = False
+        self.floating_kb_active = False
+        self.quit_requested = False
+        self.face_found = False   # last update() had a face
+
+        # Additional variables
+        self.os_cursor_lock_pos = (0, 0)
+
+        # Blink detection (Common to all modes): one recognizer, events as a bitmask per frame
+        self.gestures = GestureRecognizer(EYE_CHANNELS, GESTURE_TABLE)
+        self._blink = self.gestures.bit("blink")
+        self._click = self.gestures.bit("click")
+        self._double_blink = self.gestures.bit("double_blink")
+        self._sustained_close = self.gestures.bit("sustained_close")
+        self._winks = [(self.gestures.bit(name), key)
+                       for name, key in zip(("wink_left", "wink_right"), wink_keys or ())]
+        self._closed = self.gestures.channel("closed")
+        self._left_wink = self.gestures.channel("left")
+        self._right_wink = self.gestures.channel("right")
+
+        # Per-user thresholds (ThresholdCalibrator; None = the fixed config values)
+        self.calibrator = calibrator
+        self.move_threshold = MOVE_THRESHOLD
+        self.apply_calibration()
+
+        # Gaze cursor (gaze.GazeModel; None = nose cursor), calibrated on entering CURSOR mode if unfitted
+        self.gaze = gaze
+        self.gaze_features = GazeFeatures() if gaze is not None else None
+        self.gaze_calibration = None
+        self._both_closed = self.gestures.channel("both")
+
+        # Optional per-frame log (session_log.SessionRecorder) and this frame's decisions for it
+        self.recorder = recorder
+        self.publisher = None    # landmark_service.LandmarkPublisher (--landmark-service)
+        self.frame_key = None
+        self.frame_click = False
+        self.frame_scroll = 0
+
+        # Mode menu variables
+        self.menu_selection = 0 # 0 for Keyboard, 1 for Cursor
+
+        # Cursor Mode variables
+        self.last_blink_click_time = 0
+
+        # Keyboard Navigation Variables
+        self.last_move_time = 0
+        self.nose_filters = {name: create_filter(spec) for name, spec in NOSE_FILTERS.items()}
+        self.stable_nose_position = None
+
+        # Per-frame eye ratios + nose position, filled in place
+        self.landmarks = LandmarkAccessor()
+        self._last_landmark_time = 0.0
+
+        # On-frame messages set by the decision logic, drawn by render()
+        self.messages = []
+
+    def apply_calibration(self):
+        if self.calibrator is not None:
+            self.gestures.scale_thresholds(self.calibrator.scale)
+            self.move_threshold = self.calibrator.move_threshold
+            # Optical flow must hand a closing eye to FaceMesh before the calibrated threshold, not the default
+            stage = self.face_mesh
+            while stage is not None:
+                if isinstance(stage, FlowFaceMesh):
+                    stage.blink_ratio = self.calibrator.click_ratio * FLOW_BLINK_MARGIN
+                stage = getattr(stage, "face_mesh", None)
+
+    def speak(self, text, kind="prompt"):
+        self.speaker.say(text, kind)
+
+    def speak_key(self, key, text):
+        """Key feedback: plain echoes are coalesced while typing fast, state changes are not."""
+        if text:
+            self.speak(text, "prompt" if key in ("Shift", "CLOSE_KB") else "echo")
+
+    # --- Word prediction ---
+
+    @property
+    def typed_text(self):
+        """KEYBOARD mode text as a str (copies it all: per-frame code uses self.text)."""
+        return self.text.text()
+
+    def current_word(self):
+        """Letters of the word being typed (before the cursor in KEYBOARD mode, OS typing otherwise)."""
+        if self.selected_mode == "KEYBOARD":
+            return self.text.word_before_cursor()
+        return self.os_word
+
+    def refresh_suggestions(self):
+        if self.predictor is not None:
+            self.suggestions = self.predictor.complete(self.current_word(), PREDICTION_SLOTS)
+
+    def _accept_suggestion(self, key, frame_time=None):
+        """Completes the current word with the suggestion on key plus a space. Returns the word."""
+        index = WORD_KEYS.index(key)
+        if index >= len(self.suggestions):
+            return ""
+        word = self.suggestions[index]
+        rest = word[len(self.current_word()):]
+        if self.selected_mode == "KEYBOARD":
+            self.text.insert(rest + " ")
+        else:
+            for char in rest:
+                self.os_input.tap(char, frame_time)
+            self.os_input.tap("space", frame_time)
+            self.os_word = ""
+        return word
+
+    # --- Frame input ---
+
+    def process_frame(self, frame, frame_time=None):
+        """Flips, runs FaceMesh and the decision logic. Returns the flipped frame."""
+        if self.face_mesh is None:
+            # Still starting up: the camera picture and the menu, no face yet
+            frame = cv2.flip(frame, 1)
+            self.update(None, frame_time if frame_time is not None else time.time())
+            return frame
+        if hasattr(self.face_mesh, "process_bgr"):
+            # ROI tracking converts only the crop it sends, so colour conversion is part of inference
+            with self.metrics.stage("flip_cvt"):
+                frame = cv2.flip(frame, 1)
+            with self.metrics.stage("face_mesh"):
+                results = self.face_mesh.process_bgr(frame, frame_time)
+        else:
+            with self.metrics.stage("flip_cvt"):
+                frame = cv2.flip(frame, 1)
+                dst = self.face_mesh.input_buffer() if hasattr(self.face_mesh, "input_buffer") else None
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst)
+            with self.metrics.stage("face_mesh"):
+                if frame_time is not None and hasattr(self.face_mesh, "submit"):
+                    results = self.face_mesh.process(rgb_frame, frame_time)
                 else:
-                    # FIX: Aankh khulne par sirf timer reset hoga, KB off nahi hoga.
-                    both_eyes_closed_start_time = 0 
-                
-                # --- B. Control Logic based on KB status ---
-                if FLOATING_KB_ACTIVE:
-                    
-                    # FIX 1: OS Cursor ko lock position par rakha
-                    mouse.position = os_cursor_lock_pos 
-
-                    # Keyboard Navigation (Nose movement)
-                    current_nose_pos = (nose.x, nose.y)
-                    
-                    if stable_nose_position is None: stable_nose_position = current_nose_pos
-                    nose_history.append(current_nose_pos)
-                    if len(nose_history) > stabilization_frames: nose_history.pop(0)
-                    
-                    # KEYBOARD MOVEMENT LOGIC (KB Selection)
-                    if len(nose_history) >= stabilization_frames:
-                        avg_nose_x = np.mean([n[0] for n in nose_history])
-                        avg_nose_y = np.mean([n[1] for n in nose_history])
-                        
-                        delta_x = avg_nose_x - stable_nose_position[0]
-                        delta_y = avg_nose_y - stable_nose_position[1]
-                        
-                        if current_time - last_move_time > move_delay:
-                            moved = False
-                            # Horizontal movement
-                            if abs(delta_x) > MOVE_THRESHOLD:
-                                if delta_x < -MOVE_THRESHOLD:  # Left
-                                    selected_col = (selected_col - 1) % len(keyboard[selected_row])
-                                    moved = True
-                                elif delta_x > MOVE_THRESHOLD: # Right
-                                    selected_col = (selected_col + 1) % len(keyboard[selected_row])
-                                    moved = True
-                            
-                            # Vertical movement
-                            if abs(delta_y) > MOVE_THRESHOLD:
-                                if delta_y < -MOVE_THRESHOLD:  # Up
-                                    new_row = (selected_row - 1) % rows
-                                    selected_row = new_row
-                                    selected_col = min(selected_col, len(keyboard[selected_row]) - 1)
-                                    moved = True
-                                elif delta_y > MOVE_THRESHOLD: # Down
-                                    new_row = (selected_row + 1) % rows
-                                    selected_row = new_row
-                                    selected_col = min(selected_col, len(keyboard[selected_row]) - 1)
-                                    moved = True
-                                    
-                            if moved:
-                                last_move_time = current_time
-                                stable_nose_position = (avg_nose_x, avg_nose_y)
-
-                    # Blink Detection for Typing (OS Input)
-                    eyes_closed_for_click = (left_blink_ratio > CLICK_RATIO and right_blink_ratio > CLICK_RATIO)
-                    
-                    if blink_state == "open" and eyes_closed_for_click:
-                        blink_state = "closed"
-                        blink_start_time = current_time
-                    
-                    elif blink_state == "closed" and not eyes_closed_for_click:
-                        blink_duration = current_time - blink_start_time
-                        
-                        if min_blink_duration <= blink_duration <= max_blink_duration and current_time - last_blink_click_time > BLINK_CLICK_DELAY:
-                            
-                            key = keyboard[selected_row][selected_col]
-                            
-                            # OS Typing Function Call
-                            shift_on, text_to_speak = handle_keyboard_input(key, shift_on)
-                            
-                            if text_to_speak: speak_non_blocking(text_to_speak) 
-                            
-                            blink_detected = True
-                            last_blink_click_time = current_time 
-                            
-                        blink_state = "open"
-                    
-                    elif not eyes_closed_for_click and blink_state != "open":
-                        blink_state = "open"
-
-                else: # FLOATING_KB_ACTIVE == False (Normal Cursor Mode)
-                    # 1. Cursor Movement
-                    cursor_x = int(nose.x * SCREEN_W)
-                    cursor_y = int(nose.y * SCREEN_H)
-                    mouse.position = (cursor_x, cursor_y) 
-
-                    # 2. Scrolling Logic
-                    if left_blink_ratio > SCROLL_RATIO and right_blink_ratio < SCROLL_RATIO:
-                        mouse.scroll(0, SCROLL_AMOUNT) 
-                        cv2.putText(frame, "⬆️ SCROLLING UP", (CAM_W - 200, CAM_H - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                    
-                    elif right_blink_ratio > SCROLL_RATIO and left_blink_ratio < SCROLL_RATIO:
-                        mouse.scroll(0, -SCROLL_AMOUNT) 
-                        cv2.putText(frame, "⬇️ SCROLLING DOWN", (CAM_W - 200, CAM_H - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-
-                    # 3. Blink for Click (OS Mouse Click)
-                    eyes_closed_for_click = (left_blink_ratio > CLICK_RATIO and right_blink_ratio > CLICK_RATIO)
-                    
-                    if blink_state == "open" and eyes_closed_for_click:
-                        blink_state = "closed"
-                        blink_start_time = current_time
-                    
-                    elif blink_state == "closed" and not eyes_closed_for_click:
-                        blink_duration = current_time - blink_start_time
-                        
-                        if 0.1 < blink_duration < 0.5 and current_time - last_blink_click_time > BLINK_CLICK_DELAY:
-                            mouse.click(Button.left) 
-                            speak_non_blocking("Click")
-                            last_blink_click_time = current_time 
-                            cv2.putText(frame, "CLICK!", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        
-                        blink_state = "open"
-            
-            # --- KEYBOARD MODE LOGIC (Original Functionality) ---
-            elif selected_mode == "KEYBOARD":
-                
-                # Get nose position for cursor control
-                current_nose_pos = (nose.x, nose.y)
-                
-                if stable_nose_position is None: stable_nose_position = current_nose_pos
-                
-                # Smooth nose position
-                nose_history.append(current_nose_pos)
-                if len(nose_history) > stabilization_frames: nose_history.pop(0)
-                
-                # KEYBOARD NAVIGATION LOGIC
-                if len(nose_history) >= stabilization_frames:
-                    avg_nose_x = np.mean([n[0] for n in nose_history])
-                    avg_nose_y = np.mean([n[1] for n in nose_history])
-                    
-                    delta_x = avg_nose_x - stable_nose_position[0]
-                    delta_y = avg_nose_y - stable_nose_position[1]
-                    
-                    # FIX: Keyboard Mode ke liye slower delay use kiya
-                    if current_time - last_move_time > KB_NAVIGATION_DELAY:
-                        moved = False
-                        # Horizontal movement
-                        if abs(delta_x) > MOVE_THRESHOLD:
-                            if delta_x < -MOVE_THRESHOLD:  # Left
-                                selected_col = (selected_col - 1) % len(keyboard[selected_row])
-                                moved = True
-                            elif delta_x > MOVE_THRESHOLD: # Right
-                                selected_col = (selected_col + 1) % len(keyboard[selected_row])
-                                moved = True
-                        
-                        # Vertical movement
-                        if abs(delta_y) > MOVE_THRESHOLD:
-                            if delta_y < -MOVE_THRESHOLD:  # Up
-                                new_row = (selected_row - 1) % rows
-                                selected_row = new_row
-                                selected_col = min(selected_col, len(keyboard[selected_row]) - 1)
-                                moved = True
-                            elif delta_y > MOVE_THRESHOLD: # Down
-                                new_row = (selected_row + 1) % rows
-                                selected_row = new_row
-                                selected_col = min(selected_col, len(keyboard[selected_row]) - 1)
-                                moved = True
-                                
-                        if moved:
-                            last_move_time = current_time
-                            stable_nose_position = (avg_nose_x, avg_nose_y)
-
-                # Blink Detection for Typing (On-screen Keyboard)
-                eyes_closed_for_click = (left_blink_ratio > CLICK_RATIO and right_blink_ratio > CLICK_RATIO)
-                
-                if blink_state == "open" and eyes_closed_for_click:
-                    blink_state = "closed"
-                    blink_start_time = current_time
-                
-                elif blink_state == "closed" and not eyes_closed_for_click:
-                    blink_duration = current_time - blink_start_time
-                    
-                    if min_blink_duration <= blink_duration <= max_blink_duration:
-                        # Valid blink detected
-                        key = keyboard[selected_row][selected_col]
-                        text_to_speak = ""
-                        
-                        if key == "Space":
-                            typed_text += " "
-                            text_to_speak = "Space"
-                        elif key == "Delete":
-                            typed_text = typed_text[:-1]
-                            text_to_speak = "Deleted"
-                        elif key == "Shift":
-                            shift_on = not shift_on
-                            text_to_speak = "Shift On" if shift_on else "Shift Off"
-                        elif key == "Enter":
-                            typed_text += "\n"
-                            text_to_speak = "Enter"
-                        else:
-                            char = key if shift_on else key.lower()
-                            typed_text += char
-                            text_to_speak = char
-                        
-                        if text_to_speak: speak_non_blocking(text_to_speak) 
-                            
-                        blink_detected = True
-                        
-                    blink_state = "open"
-                
-                elif not eyes_closed_for_click and blink_state != "open":
-                    blink_state = "open"
-        
-        # --- DISPLAY OUTPUT ---
-        
-        cv2.putText(frame, f"MODE: {selected_mode} | KB: {'ON' if FLOATING_KB_ACTIVE else 'OFF'}", (10, 30), 
+                    results = self.face_mesh.process(rgb_frame)  # MediaPipe FaceMesh takes no timestamp
+        face = results.multi_face_landmarks[0] if results.multi_face_landmarks else None
+        self.update(face, self._landmark_time(results, frame_time))
+        return frame
+
+    def _landmark_time(self, results, frame_time):
+        """
+        When the landmarks were seen. A pipelined backend answers with the previous frame's
+        landmarks (results.timestamp), which gestures, latency metrics and published records
+        need rather than this frame's capture time. Never earlier than the last frame's.
+        """
+        now = frame_time if frame_time is not None else time.time()
+        seen = getattr(results, "timestamp", None)
+        if seen is not None and seen > 0:
+            now = min(max(seen, self._last_landmark_time), now)
+        self._last_landmark_time = now
+        return now
+
+    def update(self, face, current_time):
+        """Runs one frame of decision logic on a face (None when no face was found)."""
+        self.blink_detected = False
+        self.messages = []
+        self.frame_key = None
+        self.frame_click = False
+        self.frame_scroll = 0
+        self.face_found = face is not None
+        if face is None:
+            if self.recorder is not None:
+                self._record(None, current_time, 0)
+            if self.publisher is not None:
+                self.publisher.publish(current_time, None)
+            return
+
+        with self.metrics.stage("blink_ratio"):
+            features = self.landmarks.update(face)
+        left_blink_ratio = features.left_ratio
+        right_blink_ratio = features.right_ratio
+        nose_x, nose_y = features.nose_x, features.nose_y
+
+        # Includes any OS input calls made by the decisions (also recorded on their own as "os_input")
+        with self.metrics.stage("gestures"):
+            if self.calibrator is not None and self.calibrator.observe_eyes(left_blink_ratio, right_blink_ratio, current_time):
+                self.apply_calibration()
+            events = self.gestures.update(left_blink_ratio, right_blink_ratio, current_time)
+            if self.selected_mode is None:
+                self._update_mode_menu(events, nose_y, current_time)
+            elif self.selected_mode == "CURSOR":
+                if self.gaze is None or not self._calibrating_gaze(face, current_time):
+                    self._update_cursor_mode(events, nose_x, nose_y, current_time)
+            elif self.selected_mode == "KEYBOARD":
+                self._update_keyboard_mode(events, nose_x, nose_y, current_time)
+
+        if self.recorder is not None:
+            self._record(face, current_time, events)
+        if self.publisher is not None:
+            self.publisher.publish(current_time, face, self.landmarks, events)
+
+    def _record(self, face, current_time, events):
+        self.recorder.record(current_time, face, self.landmarks, self.selected_mode, self.floating_kb_active,
+                             self.frame_key, self.frame_click, self.frame_scroll, events,
+                             self.calibrator.click_ratio if self.calibrator is not None else CLICK_RATIO)
+
+    def _update_mode_menu(self, events, nose_y, current_time):
+        # Simple nose movement for menu navigation (Up/Down)
+        if nose_y < 0.35 and self.menu_selection == 1:
+            self.menu_selection = 0
+        elif nose_y > 0.65 and self.menu_selection == 0:
+            self.menu_selection = 1
+
+        # Blink for selection
+        if events & self._blink:
+            if self.menu_selection == 0:
+                self.selected_mode = "KEYBOARD"
+                self.speak("Keyboard Mode Selected")
+            elif self.menu_selection == 1:
+                self.selected_mode = "CURSOR"
+                self.speak("Cursor Mode Selected")
+
+    # --- GAZE CURSOR ---
+
+    def start_gaze_calibration(self):
+        self.gaze_calibration = GazeCalibration(GAZE_CALIBRATION_GRID)
+        self.speak("Follow the dot")
+
+    def _calibrating_gaze(self, face, current_time):
+        """Updates the gaze features; True while the calibration owns the frame (no cursor actions)."""
+        features = self.gaze_features.update(face)
+        if self.gaze_calibration is None:
+            if self.gaze.fitted:
+                return False
+            self.start_gaze_calibration()
+        eyes_open = not any(self.gestures.closed)
+        if self.gaze_calibration.update(features, current_time, eyes_open):
+            if self.gaze_calibration.fit(self.gaze) is None:
+                self.start_gaze_calibration()  # Eyes closed / looking away for most dots
+                return True
+            self.gaze_calibration = None
+            self.nose_filters["GAZE"].reset()
+            self.speak("Gaze calibrated")
+        return True
+
+    def _gaze_cursor(self, current_time):
+        """Smoothed gaze point, or None while an eye is closed (the iris is hidden, hold the cursor)."""
+        if any(self.gestures.closed):
+            return None
+        x, y = self.gaze.predict(self.gaze_features.vector)
+        return self.nose_filters["GAZE"].update(x, y, current_time)
+
+    def _navigate(self, nose_x, nose_y, current_time, delay, nose_filter):
+        """Nose-driven keyboard navigation shared by KEYBOARD mode and the floating KB."""
+        current_nose_pos = (nose_x, nose_y)
+
+        if self.stable_nose_position is None: self.stable_nose_position = current_nose_pos
+
+        if self.calibrator is not None:
+            self.calibrator.observe_nose(nose_x, nose_y)
+
+        # Smooth nose position
+        avg_nose_x, avg_nose_y = nose_filter.update(nose_x, nose_y, current_time)
+        if not nose_filter.ready:
+            return
+
+        delta_x = avg_nose_x - self.stable_nose_position[0]
+        delta_y = avg_nose_y - self.stable_nose_position[1]
+
+        if current_time - self.last_move_time > delay:
+            moved = False
+            # Horizontal movement
+            threshold = self.move_threshold
+            if abs(delta_x) > threshold:
+                if delta_x < -threshold:  # Left
+                    self.selected_col = (self.selected_col - 1) % len(self.layout[self.selected_row])
+                    moved = True
+                elif delta_x > threshold: # Right
+                    self.selected_col = (self.selected_col + 1) % len(self.layout[self.selected_row])
+                    moved = True
+
+            # Vertical movement
+            if abs(delta_y) > threshold:
+                if delta_y < -threshold:  # Up
+                    self.selected_row = (self.selected_row - 1) % self.rows
+                    self.selected_col = min(self.selected_col, len(self.layout[self.selected_row]) - 1)
+                    moved = True
+                elif delta_y > threshold: # Down
+                    self.selected_row = (self.selected_row + 1) % self.rows
+                    self.selected_col = min(self.selected_col, len(self.layout[self.selected_row]) - 1)
+                    moved = True
+
+            if moved:
+                self.last_move_time = current_time
+                self.stable_nose_position = (avg_nose_x, avg_nose_y)
+
+    # --- CURSOR MODE LOGIC (Integrated Floating KB) ---
+
+    def _update_cursor_mode(self, events, nose_x, nose_y, current_time):
+        # --- A. Floating KB Trigger/Warning ---
+        elapsed_time = self.gestures.closed_for(self._closed, current_time)
+
+        if elapsed_time > 0:
+            if not self.floating_kb_active and events & self._sustained_close and elapsed_time < MAX_EYE_CLOSE_TIME:
+                # 5 seconds: KEYBOARD OPEN TOGGLE
+
+                # FIX 1: Current OS cursor position lock kiya
+                self.os_cursor_lock_pos = self.os_input.position
+
+                self.floating_kb_active = True
+                self.speak("Keyboard is on")
+                self.selected_row = 0
+                self.selected_col = 0
+
+            elif elapsed_time >= MAX_EYE_CLOSE_TIME:
+                # 10 seconds: Warning dena
+                self.messages.append(("⚠️ OPEN YOUR EYES! (Resting too long) ⚠️", (10, self.cam_h - 10), 1, (0, 0, 255), 3))
+                self.floating_kb_active = False
+
+            elif not self.floating_kb_active:
+                # 0 se 5 seconds ke beech ka feedback
+                self.messages.append((f"Triggering KB in: {KEYBOARD_TRIGGER_TIME - elapsed_time:.1f}s", (10, self.cam_h - 10), 0.6, (0, 165, 255), 2))
+
+        # --- B. Control Logic based on KB status ---
+        if not self.floating_kb_active and self.calibrator is not None:
+            self.calibrator.nose_reset()  # Jitter is only measured while navigating keys
+        if self.floating_kb_active:
+
+            # FIX 1: OS Cursor ko lock position par rakha
+            self.os_input.move(*self.os_cursor_lock_pos)
+
+            # Keyboard Navigation (Nose movement)
+            self._navigate(nose_x, nose_y, current_time, move_delay, self.nose_filters["FLOATING_KB"])
+
+            # Blink for Typing (OS Input)
+            if events & self._blink and current_time - self.last_blink_click_time > BLINK_CLICK_DELAY:
+                self._type_into_os(self.layout[self.selected_row][self.selected_col], current_time)
+            elif events & self._double_blink and DOUBLE_BLINK_KEY:
+                self._type_into_os(DOUBLE_BLINK_KEY, current_time)
+
+        else: # floating_kb_active == False (Normal Cursor Mode)
+            # 1. Cursor Movement (smoothed + extrapolated to offset camera/inference latency)
+            if self.gaze is not None:
+                point = self._gaze_cursor(current_time)
+            else:
+                point = self.nose_filters["CURSOR"].update(nose_x, nose_y, current_time)
+            if point is not None:
+                cursor_x = int(min(max(point[0], 0.0), 1.0) * self.screen_w)
+                cursor_y = int(min(max(point[1], 0.0), 1.0) * self.screen_h)
+                self.os_input.move(cursor_x, cursor_y)
+
+            # 2. Scrolling Logic (for as long as one eye stays closed)
+            if self.gestures.closed[self._left_wink]:
+                self.os_input.scroll(SCROLL_AMOUNT)
+                self.frame_scroll = 1
+                self.messages.append(("⬆️ SCROLLING UP", (self.cam_w - 200, self.cam_h - 10), 0.7, (255, 255, 0), 2))
+
+            elif self.gestures.closed[self._right_wink]:
+                self.os_input.scroll(-SCROLL_AMOUNT)
+                self.frame_scroll = -1
+                self.messages.append(("⬇️ SCROLLING DOWN", (self.cam_w - 200, self.cam_h - 10), 0.7, (0, 255, 255), 2))
+
+            # 3. Blink for Click (OS Mouse Click)
+            if events & self._click and current_time - self.last_blink_click_time > BLINK_CLICK_DELAY:
+                self.os_input.click()
+                self.frame_click = True
+                self.speak("Click", "click")
+                if self.calibrator is not None:
+                    self.calibrator.selection("Click", current_time)
+                self.last_blink_click_time = current_time
+                self.messages.append(("CLICK!", (10, 60), 1, (0, 255, 0), 2))
+
+    def _type_into_os(self, key, current_time):
+        """Floating KB: presses key in the OS and gives feedback."""
+        # OS Typing Function Call
+        self.shift_on, text_to_speak = self.handle_keyboard_input(key, self.shift_on, current_time)
+        self.speak_key(key, text_to_speak)
+        if self.calibrator is not None:
+            self.calibrator.selection(key, current_time)
+        self.frame_key = key
+        self.blink_detected = True
+        self.last_blink_click_time = current_time
+
+    def handle_keyboard_input(self, key, shift_status, frame_time=None):
+        """
+        Takes the selected key and types it into the OS.
+        frame_time: timestamp of the frame whose eye-open completed the blink (for latency metrics).
+        Returns: (updated_shift_status, text_to-speak)
+        """
+        text_to_speak = ""
+        updated_shift_status = shift_status
+
+        if key in WORD_KEYS:
+            text_to_speak = self._accept_suggestion(key, frame_time)
+        elif key == "Space":
+            self.os_input.tap("space", frame_time)
+            self.os_word = ""
+            text_to_speak = "Space"
+        elif key == "Delete":
+            self.os_input.tap("backspace", frame_time)
+            self.os_word = self.os_word[:-1]
+            text_to_speak = "Deleted"
+        elif key == "Shift":
+            updated_shift_status = not shift_status
+            text_to_speak = "Shift On" if updated_shift_status else "Shift Off"
+        elif key == "Enter":
+            self.os_input.tap("enter", frame_time)
+            self.os_word = ""
+            text_to_speak = "Enter"
+        elif key in TEXT_CURSOR_KEYS:
+            self.os_input.tap(key.lower(), frame_time)
+            self.os_word = ""  # Somewhere else in the OS text now
+            text_to_speak = key
+        elif key == "CLOSE_KB":
+            self.floating_kb_active = False
+            text_to_speak = "Keyboard Closed"
+        else:
+            char = key if shift_status else key.lower()
+            self.os_input.tap(char, frame_time)
+            self.os_word += char
+            text_to_speak = char
+
+        self.refresh_suggestions()
+        return updated_shift_status, text_to_speak
+
+    # --- KEYBOARD MODE LOGIC (Original Functionality) ---
+
+    def _update_keyboard_mode(self, events, nose_x, nose_y, current_time):
+        # FIX: Keyboard Mode ke liye slower delay use kiya
+        self._navigate(nose_x, nose_y, current_time, KB_NAVIGATION_DELAY, self.nose_filters["KEYBOARD"])
+
+        # Blink for Typing (On-screen Keyboard)
+        if events & self._blink:
+            self._type_on_screen(self.layout[self.selected_row][self.selected_col], current_time)
+        elif events & self._double_blink and DOUBLE_BLINK_KEY:
+            self._type_on_screen(DOUBLE_BLINK_KEY, current_time)
+        else:
+            for bit, key in self._winks:
+                if events & bit:
+                    self._move_text_cursor(key)
+                    self.refresh_suggestions()  # Now completing the word before the new position
+                    self.speak_key(key, key)
+
+    def _move_text_cursor(self, key):
+        if key == "Left":
+            self.text.move(-1)
+        elif key == "Right":
+            self.text.move(1)
+        elif key in ("Up", "Down"):
+            self.text.move_line(-1 if key == "Up" else 1)
+        elif key == "Home":
+            self.text.home()
+        elif key == "End":
+            self.text.end()
+
+    def _type_on_screen(self, key, current_time):
+        """KEYBOARD mode: applies key to the text at its cursor and gives feedback."""
+        text_to_speak = ""
+
+        if key in WORD_KEYS:
+            text_to_speak = self._accept_suggestion(key)
+        elif key == "Space":
+            self.text.insert(" ")
+            text_to_speak = "Space"
+        elif key == "Delete":
+            self.text.delete_back()
+            text_to_speak = "Deleted"
+        elif key in TEXT_CURSOR_KEYS:
+            self._move_text_cursor(key)
+            text_to_speak = key
+        elif key == "Shift":
+            self.shift_on = not self.shift_on
+            text_to_speak = "Shift On" if self.shift_on else "Shift Off"
+        elif key == "Enter":
+            self.text.insert("\n")
+            text_to_speak = "Enter"
+        else:
+            char = key if self.shift_on else key.lower()
+            self.text.insert(char)
+            text_to_speak = char
+
+        self.refresh_suggestions()
+        self.speak_key(key, text_to_speak)
+        if self.calibrator is not None:
+            self.calibrator.selection(key, current_time)
+        self.frame_key = key
+
+        self.blink_detected = True
+
+    def handle_key_press(self, key_press):
+        """Physical keyboard shortcuts from cv2.waitKey()."""
+        if key_press == 27:  # ESC
+            self.quit_requested = True
+        elif key_press == ord('c') and self.selected_mode == "KEYBOARD":  # Clear text
+            self.text.clear()
+            self.refresh_suggestions()
+            self.speak("Text cleared")
+        elif key_press == ord('m'):  # Toggle latency overlay
+            self.show_metrics = not self.show_metrics
+        elif key_press == ord('g') and self.gaze is not None and self.selected_mode == "CURSOR":  # Recalibrate gaze
+            self.start_gaze_calibration()
+
+    # --- DISPLAY OUTPUT ---
+
+    def window_names(self):
+        """Windows the current state shows (whether or not they are redrawn this frame)."""
+        if self.selected_mode is None:
+            return {"Mode Selection"}
+        names = {"Camera"} if self.show_preview else set()
+        if self.gaze_calibration is not None:
+            names.add("Gaze Calibration")
+        elif self.selected_mode == "CURSOR" and self.floating_kb_active:
+            names.add("Floating Keyboard")
+        elif self.selected_mode == "KEYBOARD":
+            names.add("Keyboard")
+        return names
+
+    def render(self, frame, names=None):
+        """
+        Draws overlays and keyboards. Returns: {window_name: image} for this frame.
+        names: only these windows (e.g. those due for a refresh); default window_names().
+        """
+        if names is None:
+            names = self.window_names()
+        if self.selected_mode is None:
+            if "Mode Selection" not in names:
+                return {}
+            # Without the preview the menu goes on a blank canvas
+            temp_frame = frame.copy() if self.show_preview else np.zeros((self.cam_h, self.cam_w, 3), dtype=np.uint8)
+            draw_mode_menu(temp_frame, self.menu_selection)
+            return {"Mode Selection": temp_frame}
+
+        windows = {}
+        if "Gaze Calibration" in names and self.gaze_calibration is not None:
+            # Half resolution; the full-screen window scales it up
+            windows["Gaze Calibration"] = self.gaze_calibration.render((self.screen_w // 2, self.screen_h // 2))
+        if "Floating Keyboard" in names:
+            with self.metrics.stage("render_keyboard"):
+                windows["Floating Keyboard"] = self._render_floating_keyboard()
+        if "Keyboard" in names:
+            with self.metrics.stage("render_keyboard"):
+                windows["Keyboard"] = self._render_keyboard()
+        if "Camera" not in names:
+            return windows
+
+        for text, org, scale, color, thickness in self.messages:
+            cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+
+        cv2.putText(frame, f"MODE: {self.selected_mode} | KB: {'ON' if self.floating_kb_active else 'OFF'}", (10, 30),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
 
-        # Floating Keyboard (Visible only in CURSOR mode when active)
-        if selected_mode == "CURSOR" and FLOATING_KB_ACTIVE:
-            key_w, key_h = 45, 30 
-            kb_w = max(len(r) for r in keyboard) * key_w + 30
-            kb_h = rows * key_h + 40
-            kb_img = np.zeros((kb_h, kb_w, 3), dtype=np.uint8)
-
-            for r in range(rows):
-                for c in range(len(keyboard[r])):
-                    x = 10 + c * key_w
-                    y = 10 + r * key_h
-                    if r == selected_row and c == selected_col:
-                        color = (0, 255, 0) if blink_detected else (0, 255, 255)
-                        cv2.rectangle(kb_img, (x, y), (x + key_w, y + key_h), color, -1)
-                        cv2.putText(kb_img, keyboard[r][c][:5], (x + 5, y + 20),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-                    else:
-                        color = (255, 100, 100) if keyboard[r][c] == "CLOSE_KB" else (255, 255, 255)
-                        cv2.rectangle(kb_img, (x, y), (x + key_w, y + key_h), color, 1)
-                        cv2.putText(kb_img, keyboard[r][c][:5], (x + 5, y + 20),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-            cv2.imshow("Floating Keyboard", kb_img)
-            
-            # FIX: Window position aur always-on-top set kiya
-            try:
-                cv2.setWindowProperty("Floating Keyboard", cv2.WND_PROP_TOPMOST, 1)
-                kb_x = SCREEN_W - kb_w - 10 
-                kb_y = SCREEN_H - kb_h - 10
-                cv2.moveWindow("Floating Keyboard", kb_x, kb_y)
-            except cv2.error:
-                pass
-
-        elif FLOATING_KB_ACTIVE == False:
-            # FIX: Only attempt to destroy if the window *might* exist
-            try:
-                cv2.destroyWindow("Floating Keyboard")
-            except cv2.error:
-                pass
-        
         # Original Keyboard Window (Visible only in KEYBOARD mode)
-        if selected_mode == "KEYBOARD":
+        if self.selected_mode == "KEYBOARD":
+            key = self.layout[self.selected_row][self.selected_col]
             info_text = [
-                f"Selected: {keyboard[selected_row][selected_col]}",
-                f"Shift: {'ON' if shift_on else 'OFF'}",
-                f"Text: {typed_text[-25:]}"
+                f"Selected: {self._suggestion_labels().get(key, key)}",
+                f"Shift: {'ON' if self.shift_on else 'OFF'}",
+                f"Text: {self.text.slice(self.text.cursor - 25, self.text.cursor)}"
             ]
-            
+
             for i, text in enumerate(info_text):
                 cv2.putText(frame, text, (10, 60 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            
-            if blink_detected:
-                cv2.putText(frame, "BLINK DETECTED!", (10, CAM_H - 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-            key_w, key_h = 80, 60
-            kb_w = max(len(r) for r in keyboard) * key_w + 50
-            kb_h = rows * key_h + 150
-            kb_img = np.zeros((kb_h, kb_w, 3), dtype=np.uint8)
-
-            for r in range(rows):
-                for c in range(len(keyboard[r])):
-                    x = 25 + c * key_w
-                    y = 25 + r * key_h
-                    if r == selected_row and c == selected_col:
-                        color = (0, 255, 0) if blink_detected else (0, 255, 255)
-                        cv2.rectangle(kb_img, (x, y), (x + key_w, y + key_h), color, -1)
-                        cv2.putText(kb_img, keyboard[r][c][:8], (x + 10, y + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-                    else:
-                        cv2.rectangle(kb_img, (x, y), (x + key_w, y + key_h), (255, 255, 255), 2)
-                        cv2.putText(kb_img, keyboard[r][c][:8], (x + 10, y + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-
-            # Display typed text
-            cv2.putText(kb_img, "Typed:", (25, kb_h - 100), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            max_chars = 30
-            lines = [typed_text[i:i+max_chars] for i in range(0, len(typed_text), max_chars)]
-            for i, line in enumerate(lines[-3:]):
-                cv2.putText(kb_img, line, (25, kb_h - 70 + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
-
-            cv2.putText(kb_img, "Blink firmly to select | ESC to quit", (25, kb_h - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            cv2.imshow("Keyboard", kb_img)
-            
-        else:
-            # Agar KEYBOARD mode nahi hai toh Original KB window ko destroy karo
+
+            if self.blink_detected:
+                cv2.putText(frame, "BLINK DETECTED!", (10, self.cam_h - 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+        if self.show_metrics:
+            self.metrics.draw_overlay(frame)
+
+        windows["Camera"] = frame
+        return windows
+
+    def _keyboard_view(self, style):
+        """Cached KeyboardView for the current layout (rebuilt if the layout object changes)."""
+        view = self._keyboard_views.get(id(style))
+        if view is None or view.layout is not self.layout:
+            view = KeyboardView(self.layout, style, dynamic_keys=WORD_KEYS)
+            self._keyboard_views[id(style)] = view
+        return view
+
+    def _suggestion_labels(self):
+        return dict(zip(WORD_KEYS, self.suggestions))
+
+    def _render_floating_keyboard(self):
+        view = self._keyboard_view(FLOATING_STYLE)
+        return view.render((self.selected_row, self.selected_col), self.blink_detected, self.shift_on,
+                           labels=self._suggestion_labels())
+
+    def _render_keyboard(self):
+        view = self._keyboard_view(KEYBOARD_STYLE)
+        return view.render((self.selected_row, self.selected_col), self.blink_detected, self.shift_on,
+                           self.text, self._suggestion_labels())
+
+# --- MAIN APPLICATION LOOP ---
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Eye-tracking virtual keyboard")
+    parser.add_argument("--metrics-overlay", action="store_true", default=SHOW_METRICS_OVERLAY,
+                        help="show per-stage latency on the camera window ('m' toggles)")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help="write Prometheus text metrics to this file every few seconds")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--layout", default=KEYBOARD_LAYOUT_FILE,
+                        help="keyboard layout JSON written by 'python layouts.py optimize'")
+    parser.add_argument("--profile", default=CALIBRATION_PROFILE,
+                        help="calibration profile name (per user); thresholds are restored and saved on exit")
+    parser.add_argument("--session-log", default=SESSION_LOG,
+                        help="record per-frame landmarks, ratios and decisions to this file")
+    parser.add_argument("--journal", default=TEXT_JOURNAL, metavar="PATH",
+                        help="keep KEYBOARD mode text in this edit journal and restore it on start")
+    parser.add_argument("--no-journal", action="store_true", help="don't keep or restore the typed text")
+    parser.add_argument("--wink-cursor", action="store_true",
+                        help="left / right winks move the text cursor in KEYBOARD mode (KEYBOARD_WINK_KEYS)")
+    parser.add_argument("--landmark-service", default=LANDMARK_SERVICE, metavar="PATH",
+                        help="publish per-frame landmarks, eye ratios and gestures on this UNIX socket")
+    parser.add_argument("--full-mesh", action="store_true", default=LANDMARK_SERVICE_FULL_MESH,
+                        help="with --landmark-service: all landmarks instead of the eye and nose points")
+    parser.add_argument("--gaze", action="store_true", default=GAZE_CURSOR,
+                        help="CURSOR mode follows your gaze (irises + head pose) instead of the nose tip")
+    parser.add_argument("--no-calibrate", action="store_true", default=not AUTO_CALIBRATE,
+                        help="use the fixed CLICK_RATIO / SCROLL_RATIO / MOVE_THRESHOLD")
+    parser.add_argument("--no-idle", action="store_true", default=not ENABLE_IDLE,
+                        help="keep full-rate capture and FaceMesh running when nobody is there")
+    parser.add_argument("--no-preview", action="store_true", default=not SHOW_PREVIEW,
+                        help="no camera window (keyboards and the mode menu only)")
+    parser.add_argument("--preview-fps", type=float, default=DISPLAY_RATES["Camera"],
+                        help="camera preview refresh rate (detection still runs at full rate)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from os_input import InputWorker, PynputInput
+    from speech import SpeechWorker
+    from predictor import load_predictor
+    from layouts import load_layout
+    from display import Display, WindowSchedule
+
+    args = parse_args(argv)
+    # Camera, FaceMesh and the screen size come up in the background; the menu shows meanwhile
+    tasks = begin_startup()
+    timer = StartupTimer(STARTED)
+    metrics = Metrics()
+    layout = load_layout(args.layout) if args.layout else None
+    calibrator = profile = None
+    gaze = create_gaze_model(args.profile) if args.gaze else None
+    if gaze is not None and gaze.fitted:
+        print(f"Gaze profile '{args.profile}': error {gaze.error:.3f} of the screen")
+    if not args.no_calibrate:
+        calibrator = create_calibrator()
+        if args.profile:
+            profile = profile_path(CALIBRATION_DIR, args.profile)
             try:
-                cv2.destroyWindow("Keyboard")
-            except cv2.error:
-                pass
+                if calibrator.load(profile):
+                    print(f"Calibration profile '{args.profile}': {calibrator.report()}")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Unreadable or damaged: calibrate from scratch (the next save replaces it)
+                print(f"Calibration profile '{args.profile}' ignored ({e!r}), calibrating afresh")
+                calibrator = create_calibrator()
 
+    # pynput is imported on the input thread; TTS starts on the speech thread
+    os_input = InputWorker(lambda: PynputInput(metrics), dead_zone=INPUT_DEAD_ZONE, refresh_hz=INPUT_REFRESH_HZ).start()
+    speaker = SpeechWorker(SPEECH_RATE, SPEECH_VOCABULARY, SPEECH_CACHE_DIR, SPEECH_QUEUE_SIZE).start()
+    predictor = None
+    if ENABLE_PREDICTION:
+        try:
+            predictor = load_predictor(PREDICTION_TRIE, PREDICTION_WORD_LIST)
+        except (OSError, ValueError) as e:
+            print(f"Word prediction unavailable ({e!r}), typing without suggestions")
+    journal = None
+    if args.journal and not args.no_journal:
+        journal = TextJournal(args.journal, JOURNAL_FSYNC_INTERVAL, JOURNAL_FSYNC_BATCH)
+        if journal.restored is not None:
+            print(f"Typed text: {len(journal.restored[0])} characters restored from {args.journal}")
+    engine = DetectorEngine(None, speaker=speaker, os_input=os_input, predictor=predictor, layout=layout,
+                            camera_size=(CAM_W, CAM_H), metrics=metrics, calibrator=calibrator, gaze=gaze,
+                            recorder=create_recorder(args.session_log, layout) if args.session_log else None,
+                            journal=journal,
+                            wink_keys=("Left", "Right") if args.wink_cursor else KEYBOARD_WINK_KEYS)
+    engine.show_metrics = args.metrics_overlay
+    engine.show_preview = not args.no_preview
+    if args.landmark_service:
+        from landmark_service import LandmarkPublisher
+        engine.publisher = LandmarkPublisher(args.landmark_service, [g.name for g in GESTURE_TABLE],
+                                             full_mesh=args.full_mesh)
+    schedule = WindowSchedule({**DISPLAY_RATES, "Camera": args.preview_fps})
+    display = Display((engine.screen_w, engine.screen_h), threaded=DISPLAY_THREAD and sys.platform != "darwin",
+                      metrics=metrics).start()
+    exporter = None
+    if args.metrics_file or args.metrics_port:
+        exporter = MetricsExporter(metrics, path=args.metrics_file, port=args.metrics_port).start()
 
-        cv2.imshow("Camera", frame)
+    capture = face_mesh = None
+    try:
+        # --- CAMERA & SCREEN SETUP (finishing in the background) ---
+        if not show_menu_until(tasks["camera"], engine, display, timer):
+            if not engine.quit_requested:
+                print(f"Error: Camera did not open within {STARTUP_TIMEOUT:.0f}s")
+            return
+        capture = tasks.pop("camera").result()
+        if capture is None:
+            print("Error: Could not open camera")
+            return
+        timer.mark("camera")
+        engine.cam_w, engine.cam_h = capture.size
+        screen = tasks.pop("screen")
 
-        key_press = cv2.waitKey(1) & 0xFF
-        if key_press == 27:  # ESC
-            break
-        elif key_press == ord('c') and selected_mode == "KEYBOARD":  # Clear text
-            typed_text = ""
-            speak_non_blocking("Text cleared")
-
-except KeyboardInterrupt:
-    print("\nProgram interrupted by user")
-except Exception as e:
-    print(f"Error occurred: {e}")
-finally:
-    cap.release()
-    cv2.destroyAllWindows()
-    print("Program ended safely")
\ No newline at end of file
+        while True:
+            loop_start = time.perf_counter()
+            if face_mesh is None and tasks["face_mesh"].done():
+                # Out of tasks, the backend is ours to close until create_face_mesh() has wrapped it
+                backend = tasks.pop("face_mesh").result()
+                try:
+                    face_mesh = create_face_mesh(engine.cam_w, engine.cam_h, capture if not args.no_idle else None,
+                                                 metrics, track_iris=args.gaze, backend=backend)
+                except BaseException:
+                    if backend is not None:
+                        backend.close()
+                    raise
+                engine.face_mesh = face_mesh
+                engine.apply_calibration()  # Thresholds restored or learnt before FaceMesh was up
+                timer.mark("face_mesh")
+            if screen is not None and screen.done():
+                engine.screen_w, engine.screen_h = display.screen_size = screen.result()
+                screen = None
+
+            with metrics.stage("cap_read"):
+                ret, frame, frame_time = capture.read()
+            if not ret:
+                if capture.closed:
+                    if capture.failed:
+                        print("Error: Camera stopped delivering frames")
+                    break
+                # Stalled camera or a slow first frame: keep waiting, as a blocking cap.read() would (keys still work)
+                engine.handle_key_press(display.poll_key())
+                if engine.quit_requested:
+                    break
+                continue
+
+            was_selecting = engine.selected_mode is None
+            power_state = getattr(face_mesh, "state", None)
+            frame = engine.process_frame(frame, frame_time)
+            if was_selecting and engine.selected_mode is not None:
+                print(f"Starting in {engine.selected_mode} Mode...")
+            if power_state != getattr(face_mesh, "state", None):
+                print(f"Power: {power_state} -> {face_mesh.state}")
+            if face_mesh is not None:
+                timer.mark("first_inference")
+                if engine.face_found and "first_landmarks" not in timer.marks:
+                    timer.mark("first_landmarks")
+                    print(f"Startup: {timer.report()}")
+                    for name, seconds in timer.marks.items():
+                        metrics.set_gauge(f"startup_{name}_seconds", seconds)
+
+            # Only the windows due for a refresh get drawn; the display thread shows them
+            active = engine.window_names()
+            due = schedule.due(active, frame_time)
+            display.submit(engine.render(frame, due) if due else {}, active)
+            if display.first_shown is not None:
+                timer.mark("first_frame", display.first_shown)
+
+            engine.handle_key_press(display.poll_key())
+            if engine.quit_requested:
+                break
+
+            metrics.observe("frame_total", time.perf_counter() - loop_start)
+            for name, value in capture.stats().items():
+                metrics.set_gauge(f"frames_{name}_total", value)
+
+    except KeyboardInterrupt:
+        print("\nProgram interrupted by user")
+    except Exception as e:
+        print(f"Error occurred: {e}")
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if capture is not None:
+            stats = capture.stats()
+            capture.release()
+            print(f"Frames: {stats['read']} processed, {stats['dropped']} dropped, {stats['late']} late")
+        if face_mesh is not None:
+            face_mesh.close()
+        finish_startup(tasks)  # Steps that finished after an early exit
+        engine.speaker.close()
+        engine.os_input.close()
+        display.close()
+        if predictor is not None:
+            predictor.close()
+        if engine.publisher is not None:
+            engine.publisher.close()
+        if journal is not None:
+            journal.close()
+        if engine.recorder is not None:
+            engine.recorder.close()
+            print(f"Session log: {engine.recorder.records} frames -> {args.session_log} "
+                  f"({engine.recorder.dropped} dropped)")
+        cv2.destroyAllWindows()
+        if hasattr(face_mesh, "wake_latencies"):
+            print(f"Idle mode: {face_mesh.stats()}")
+        if engine.calibrator is not None:
+            print(f"Calibration: {engine.calibrator.report()}")
+            if profile:
+                engine.calibrator.save(profile)
+        if engine.gaze is not None and engine.gaze.fitted and args.profile:
+            engine.gaze.save(profile_path(CALIBRATION_DIR, f"{args.profile}.gaze"))
+        print("Program ended safely")
+
+if __name__ == "__main__":
+    main()
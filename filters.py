@@ -0,0 +1,213 @@
+"""
+Streaming 2-D smoothing filters for the nose position.
+
+Every filter has update(x, y, t) -> (x, y), a `ready` flag and reset(). Updates are
+O(1) and allocate nothing: state is kept in plain floats (and a fixed ring buffer for
+the moving average). create_filter() builds one from a (name, kwargs) config entry.
+"""
+import math
+
+
+class MovingAverageFilter:
+    """Mean of the last `window` samples, kept as running sums over a ring buffer."""
+
+    def __init__(self, window=5):
+        self.window = max(1, int(window))
+        self._xs = [0.0] * self.window
+        self._ys = [0.0] * self.window
+        self.reset()
+
+    def reset(self):
+        self._index = 0
+        self._count = 0
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._since_resum = 0
+
+    @property
+    def ready(self):
+        return self._count >= self.window
+
+    def update(self, x, y, t=None):
+        i = self._index
+        if self._count == self.window:
+            self._sum_x -= self._xs[i]
+            self._sum_y -= self._ys[i]
+        else:
+            self._count += 1
+        self._xs[i] = x
+        self._ys[i] = y
+        self._sum_x += x
+        self._sum_y += y
+        self._index = (i + 1) % self.window
+
+        # Re-sum now and then so float error can't build up over a long session
+        self._since_resum += 1
+        if self._since_resum >= 4096:
+            self._since_resum = 0
+            self._sum_x = math.fsum(self._xs[:self._count])
+            self._sum_y = math.fsum(self._ys[:self._count])
+        return self._sum_x / self._count, self._sum_y / self._count
+
+
+class ExponentialFilter:
+    """Single-pole low-pass: out += alpha * (in - out)."""
+
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = None
+
+    @property
+    def ready(self):
+        return self.x is not None
+
+    def update(self, x, y, t=None):
+        if self.x is None:
+            self.x, self.y = x, y
+        else:
+            self.x += self.alpha * (x - self.x)
+            self.y += self.alpha * (y - self.y)
+        return self.x, self.y
+
+
+def _smoothing_factor(dt, cutoff):
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al.): the cutoff rises with speed, so slow movements are
+    smoothed heavily and fast ones follow with little lag. Needs timestamps.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = None
+        self.dx = self.dy = 0.0
+        self.t = None
+
+    @property
+    def ready(self):
+        return self.x is not None
+
+    def update(self, x, y, t=None):
+        if self.x is None or t is None or self.t is None or t <= self.t:
+            if self.x is None:
+                self.x, self.y = x, y
+            self.t = t
+            return self.x, self.y
+
+        dt = t - self.t
+        self.t = t
+        a_d = _smoothing_factor(dt, self.d_cutoff)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        self.dy += a_d * ((y - self.y) / dt - self.dy)
+        speed = math.hypot(self.dx, self.dy)
+        a = _smoothing_factor(dt, self.min_cutoff + self.beta * speed)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y
+
+
+class KalmanFilter:
+    """
+    Constant-velocity Kalman filter, one independent [position, velocity] state per axis.
+
+    process_noise: acceleration noise density (units/s^2)^2/Hz; higher follows faster.
+    measurement_noise: variance of a single measurement.
+    predict: seconds to extrapolate the output along the estimated velocity, to hide
+    part of the camera + inference latency.
+    """
+
+    def __init__(self, process_noise=0.02, measurement_noise=4e-6, predict=0.0, max_dt=0.2):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.predict = predict
+        self.max_dt = max_dt
+        self.reset()
+
+    def reset(self):
+        self.t = None
+        # Per axis: position, velocity, covariance [[p00, p01], [p01, p11]]
+        self._x = [0.0, 0.0, 0.0, 0.0, 0.0]
+        self._y = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+    @property
+    def ready(self):
+        return self.t is not None
+
+    def update(self, x, y, t=None):
+        if self.t is None or t is None:
+            initial_var = self.r * 100
+            self._x[:] = [x, 0.0, initial_var, 0.0, 1.0]
+            self._y[:] = [y, 0.0, initial_var, 0.0, 1.0]
+            self.t = t if t is not None else 0.0
+            return x, y
+
+        dt = min(max(t - self.t, 0.0), self.max_dt)
+        self.t = t
+        self._step(self._x, x, dt)
+        self._step(self._y, y, dt)
+        h = self.predict
+        return self._x[0] + self._x[1] * h, self._y[0] + self._y[1] * h
+
+    def _step(self, s, z, dt):
+        pos, vel, p00, p01, p11 = s
+        # Predict
+        pos += vel * dt
+        q = self.q
+        p00 += dt * (2 * p01 + dt * p11) + q * dt ** 3 / 3
+        p01 += dt * p11 + q * dt ** 2 / 2
+        p11 += q * dt
+        # Update with the position measurement
+        innovation = z - pos
+        s_inv = 1.0 / (p00 + self.r)
+        k0 = p00 * s_inv
+        k1 = p01 * s_inv
+        pos += k0 * innovation
+        vel += k1 * innovation
+        p11 -= k1 * p01
+        p01 -= k0 * p01
+        p00 -= k0 * p00
+        s[0], s[1], s[2], s[3], s[4] = pos, vel, p00, p01, p11
+
+
+class PassthroughFilter:
+    """No smoothing (the original cursor-mode behaviour)."""
+
+    ready = True
+
+    def reset(self):
+        pass
+
+    def update(self, x, y, t=None):
+        return x, y
+
+
+FILTERS = {
+    "none": PassthroughFilter,
+    "moving_average": MovingAverageFilter,
+    "exponential": ExponentialFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def create_filter(spec):
+    """spec: "name" or ("name", {kwargs}), names as in FILTERS."""
+    if isinstance(spec, str):
+        name, kwargs = spec, {}
+    else:
+        name, kwargs = spec
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter '{name}' (choose from {', '.join(FILTERS)})")
+    return FILTERS[name](**kwargs)
@@ -0,0 +1,151 @@
+"""
+Frame-skipping FaceMesh with optical-flow landmark propagation.
+
+FaceMesh runs on every Nth frame (a keyframe). In between, only the landmarks the
+detector actually uses (both eyes + nose tip) are tracked with pyramidal Lucas-Kanade
+on a grayscale image; the rest of the mesh is shifted by the median motion. Inference
+is forced again as soon as the flow looks unreliable or a blink is starting.
+"""
+import cv2
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, FaceLandmarks, LandmarkResults, landmarks_to_array
+
+
+class FlowFaceMesh:
+    """
+    Wraps a FaceMesh backend (FaceMesh, FaceMeshWorker or RoiFaceMesh) with the same process() API.
+
+    points: landmark indices to track. The first 12 must be the two 6-point eye
+    contours (LEFT_EYE + RIGHT_EYE order) so blinks can be spotted between keyframes.
+    """
+
+    def __init__(self, face_mesh, frame_size, points, every_n=3, max_error=12.0,
+                 blink_ratio=3.6, win_size=21, levels=3):
+        self.face_mesh = face_mesh
+        self.frame_w, self.frame_h = frame_size
+        self.points = np.asarray(points, dtype=np.intp)
+        self.every_n = max(1, every_n)
+        self.max_error = max_error
+        self.blink_ratio = blink_ratio
+        self.pipelined = getattr(face_mesh, "pipelined", False)
+        self._lk_params = dict(winSize=(win_size, win_size), maxLevel=levels,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+        shape = (self.frame_h, self.frame_w)
+        self._grays = [np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8)]
+        self._gray_index = 0
+        self._prev_gray = None
+        # Frames submitted at the last two keyframes (pipelined backends answer one keyframe late)
+        self._key_grays = [np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8)]
+        self._key_index = 0
+        self._scale = np.array([self.frame_w, self.frame_h], dtype=np.float32)
+        self._pts = np.empty((len(self.points), 1, 2), dtype=np.float32)
+        self._out = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._face = FaceLandmarks(self._out)
+        self._has_face = False
+        self._since_key = 0
+        self._force_key = True
+
+        # Counters
+        self.keyframes = 0
+        self.flow_frames = 0
+        self.reanchors = 0  # keyframes forced early by flow error or a blink
+
+    def process(self, rgb_frame, timestamp=None):
+        gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY, dst=self._next_gray())
+        return self._run(rgb_frame, gray, timestamp, bgr=False)
+
+    def process_bgr(self, bgr_frame, timestamp=None):
+        gray = cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2GRAY, dst=self._next_gray())
+        return self._run(bgr_frame, gray, timestamp, bgr=True)
+
+    def close(self):
+        self.face_mesh.close()
+
+    # --- Internals ---
+
+    def _next_gray(self):
+        self._gray_index ^= 1
+        return self._grays[self._gray_index]
+
+    def _run(self, frame, gray, timestamp, bgr):
+        prev_gray = self._prev_gray
+        self._prev_gray = gray
+
+        if self._has_face and not self._force_key and self._since_key < self.every_n - 1:
+            if self._track(prev_gray, gray):
+                self._since_key += 1
+                self.flow_frames += 1
+                return LandmarkResults([self._face], timestamp)
+            self.reanchors += 1
+
+        try:
+            return self._keyframe(frame, gray, timestamp, bgr)
+        except Exception:
+            # The backend dropped this frame (e.g. serving.FrameDropped): track on as if it never came
+            self._prev_gray = prev_gray
+            self._gray_index ^= 1
+            raise
+
+    def _keyframe(self, frame, gray, timestamp, bgr):
+        if bgr and hasattr(self.face_mesh, "process_bgr"):
+            results = self.face_mesh.process_bgr(frame, timestamp)
+        elif bgr:
+            results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        else:
+            results = self.face_mesh.process(frame)
+        self.keyframes += 1
+        self._since_key = 0
+
+        # With a pipelined backend the landmarks belong to the previous keyframe's image
+        source_gray = None
+        if self.pipelined:
+            source_gray = self._key_grays[self._key_index]
+            self._key_index ^= 1
+            np.copyto(self._key_grays[self._key_index], gray)
+
+        if not results.multi_face_landmarks:
+            self._has_face = False
+            self._force_key = True
+            return results
+
+        landmarks_to_array(results.multi_face_landmarks[0], self._out)
+        np.multiply(self._out[self.points, :2], self._scale, out=self._pts[:, 0, :])
+        self._has_face = True
+        self._force_key = self._blinking()
+
+        if source_gray is not None:
+            if self._track(source_gray, gray):
+                return LandmarkResults([self._face], timestamp)  # Carried forward to this frame
+            self._force_key = True  # Keep the stale landmarks this once, re-infer next frame
+        return LandmarkResults([self._face], getattr(results, "timestamp", timestamp))
+
+    def _track(self, prev_gray, gray):
+        """Moves the tracked points from prev_gray to gray. Returns False if the flow is unreliable."""
+        next_pts, status, err = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self._pts, None, **self._lk_params)
+        if next_pts is None or not status.all() or float(err.max()) > self.max_error:
+            self._force_key = True
+            return False
+
+        # Rest of the mesh follows the median motion of the tracked points
+        shift = np.median(next_pts[:, 0, :] - self._pts[:, 0, :], axis=0) / self._scale
+        self._out[:, 0] += shift[0]
+        self._out[:, 1] += shift[1]
+        self._pts[:] = next_pts
+        self._out[self.points, :2] = next_pts[:, 0, :] / self._scale
+
+        if self._blinking():
+            self._force_key = True  # Eyelids move too fast for flow; let FaceMesh see the blink
+        return True
+
+    def _blinking(self):
+        """True when either eye's horizontal/vertical ratio suggests a blink is starting."""
+        # Normalized coordinates, same space as eye_detector.blink_ratio()
+        p = self._out[self.points[:12], :2]
+        for eye in (p[:6], p[6:12]):
+            horizontal = np.hypot(*(eye[0] - eye[3]))
+            vertical = (np.hypot(*(eye[1] - eye[5])) + np.hypot(*(eye[2] - eye[4]))) / 2
+            if vertical == 0 or horizontal / vertical > self.blink_ratio:
+                return True
+        return False
@@ -0,0 +1,193 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """Preallocated frame slots that always hand the reader the newest frame."""
+
+    def __init__(self, width, height, slots=3, late_after=0.1):
+        if slots < 3:
+            # Writer needs one free slot while the reader holds one and another is the latest
+            raise ValueError("FrameRingBuffer needs at least 3 slots")
+        self._slots = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(slots)]
+        self._stamps = [0.0] * slots
+        self._seq = [0] * slots
+        self._cond = threading.Condition()
+        self._latest = -1       # slot with the newest complete frame
+        self._reading = -1      # slot currently handed to the reader
+        self._writing = -1      # slot currently being filled by the writer
+        self._next_seq = 0
+        self._last_read_seq = -1
+        self._closed = False
+        self.late_after = late_after
+
+        # Counters
+        self.frames_written = 0
+        self.frames_read = 0
+        self.dropped_frames = 0  # overwritten before the reader ever saw them
+        self.late_frames = 0     # older than late_after when handed to the reader
+
+    def acquire_write_slot(self):
+        """Returns (index, array) of a slot the writer can fill without racing the reader."""
+        with self._cond:
+            for i in range(len(self._slots)):
+                if i != self._latest and i != self._reading:
+                    self._writing = i
+                    return i, self._slots[i]
+        raise RuntimeError("No free frame slot")  # unreachable with >= 3 slots
+
+    def commit(self, index, timestamp, frame=None):
+        """Publishes a filled slot as the newest frame."""
+        with self._cond:
+            if frame is not None and frame is not self._slots[index]:
+                # Camera handed back a new array (size/format change): adopt it as the slot
+                self._slots[index] = frame
+            if self._latest != -1 and self._seq[self._latest] > self._last_read_seq:
+                self.dropped_frames += 1
+            self._stamps[index] = timestamp
+            self._seq[index] = self._next_seq
+            self._next_seq += 1
+            self._latest = index
+            self._writing = -1
+            self.frames_written += 1
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Waits for a frame newer than the last one read.
+        Returns: (ok, frame, timestamp). The frame is only valid until the next read().
+        ok is False on a timeout as well as once closed; `closed` tells them apart.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._closed and (self._latest == -1 or self._seq[self._latest] <= self._last_read_seq):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False, None, 0.0
+                self._cond.wait(remaining)
+            if self._latest == -1 or self._seq[self._latest] <= self._last_read_seq:
+                return False, None, 0.0
+
+            index = self._latest
+            self._reading = index
+            self._last_read_seq = self._seq[index]
+            timestamp = self._stamps[index]
+            self.frames_read += 1
+            if time.time() - timestamp > self.late_after:
+                self.late_frames += 1
+            return True, self._slots[index], timestamp
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        return {
+            "written": self.frames_written,
+            "read": self.frames_read,
+            "dropped": self.dropped_frames,
+            "late": self.late_frames,
+        }
+
+
+class CameraCapture:
+    """
+    Reads the camera on its own thread into a FrameRingBuffer.
+    read() has the same (ret, frame) shape as cv2.VideoCapture.read() plus the capture timestamp,
+    but gives up after a timeout: ret is False then too, and `closed` says whether more frames can come.
+    set_interval() lowers the published frame rate (idle mode): the camera keeps streaming
+    so frames stay fresh, but in-between frames are only grabbed, never decoded.
+    """
+
+    def __init__(self, cap, slots=3, late_after=0.1):
+        self.cap = cap
+        width = int(cap.get(3)) or 640   # cv2.CAP_PROP_FRAME_WIDTH
+        height = int(cap.get(4)) or 480  # cv2.CAP_PROP_FRAME_HEIGHT
+        self.size = (width, height)
+        self.buffer = FrameRingBuffer(width, height, slots=slots, late_after=late_after)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._release_on_exit = False
+        self.failed = False
+        self.interval = 0.0
+        self._last_publish = 0.0
+
+        # Counters
+        self.skipped = 0  # grabbed but not decoded (interval)
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._capture()
+        finally:
+            self.buffer.close()
+            with self._lock:
+                self._running = False
+                release = self._release_on_exit
+            if release:
+                self.cap.release()
+
+    def _capture(self):
+        while not self._stop.is_set():
+            if not self.cap.grab():
+                self.failed = True
+                break
+            now = time.time()
+            if self.interval and now - self._last_publish < self.interval:
+                self.skipped += 1
+                continue
+            index, slot = self.buffer.acquire_write_slot()
+            # Decode straight into the preallocated slot
+            ret, frame = self.cap.retrieve(slot)
+            if not ret:
+                self.failed = True
+                break
+            self._last_publish = now
+            self.buffer.commit(index, now, frame)
+
+    def read(self, timeout=1.0):
+        """Returns: (ret, frame, timestamp) for the newest unseen frame."""
+        return self.buffer.read(timeout)
+
+    @property
+    def closed(self):
+        """True once the capture thread has stopped (released, or the camera failed): read() won't succeed again."""
+        return self.buffer.closed
+
+    def set_interval(self, seconds):
+        """Publish at most one frame per `seconds` (0 = every camera frame)."""
+        self.interval = seconds
+
+    def stats(self):
+        return self.buffer.stats()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.buffer.close()
+
+    def release(self):
+        self.stop()
+        with self._lock:
+            if self._running:
+                # Still inside grab() (a hung camera): releasing now would pull the device from under
+                # it, so the thread releases it on its way out
+                self._release_on_exit = True
+                return
+        self.cap.release()
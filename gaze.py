@@ -0,0 +1,315 @@
+"""
+Gaze cursor: the pointer goes where the eyes look, not where the nose is.
+
+FaceMesh with refine_landmarks=True already finds the iris centres (468, 473). From
+them, the eye corners and the nose tip GazeFeatures computes six numbers per frame:
+
+- gaze_x, gaze_y: iris offset from the middle of the eye, along and across the
+  corner-to-corner axis, in eye widths (so head roll and camera distance cancel),
+  averaged over both eyes,
+- yaw, pitch: nose tip relative to the midpoint between the eyes, in inter-ocular
+  distances (head rotation),
+- head_x, head_y: nose tip in the frame (head position).
+
+GazeModel maps them to normalized screen coordinates with a polynomial: every term up
+to `degree` in the iris offsets plus linear head terms. Fitting is one ridge-regularized
+least-squares solve over all calibration samples; per frame it is a gather, a product
+over the term factors and one (terms x 2) matrix multiply. GazeCalibration walks the
+user through a grid of dots and collects the samples.
+"""
+import itertools
+import json
+import os
+
+import cv2
+import numpy as np
+
+from landmarks import LEFT_EYE, LEFT_IRIS, NOSE_TIP, RIGHT_EYE, RIGHT_IRIS
+
+# Rows read per frame: both corners of each eye, the iris centres, the nose tip
+GAZE_POINTS = [LEFT_EYE[0], LEFT_EYE[3], RIGHT_EYE[0], RIGHT_EYE[3], LEFT_IRIS, RIGHT_IRIS, NOSE_TIP]
+FEATURES = ["gaze_x", "gaze_y", "yaw", "pitch", "head_x", "head_y"]
+N_GAZE = 2  # Leading features that get the full polynomial
+
+
+class GazeFeatures:
+    """Per-frame FEATURES into a preallocated vector; nothing is allocated per frame."""
+
+    def __init__(self):
+        self.points = np.array(GAZE_POINTS, dtype=np.intp)
+        # x, y of each point as offsets into a flattened (N, 3) landmark array
+        self._flat = (self.points[:, None] * 3 + np.arange(2)).ravel()
+        self.coords = np.zeros((len(GAZE_POINTS), 2), dtype=np.float32)
+        self.vector = np.zeros(len(FEATURES), dtype=np.float64)
+
+    def update(self, face):
+        array = getattr(face, "array", None)
+        if array is not None and array.dtype == np.float32 and array.flags.c_contiguous:
+            np.take(array.reshape(-1), self._flat, out=self.coords.reshape(-1))
+        elif array is not None:
+            self.coords[:] = array[self.points, :2]
+        else:
+            points = face.landmark
+            for row, index in enumerate(GAZE_POINTS):
+                p = points[index]
+                self.coords[row, 0] = p.x
+                self.coords[row, 1] = p.y
+
+        (lax, lay), (lbx, lby), (rax, ray), (rbx, rby), (lix, liy), (rix, riy), (nx, ny) = self.coords.tolist()
+        l_along, l_across, lmx, lmy = _eye(lax, lay, lbx, lby, lix, liy)
+        r_along, r_across, rmx, rmy = _eye(rax, ray, rbx, rby, rix, riy)
+        fx, fy = rmx - lmx, rmy - lmy
+        f2 = fx * fx + fy * fy or 1e-12
+        ox, oy = nx - (lmx + rmx) / 2, ny - (lmy + rmy) / 2
+
+        v = self.vector
+        v[0] = (l_along + r_along) / 2
+        v[1] = (l_across + r_across) / 2
+        v[2] = (ox * fx + oy * fy) / f2
+        v[3] = (oy * fx - ox * fy) / f2
+        v[4] = nx
+        v[5] = ny
+        return v
+
+
+def _eye(ax, ay, bx, by, ix, iy):
+    """Iris offset along / across the corner axis in eye widths, plus the eye centre."""
+    dx, dy = bx - ax, by - ay
+    w2 = dx * dx + dy * dy or 1e-12
+    mx, my = (ax + bx) / 2, (ay + by) / 2
+    ox, oy = ix - mx, iy - my
+    return (ox * dx + oy * dy) / w2, (oy * dx - ox * dy) / w2, mx, my
+
+
+def batch_gaze_features(points):
+    """
+    Offline GazeFeatures for many frames at once.
+    points: (frames, 478, 2|3) full meshes or (frames, 7, 2|3) in GAZE_POINTS order.
+    Returns: (frames, 6) float64 FEATURES.
+    """
+    points = np.asarray(points)
+    if points.shape[1] != len(GAZE_POINTS):
+        points = points[:, GAZE_POINTS]
+    xy = points[..., :2].astype(np.float64)
+    a, b, iris, nose = xy[:, [0, 2]], xy[:, [1, 3]], xy[:, [4, 5]], xy[:, 6]
+    axis = b - a                                       # (frames, eye, 2)
+    w2 = np.maximum(np.einsum("fek,fek->fe", axis, axis), 1e-12)
+    mid = (a + b) / 2
+    offset = iris - mid
+    along = np.einsum("fek,fek->fe", offset, axis) / w2
+    across = (offset[..., 1] * axis[..., 0] - offset[..., 0] * axis[..., 1]) / w2
+
+    face_axis = mid[:, 1] - mid[:, 0]
+    f2 = np.maximum(np.einsum("fk,fk->f", face_axis, face_axis), 1e-12)
+    rel = nose - mid.mean(axis=1)
+
+    out = np.empty((len(xy), len(FEATURES)))
+    out[:, 0] = along.mean(axis=1)
+    out[:, 1] = across.mean(axis=1)
+    out[:, 2] = np.einsum("fk,fk->f", rel, face_axis) / f2
+    out[:, 3] = (rel[:, 1] * face_axis[:, 0] - rel[:, 0] * face_axis[:, 1]) / f2
+    out[:, 4:] = nose
+    return out
+
+
+def _terms(degree, n_features, n_gaze):
+    """
+    Monomials as rows of `degree` indices into [features..., 1]: every product of up to
+    `degree` gaze features, then each head feature alone.
+    """
+    one = n_features
+    terms = list(itertools.combinations_with_replacement(list(range(n_gaze)) + [one], degree))
+    terms += [(j,) + (one,) * (degree - 1) for j in range(n_gaze, n_features)]
+    return np.array(terms, dtype=np.intp)
+
+
+class GazeModel:
+    """Polynomial map from FEATURES to normalized screen (x, y): fit() per calibration, predict() per frame."""
+
+    def __init__(self, degree=2, ridge=1e-3, n_features=len(FEATURES), n_gaze=N_GAZE):
+        self.degree = degree
+        self.ridge = ridge
+        self.n_gaze = n_gaze
+        self.terms = _terms(degree, n_features, n_gaze)
+        self.mean = np.zeros(n_features)
+        self.scale = np.ones(n_features)
+        self.coef = None          # (terms, 2)
+        self.error = None         # leave-one-target-out RMS accuracy after fit(), in screen fractions
+        self._f = np.ones(n_features + 1)
+        self._columns = np.ascontiguousarray(self.terms.T)   # factor k of every term, per row
+        self._factors = np.empty(self._columns.shape)
+        self._phi = np.empty(len(self.terms))
+        self._xy = np.empty(2)
+
+    @property
+    def fitted(self):
+        return self.coef is not None
+
+    def design(self, features):
+        """(n, features) -> (n, terms) design matrix, standardized like predict()."""
+        f = np.empty((len(features), len(self.mean) + 1))
+        np.divide(features - self.mean, self.scale, out=f[:, :-1])
+        f[:, -1] = 1.0
+        return f[:, self.terms].prod(axis=2)
+
+    def fit(self, features, targets, groups=None):
+        """
+        features: (n, 6) samples, targets: (n, 2) screen points they were looking at.
+        groups: target index per sample; enables the leave-one-target-out error estimate.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        targets = np.asarray(targets, dtype=np.float64)
+        self.mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        self.scale = np.where(scale > 1e-9, scale, 1.0)
+        phi = self.design(features)
+        self.coef = self._solve(phi, targets)
+        if groups is not None:
+            groups = np.asarray(groups)
+            errors = []
+            for g in np.unique(groups):
+                held = groups == g
+                coef = self._solve(phi[~held], targets[~held])
+                # Accuracy (bias at the held-out dot); frame-to-frame spread is the cursor filter's job
+                errors.append(np.linalg.norm((phi[held] @ coef).mean(axis=0) - targets[held][0]))
+            self.error = float(np.sqrt(np.mean(np.square(errors))))
+        return self
+
+    def _solve(self, phi, targets):
+        # Ridge on everything but the constant term; scaled by n so the strength doesn't depend on dwell length
+        penalty = np.full(len(self.terms), self.ridge * len(phi))
+        penalty[(self.terms == len(self.mean)).all(axis=1)] = 0.0
+        gram = phi.T @ phi
+        gram[np.diag_indices_from(gram)] += penalty
+        return np.linalg.solve(gram, phi.T @ targets)
+
+    def predict(self, features):
+        """One frame's FEATURES -> (x, y), normalized screen coordinates (not clamped)."""
+        f = self._f
+        np.subtract(features, self.mean, out=f[:-1])
+        np.divide(f[:-1], self.scale, out=f[:-1])
+        np.take(f, self._columns, out=self._factors)
+        np.copyto(self._phi, self._factors[0])
+        for factor in self._factors[1:]:
+            np.multiply(self._phi, factor, out=self._phi)
+        np.dot(self._phi, self.coef, out=self._xy)
+        return float(self._xy[0]), float(self._xy[1])
+
+    def predict_batch(self, features):
+        return self.design(np.asarray(features, dtype=np.float64)) @ self.coef
+
+    # --- Profiles ---
+
+    def save(self, path):
+        state = {
+            "degree": self.degree,
+            "ridge": self.ridge,
+            "n_gaze": self.n_gaze,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "error": self.error,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restores a fitted model; returns False (leaving it unfitted) if there is none."""
+        if not os.path.exists(path):
+            return False
+        with open(path) as f:
+            state = json.load(f)
+        self.__init__(state["degree"], state["ridge"], len(state["mean"]), state["n_gaze"])  # Rebuilds the term buffers
+        self.mean = np.array(state["mean"])
+        self.scale = np.array(state["scale"])
+        self.coef = np.array(state["coef"])
+        self.error = state["error"]
+        return True
+
+
+class GazeCalibration:
+    """
+    Shows grid targets one at a time (columns x rows, snake order). For each, the first
+    `settle` seconds are skipped (saccade, head catching up) and the next `dwell`
+    seconds are collected, except while the eyes are closed. The model is fitted to
+    means of `average` frames: with single frames the iris jitter would pull the fitted
+    map toward the screen centre (noise in the inputs shrinks least-squares slopes).
+    """
+
+    def __init__(self, grid=(4, 3), margin=0.08, settle=0.6, dwell=1.0, average=8):
+        cols, rows = grid
+        xs = np.linspace(margin, 1 - margin, cols)
+        ys = np.linspace(margin, 1 - margin, rows)
+        self.targets = np.array([(x, y) for r, y in enumerate(ys) for x in (xs if r % 2 == 0 else xs[::-1])])
+        self.settle = settle
+        self.dwell = dwell
+        self.average = average
+        self.index = 0
+        self._since = None
+        self._now = None
+        self._samples = []
+        self._groups = []
+
+    @property
+    def done(self):
+        return self.index >= len(self.targets)
+
+    @property
+    def target(self):
+        """Normalized screen point to look at, None when done."""
+        return None if self.done else tuple(self.targets[self.index])
+
+    def update(self, features, t, eyes_open=True):
+        """Adds this frame's features; returns True once every target has been shown."""
+        if self.done:
+            return True
+        if self._since is None:
+            self._since = t
+        self._now = t
+        elapsed = t - self._since
+        if elapsed >= self.settle and eyes_open:
+            self._samples.append(features.copy())
+            self._groups.append(self.index)
+        if elapsed >= self.settle + self.dwell:
+            self.index += 1
+            self._since = t
+        return self.done
+
+    def fit(self, model, min_targets=None):
+        """Fits model to the collected samples; None if too few targets got any."""
+        if not self._samples:
+            return None
+        features = np.array(self._samples)
+        groups = np.array(self._groups)
+        if len(np.unique(groups)) < (min_targets or max(4, len(self.targets) * 2 // 3)):
+            return None
+        means, mean_groups = [], []
+        for g in np.unique(groups):
+            # Drop glances away from the dot (far from this target's median iris offset), then average runs
+            rows = features[groups == g]
+            dist = np.abs(rows[:, :N_GAZE] - np.median(rows[:, :N_GAZE], axis=0)).sum(axis=1)
+            rows = rows[dist <= 3 * np.median(dist) + 1e-9]
+            for chunk in np.array_split(rows, max(1, len(rows) // self.average)):
+                means.append(chunk.mean(axis=0))
+                mean_groups.append(g)
+        mean_groups = np.array(mean_groups)
+        return model.fit(np.array(means), self.targets[mean_groups], mean_groups)
+
+    def render(self, size):
+        """Black canvas of `size` (w, h) with the current dot; the ring shrinks while samples are taken."""
+        w, h = size
+        img = np.zeros((h, w, 3), dtype=np.uint8)
+        if self.done:
+            return img
+        x, y = self.targets[self.index]
+        center = (int(x * w), int(y * h))
+        elapsed = 0.0 if self._since is None else self._now - self._since
+        progress = min(max((elapsed - self.settle) / self.dwell, 0.0), 1.0)
+        cv2.circle(img, center, int(6 + 24 * (1 - progress)), (0, 255, 255), 2)
+        cv2.circle(img, center, 5, (0, 0, 255), -1)
+        cv2.putText(img, f"Look at the dot ({self.index + 1}/{len(self.targets)})", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return img
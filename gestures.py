@@ -0,0 +1,163 @@
+"""
+Table-driven eye gesture recognition.
+
+Channels say when "the eyes are closed" in some sense (both eyes, left only, ...) from the
+two eye ratios; gestures say which closures count (how long, released or held, single or
+double). GestureRecognizer.update() is O(1) per frame, allocates nothing and returns a
+bitmask of the gestures that fired on that frame, so hours of recorded ratios replay in
+seconds (see replay()).
+"""
+import math
+
+INF = math.inf
+
+
+class Channel:
+    """A closure condition: left/right ratio above *_above and below *_below."""
+    __slots__ = ("name", "left_above", "right_above", "left_below", "right_below")
+
+    def __init__(self, name, left_above=-INF, right_above=-INF, left_below=INF, right_below=INF):
+        self.name = name
+        self.left_above = left_above
+        self.right_above = right_above
+        self.left_below = left_below
+        self.right_below = right_below
+
+
+class Gesture:
+    """
+    trigger="release": fires when the channel opens after min..max seconds closed.
+    trigger="hold": fires once while still closed, as soon as min seconds have passed.
+    count=2 with max_gap: two qualifying releases, the second closing within max_gap
+    seconds of the first one's release (double blink).
+    """
+    __slots__ = ("name", "channel", "trigger", "min_duration", "max_duration", "count", "max_gap")
+
+    def __init__(self, name, channel, trigger="release", min_duration=0.0, max_duration=INF,
+                 count=1, max_gap=0.5):
+        self.name = name
+        self.channel = channel
+        self.trigger = trigger
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.count = count
+        self.max_gap = max_gap
+
+
+class GestureRecognizer:
+    """Consumes (left_ratio, right_ratio, t) per frame; update() returns a bitmask of fired gestures."""
+
+    def __init__(self, channels, gestures):
+        # Own copies: thresholds get rescaled per user (scale_thresholds)
+        self.channels = [Channel(c.name, c.left_above, c.right_above, c.left_below, c.right_below)
+                         for c in channels]
+        self._configured = [(c.left_above, c.right_above, c.left_below, c.right_below) for c in self.channels]
+        self.gestures = list(gestures)
+        channel_index = {c.name: i for i, c in enumerate(self.channels)}
+        self._gesture_channel = [channel_index[g.channel] for g in self.gestures]
+        self.bits = {g.name: 1 << i for i, g in enumerate(self.gestures)}
+
+        n = len(self.channels)
+        self.closed = [False] * n
+        self.closed_since = [0.0] * n
+        self._released_duration = [0.0] * n  # duration of the closure that ended this frame
+        self._just_released = [False] * n
+
+        m = len(self.gestures)
+        self._held = [False] * m          # hold gesture already fired for the current closure
+        self._streak = [0] * m            # qualifying releases so far (double blink)
+        self._last_release = [-INF] * m
+        # Last event per gesture
+        self.event_time = [0.0] * m
+        self.event_duration = [0.0] * m
+        self.counts = [0] * m
+
+    def bit(self, name):
+        return self.bits[name]
+
+    def channel(self, name):
+        """Index of a channel, for closed[] and closed_for()."""
+        for i, c in enumerate(self.channels):
+            if c.name == name:
+                return i
+        raise KeyError(name)
+
+    def closed_for(self, channel, t):
+        """Seconds channel (index) has been closed at time t; 0 if it is open."""
+        return t - self.closed_since[channel] if self.closed[channel] else 0.0
+
+    def scale_thresholds(self, factor):
+        """Sets every ratio threshold to factor x its configured value (per-user calibration)."""
+        for c, (la, ra, lb, rb) in zip(self.channels, self._configured):
+            c.left_above, c.right_above = la * factor, ra * factor
+            c.left_below, c.right_below = lb * factor, rb * factor
+
+    def reset(self):
+        for i in range(len(self.channels)):
+            self.closed[i] = False
+            self._just_released[i] = False
+        for j in range(len(self.gestures)):
+            self._held[j] = False
+            self._streak[j] = 0
+            self._last_release[j] = -INF
+
+    def update(self, left, right, t):
+        for i, c in enumerate(self.channels):
+            now_closed = (c.left_above < left < c.left_below) and (c.right_above < right < c.right_below)
+            self._just_released[i] = False
+            if now_closed and not self.closed[i]:
+                self.closed[i] = True
+                self.closed_since[i] = t
+            elif not now_closed and self.closed[i]:
+                self.closed[i] = False
+                self._just_released[i] = True
+                self._released_duration[i] = t - self.closed_since[i]
+
+        fired = 0
+        for j, g in enumerate(self.gestures):
+            i = self._gesture_channel[j]
+            if g.trigger == "hold":
+                if self.closed[i]:
+                    duration = t - self.closed_since[i]
+                    if not self._held[j] and duration >= g.min_duration:
+                        self._held[j] = True
+                        fired |= self._fire(j, t, duration)
+                else:
+                    self._held[j] = False
+            elif self._just_released[i]:
+                duration = self._released_duration[i]
+                if not (g.min_duration <= duration <= g.max_duration):
+                    self._streak[j] = 0
+                    continue
+                if g.count == 1:
+                    fired |= self._fire(j, t, duration)
+                    continue
+                # Multi-blink: the gap is from the previous release to this closure's start
+                if self._streak[j] and self.closed_since[i] - self._last_release[j] > g.max_gap:
+                    self._streak[j] = 0
+                self._streak[j] += 1
+                self._last_release[j] = t
+                if self._streak[j] >= g.count:
+                    self._streak[j] = 0
+                    fired |= self._fire(j, t, duration)
+        return fired
+
+    def _fire(self, j, t, duration):
+        self.event_time[j] = t
+        self.event_duration[j] = duration
+        self.counts[j] += 1
+        return 1 << j
+
+
+def replay(recognizer, times, left, right):
+    """Runs recorded ratios through the recognizer. Returns [(t, gesture name, duration)]."""
+    events = []
+    names = [g.name for g in recognizer.gestures]
+    update = recognizer.update
+    for t, l, r in zip(times.tolist(), left.tolist(), right.tolist()):
+        fired = update(l, r, t)
+        if fired:
+            for j, name in enumerate(names):
+                if fired >> j & 1:
+                    events.append((t, name, recognizer.event_duration[j]))
+    return events
@@ -0,0 +1,193 @@
+"""
+FaceMesh inference in a separate process.
+
+Frames and landmark results live in multiprocessing.shared_memory blocks; only a few
+bytes per frame (slot index, timestamp, face found) travel over the worker's stdin/stdout.
+The worker is started as `python inference_worker.py ...` rather than through
+multiprocessing so it never re-imports eye_detector.py.
+"""
+import os
+import struct
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, FaceLandmarks, LandmarkResults
+
+_REQUEST = struct.Struct("<BdHH")  # slot, frame timestamp, height, width
+_RESPONSE = struct.Struct("<Bd?")  # slot, frame timestamp, face found
+_READY = b"R"
+
+
+class FaceMeshWorker:
+    """
+    Drop-in replacement for FaceMesh.process() backed by a worker process.
+
+    With pipelined=True, process() hands frame N to the worker and returns the
+    landmarks of frame N-1, so inference of the next frame overlaps with acting on
+    the current one. Returned results are only valid until the next process() call.
+    Frames may be any size up to (height, width); smaller ones (e.g. face crops) are
+    sent as-is.
+    """
+
+    def __init__(self, width, height, slots=2, pipelined=False, **face_mesh_kwargs):
+        self.shape = (height, width, 3)
+        self.slots = slots
+        self.pipelined = pipelined
+        self.face_mesh_kwargs = face_mesh_kwargs
+        self._proc = None
+        self._frames_shm = None
+        self._results_shm = None
+        self._frames = None
+        self._results = None
+        self._next_slot = 0
+        self._in_flight = []  # slots submitted but not collected, oldest first
+
+    # --- Lifecycle ---
+
+    def start(self, timeout=30.0):
+        frame_bytes = int(np.prod(self.shape))
+        self._frames_shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self._results_shm = shared_memory.SharedMemory(
+            create=True, size=self.slots * NUM_LANDMARKS * 3 * 4)
+        self._frames = np.ndarray((self.slots, frame_bytes), dtype=np.uint8, buffer=self._frames_shm.buf)
+        self._results = np.ndarray((self.slots, NUM_LANDMARKS, 3), dtype=np.float32,
+                                   buffer=self._results_shm.buf)
+
+        args = [
+            sys.executable, os.path.abspath(__file__),
+            self._frames_shm.name, self._results_shm.name,
+            str(self.shape[1]), str(self.shape[0]), str(self.slots),
+            repr(self.face_mesh_kwargs),
+        ]
+        self._proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        if self._proc.stdout.read(1) != _READY:
+            self.close()
+            raise RuntimeError("FaceMesh worker failed to start")
+        return self
+
+    def close(self):
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=2.0)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+        # Drop numpy views before releasing the shared buffers
+        self._frames = None
+        self._results = None
+        for shm in (self._frames_shm, self._results_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._frames_shm = self._results_shm = None
+        self._in_flight = []
+
+    # --- Inference ---
+
+    def input_buffer(self, height=None, width=None):
+        """Shared-memory slot the next frame should be written into (e.g. as cv2.cvtColor dst)."""
+        height = height or self.shape[0]
+        width = width or self.shape[1]
+        return self._frames[self._next_slot][:height * width * 3].reshape(height, width, 3)
+
+    def submit(self, rgb_frame, timestamp=0.0):
+        """Queues a frame for inference without waiting for the result."""
+        slot = self._next_slot
+        height, width = rgb_frame.shape[:2]
+        if height > self.shape[0] or width > self.shape[1] or rgb_frame.ndim != 3 or rgb_frame.shape[2] != 3:
+            raise ValueError(f"Frame shape {rgb_frame.shape} does not fit worker shape {self.shape}")
+        target = self._frames[slot][:height * width * 3].reshape(height, width, 3)
+        if not np.may_share_memory(rgb_frame, target):
+            np.copyto(target, rgb_frame)
+        self._proc.stdin.write(_REQUEST.pack(slot, timestamp, height, width))
+        self._proc.stdin.flush()
+        self._in_flight.append(slot)
+        self._next_slot = (slot + 1) % self.slots
+        return slot
+
+    def collect(self):
+        """Waits for the oldest in-flight frame and returns its LandmarkResults."""
+        expected = self._in_flight.pop(0)
+        data = self._proc.stdout.read(_RESPONSE.size)
+        if len(data) != _RESPONSE.size:
+            raise RuntimeError("FaceMesh worker exited unexpectedly")
+        slot, timestamp, found = _RESPONSE.unpack(data)
+        if slot != expected:
+            raise RuntimeError(f"FaceMesh worker answered slot {slot}, expected {expected}")
+        faces = [FaceLandmarks(self._results[slot])] if found else None
+        return LandmarkResults(faces, timestamp)
+
+    def process(self, rgb_frame, timestamp=0.0):
+        """Same call shape as FaceMesh.process(); one frame behind when pipelined."""
+        self.submit(rgb_frame, timestamp)
+        if self.pipelined and len(self._in_flight) < 2:
+            # Pipeline is still filling: nothing finished yet
+            return LandmarkResults(None, None)
+        return self.collect()
+
+
+# --- WORKER PROCESS ---
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # The parent owns the block; stop this process's tracker from unlinking it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _worker_main(argv):
+    import ast
+    frames_name, results_name, width, height, slots, kwargs = argv
+    width, height, slots = int(width), int(height), int(slots)
+
+    # Keep the protocol on the original stdout; anything the libraries print goes to stderr
+    proto_out = os.fdopen(os.dup(1), "wb", 0)
+    os.dup2(2, 1)
+    proto_in = sys.stdin.buffer
+
+    import mediapipe as mp  # type: ignore
+    face_mesh = mp.solutions.face_mesh.FaceMesh(**ast.literal_eval(kwargs))
+
+    frames_shm = _attach(frames_name)
+    results_shm = _attach(results_name)
+    frames = np.ndarray((slots, height * width * 3), dtype=np.uint8, buffer=frames_shm.buf)
+    results = np.ndarray((slots, NUM_LANDMARKS, 3), dtype=np.float32, buffer=results_shm.buf)
+    proto_out.write(_READY)
+
+    while True:
+        data = proto_in.read(_REQUEST.size)
+        if len(data) != _REQUEST.size:
+            break  # Parent closed the pipe
+        slot, timestamp, h, w = _REQUEST.unpack(data)
+        found = False
+        output = face_mesh.process(frames[slot][:h * w * 3].reshape(h, w, 3))
+        if output.multi_face_landmarks:
+            points = output.multi_face_landmarks[0].landmark
+            out = results[slot]
+            n = min(len(points), NUM_LANDMARKS)
+            for i in range(n):
+                p = points[i]
+                out[i, 0] = p.x
+                out[i, 1] = p.y
+                out[i, 2] = p.z
+            # Without refine_landmarks there are no iris points: zeros, not the slot's last face
+            out[n:] = 0.0
+            found = True
+        proto_out.write(_RESPONSE.pack(slot, timestamp, found))
+
+    face_mesh.close()
+    del frames, results
+    frames_shm.close()
+    results_shm.close()
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1:])
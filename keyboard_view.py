@@ -0,0 +1,178 @@
+"""
+Pre-rendered keyboard images.
+
+A KeyboardView draws its layout once into a base image. Highlighted keys are small
+tiles cut from full renders (made on first use and memoized), so a frame only copies
+in the keys whose state changed and redraws the typed-text area when the text changes.
+Per-frame cost depends on what changed, not on how many keys the layout has.
+Dynamic keys (word suggestions) get their label per render() and are redrawn only
+when the label changes. The text area shows the typed text's lines around the cursor
+(text_buffer.TextBuffer keeps them wrapped) and is redrawn only when the text or the
+cursor moved.
+"""
+import cv2
+import numpy as np
+
+FLOATING_STYLE = dict(
+    key_w=45, key_h=30, margin=10, pad_w=30, pad_h=40,
+    label_len=5, label_offset=(5, 20), font_scale=0.5, thickness=1,
+    key_colors={"CLOSE_KB": (255, 100, 100)}, text_area=False,
+)
+KEYBOARD_STYLE = dict(
+    key_w=80, key_h=60, margin=25, pad_w=50, pad_h=150,
+    label_len=8, label_offset=(10, 40), font_scale=0.8, thickness=2,
+    key_colors={}, text_area=True,
+)
+
+# Key states drawn on top of the base image
+SELECTED_COLOR = (0, 255, 255)
+PRESSED_COLOR = (0, 255, 0)
+LATCHED_COLOR = (0, 165, 255)  # Shift while shift is on
+TEXT_COLOR = (0, 255, 0)
+MAX_TEXT_CHARS = 30
+TEXT_LINES = 3
+
+
+class KeyboardView:
+    """Keyboard window for one layout and style. render() returns an image valid until the next call."""
+
+    def __init__(self, layout, style, dynamic_keys=()):
+        self.layout = layout
+        self.style = style
+        self.dynamic_keys = set(dynamic_keys)
+        self._labels = {key: "" for key in self.dynamic_keys}
+        self._dynamic_cells = [(r, c) for r, row in enumerate(layout) for c, key in enumerate(row)
+                               if key in self.dynamic_keys]
+        s = style
+        self.width = max(len(r) for r in layout) * s["key_w"] + s["pad_w"]
+        self.height = len(layout) * s["key_h"] + s["pad_h"]
+        self.base = self._draw({})
+        if s["text_area"]:
+            cv2.putText(self.base, "Typed:", (25, self.height - 100), cv2.FONT_HERSHEY_SIMPLEX, 0.7, TEXT_COLOR, 2)
+        self.image = self.base.copy()
+        self._tiles = {}      # (row, col, state) -> (y0, y1, x0, x1, pixels)
+        self._dynamic_tiles = {}  # same, for dynamic keys with the current labels
+        self._drawn = {}      # (row, col) -> state, for keys not in the base state
+        self._text = None     # (buffer, version) last drawn
+        self._top = 0         # first text line shown
+        self._text_rows = (self.height - 88, self.height)  # typed lines + footer
+
+        # Counters
+        self.tile_blits = 0
+        self.text_redraws = 0
+
+    def render(self, selected, pressed=False, shift_on=False, text=None, labels=None):
+        """
+        Updates only the keys (and text) that differ from the previous call.
+        text: TextBuffer for the text area; labels: {dynamic key: text to show}, missing keys are drawn blank.
+        """
+        if labels is not None and self.dynamic_keys:
+            current = {key: labels.get(key, "") for key in self.dynamic_keys}
+            if current != self._labels:
+                self._labels = current
+                self._dynamic_tiles = {}
+                for cell in self._dynamic_cells:
+                    self._blit(cell, self._drawn.get(cell, "normal"))
+
+        wanted = {}
+        if shift_on:
+            for r, row in enumerate(self.layout):
+                for c, key in enumerate(row):
+                    if key == "Shift":
+                        wanted[(r, c)] = "latched"
+        wanted[selected] = "pressed" if pressed else "selected"
+
+        if wanted != self._drawn:
+            restored_rows = set()
+            for cell in self._drawn:
+                if cell not in wanted:
+                    self._blit(cell, "normal")
+                    restored_rows.add(cell[0])
+            # Base tiles know nothing of suggestion labels that spill into their neighbours
+            for cell in self._dynamic_cells:
+                if cell[0] in restored_rows and cell not in wanted:
+                    self._blit(cell, "normal")
+            # Re-blit every highlighted key: a restored neighbour may have covered its border
+            for cell, state in wanted.items():
+                self._blit(cell, state)
+            self._drawn = wanted
+
+        if self.style["text_area"]:
+            state = (id(text), text.version) if text is not None else ()
+            if state != self._text:
+                self._draw_text(text)
+                self._text = state
+        return self.image
+
+    # --- Internals ---
+
+    def _blit(self, cell, state):
+        cache = self._dynamic_tiles if self.layout[cell[0]][cell[1]] in self.dynamic_keys else self._tiles
+        tile = cache.get((cell[0], cell[1], state))
+        if tile is None:
+            tile = self._make_tile(cell, state)
+            cache[(cell[0], cell[1], state)] = tile
+        y0, y1, x0, x1, pixels = tile
+        self.image[y0:y1, x0:x1] = pixels
+        self.tile_blits += 1
+
+    def _make_tile(self, cell, state):
+        s = self.style
+        r, c = cell
+        x = s["margin"] + c * s["key_w"]
+        y = s["margin"] + r * s["key_h"]
+        pad = s["thickness"] + 1  # Outlines spill past the key rectangle
+        # ...and long labels ("Space", "CLOSE") past the right edge
+        (text_w, _), _ = cv2.getTextSize(self._label(self.layout[r][c]), cv2.FONT_HERSHEY_SIMPLEX,
+                                         s["font_scale"], s["thickness"])
+        right = max(x + s["key_w"], x + s["label_offset"][0] + text_w) + pad + 1
+        y0, y1 = max(y - pad, 0), min(y + s["key_h"] + pad + 1, self.height)
+        x0, x1 = max(x - pad, 0), min(right, self.width)
+        if state == "normal" and self.layout[r][c] not in self.dynamic_keys:
+            source = self.base
+        else:
+            source = self._draw({cell: state})
+        return (y0, y1, x0, x1, source[y0:y1, x0:x1].copy())
+
+    def _label(self, key):
+        return self._labels.get(key, key)[:self.style["label_len"]]
+
+    def _draw(self, states):
+        """Full render with the given {(row, col): state} overrides; used for the base and for tiles."""
+        s = self.style
+        img = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        font, scale, thickness = cv2.FONT_HERSHEY_SIMPLEX, s["font_scale"], s["thickness"]
+        dx, dy = s["label_offset"]
+        for r, row in enumerate(self.layout):
+            for c, key in enumerate(row):
+                x = s["margin"] + c * s["key_w"]
+                y = s["margin"] + r * s["key_h"]
+                label = self._label(key)
+                state = states.get((r, c), "normal")
+                if state in ("selected", "pressed"):
+                    color = PRESSED_COLOR if state == "pressed" else SELECTED_COLOR
+                    cv2.rectangle(img, (x, y), (x + s["key_w"], y + s["key_h"]), color, -1)
+                    cv2.putText(img, label, (x + dx, y + dy), font, scale, (0, 0, 0), thickness)
+                else:
+                    color = LATCHED_COLOR if state == "latched" else s["key_colors"].get(key, (255, 255, 255))
+                    cv2.rectangle(img, (x, y), (x + s["key_w"], y + s["key_h"]), color, thickness)
+                    cv2.putText(img, label, (x + dx, y + dy), font, scale, color, thickness)
+        return img
+
+    def _draw_text(self, text):
+        y0, y1 = self._text_rows
+        self.image[y0:y1] = self.base[y0:y1]
+        if text is not None:
+            row, col = text.row_col()
+            # Scroll only as far as needed to keep the cursor's line in view
+            self._top = max(min(self._top, row, len(text.starts) - TEXT_LINES), row - TEXT_LINES + 1, 0)
+            for i in range(self._top, min(self._top + TEXT_LINES, len(text.starts))):
+                line = text.line(i)
+                y = self.height - 70 + (i - self._top) * 20
+                cv2.putText(self.image, line, (25, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, TEXT_COLOR, 1)
+                if i == row:
+                    (x, _), _ = cv2.getTextSize(line[:col], cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+                    cv2.line(self.image, (25 + x, y - 14), (25 + x, y + 4), TEXT_COLOR, 1)
+        cv2.putText(self.image, "Blink firmly to select | ESC to quit", (25, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        self.text_redraws += 1
@@ -0,0 +1,329 @@
+"""
+Local landmark service: the detector's per-frame results for other programs.
+
+With --landmark-service PATH the main loop publishes every frame (timestamp, eye and nose
+points or the full mesh, both eye ratios, the nose position and the gesture event bits)
+on a UNIX domain socket, so other local tools can use them without opening the camera or
+running FaceMesh themselves.
+
+Wire format, little endian. On connect the server sends a header once:
+
+    b"EDLM", version (u16), record size (u32), JSON length (u32), JSON
+        {"dtype": [[name, format, shape], ...], "points": [landmark indices], "gestures": [...]}
+
+then batches, each a (record count u32, records dropped for this client u32) prefix
+followed by count fixed-size records:
+
+    np.frombuffer(payload, dtype=record_dtype(len(points)))
+
+The publisher writes each frame once into a ring of records shared by all clients. Every
+client has a sender thread that ships everything new since its last batch in one send,
+so a client that keeps up gets one record per batch, and a briefly slow one gets them
+batched (the socket buffer only holds a few records). The main loop never waits for a
+client. A client that falls a whole ring behind loses the oldest records, and the next
+batch says how many.
+
+    python eye_detector.py --landmark-service /tmp/eye_detector.sock
+    python landmark_service.py watch /tmp/eye_detector.sock
+"""
+import errno
+import json
+import os
+import select
+import socket
+import stat
+import struct
+import threading
+import time
+
+import numpy as np
+
+from landmarks import FEATURE_POINTS, NUM_LANDMARKS, landmarks_to_array
+
+_MAGIC = b"EDLM"
+_HELLO = struct.Struct("<4sHII")   # magic, version, record size, JSON length
+_BATCH = struct.Struct("<II")      # records, dropped since the last batch
+VERSION = 1
+
+
+def record_dtype(n_points):
+    return np.dtype([
+        ("seq", "<u4"),             # frame number since the service started
+        ("t", "<f8"),               # frame timestamp (camera clock, time.time())
+        ("face", "u1"),             # 0 = no face this frame (everything below is zero)
+        ("events", "<u4"),          # gesture bitmask (bit i = header gestures[i])
+        ("left_ratio", "<f4"),
+        ("right_ratio", "<f4"),
+        ("nose_x", "<f4"),
+        ("nose_y", "<f4"),
+        ("points", "<f4", (n_points, 3)),   # header "points" order, normalized x, y, z
+    ])
+
+
+class LandmarkPublisher:
+    """Serves per-frame records on a UNIX socket; publish() is called once per frame by the engine."""
+
+    def __init__(self, path, gestures, full_mesh=False, ring=256, max_batch=64):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("The landmark service needs UNIX domain sockets (Linux, macOS)")
+        self.path = path
+        self.points = list(range(NUM_LANDMARKS)) if full_mesh else list(FEATURE_POINTS)
+        self._indices = None if full_mesh else np.array(self.points, dtype=np.intp)
+        self.dtype = record_dtype(len(self.points))
+        self.max_batch = max_batch
+        blob = json.dumps({
+            "dtype": [[name, self.dtype.fields[name][0].base.str, list(self.dtype.fields[name][0].shape)]
+                      for name in self.dtype.names],
+            "points": self.points,
+            "gestures": list(gestures),
+        }).encode("utf-8")
+        self._hello = _HELLO.pack(_MAGIC, VERSION, self.dtype.itemsize, len(blob)) + blob
+
+        self._ring = np.zeros(ring, dtype=self.dtype)
+        self._seq = 0                # records written so far (next seq)
+        self._cond = threading.Condition()
+        self._scratch = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._running = True
+        self.clients = []
+
+        _remove_stale_socket(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(8)
+        self._accept_thread = threading.Thread(target=self._accept, name="landmark-service", daemon=True)
+        self._accept_thread.start()
+
+        # Counters
+        self.published = 0
+        self.dropped = 0      # records clients lost by falling a whole ring behind
+
+    # --- Main loop side ---
+
+    def publish(self, t, face, features=None, events=0):
+        """face: MediaPipe face / FaceLandmarks or None; features: the engine's LandmarkAccessor for it."""
+        self.published += 1
+        if not self.clients:
+            return
+        with self._cond:
+            row = self._ring[self._seq % len(self._ring)]
+            row["seq"] = self._seq
+            row["t"] = t
+            row["events"] = events
+            if face is None:
+                row["face"] = 0
+                row["left_ratio"] = row["right_ratio"] = row["nose_x"] = row["nose_y"] = 0.0
+                row["points"] = 0
+            else:
+                row["face"] = 1
+                row["left_ratio"] = features.left_ratio
+                row["right_ratio"] = features.right_ratio
+                row["nose_x"] = features.nose_x
+                row["nose_y"] = features.nose_y
+                array = getattr(face, "array", None)
+                if array is None:
+                    array = landmarks_to_array(face, self._scratch)
+                row["points"] = array[:NUM_LANDMARKS] if self._indices is None else array[self._indices]
+            self._seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        for sock in [self._server] + [conn for conn, _ in self.clients]:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Wakes accept() and any send blocked on a slow client
+            except OSError:
+                pass
+        self._server.close()
+        for conn, thread in list(self.clients):
+            thread.join(timeout=1.0)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    # --- Client side of the server ---
+
+    def _accept(self):
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break  # Closed
+            # A small socket buffer: a slow client's backlog should pile up in the ring (where
+            # it is batched and, past a full ring, dropped), not as seconds of old frames in the kernel
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.dtype.itemsize * 8)
+            thread = threading.Thread(target=self._send, args=(conn,), name="landmark-client", daemon=True)
+            with self._cond:
+                self.clients.append((conn, thread))
+            thread.start()
+
+    def _send(self, conn):
+        batch = np.empty(self.max_batch, dtype=self.dtype)
+        size = len(self._ring)
+        try:
+            conn.sendall(self._hello)
+            cursor = self._seq
+            while self._running:
+                with self._cond:
+                    while cursor == self._seq and self._running:
+                        self._cond.wait(0.5)
+                    if not self._running:
+                        break
+                    dropped = max(self._seq - cursor - size, 0)
+                    cursor += dropped
+                    count = min(self._seq - cursor, self.max_batch)
+                    first = cursor % size
+                    head = min(count, size - first)
+                    batch[:head] = self._ring[first:first + head]
+                    batch[head:count] = self._ring[:count - head]
+                self.dropped += dropped
+                # One write per batch; blocks only this thread while the client is slow
+                conn.sendall(_BATCH.pack(count, dropped) + batch[:count].tobytes())
+                cursor += count
+        except OSError:
+            pass  # Client went away
+        finally:
+            conn.close()
+            with self._cond:
+                self.clients = [c for c in self.clients if c[0] is not conn]
+
+
+def _remove_stale_socket(path):
+    """
+    Removes a socket left at path by a run that didn't exit cleanly. Anything else there
+    (a regular file, a service that is still running) is left alone and reported.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise RuntimeError(f"Landmark service path {path} exists and is not a socket; not replacing it")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError as e:
+        if e.errno != errno.ECONNREFUSED:
+            raise RuntimeError(f"Landmark service socket {path} can't be checked: {e}") from e
+        os.unlink(path)  # Nobody listening
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"Landmark service socket {path} is already in use by a running service")
+
+
+class LandmarkSubscriber:
+    """Client: read() -> (records, dropped) with everything received so far; records is None once the service stops."""
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        magic, version, record_size, length = _HELLO.unpack(self._recv(_HELLO.size))
+        if magic != _MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a landmark service (version {VERSION})")
+        self.header = json.loads(self._recv(length))
+        self.dtype = np.dtype([(name, fmt, tuple(shape)) for name, fmt, shape in self.header["dtype"]])
+        if self.dtype.itemsize != record_size:
+            raise ValueError("Record layout in the header does not match its record size")
+        self.gestures = self.header["gestures"]
+        self.points = self.header["points"]
+
+        # Counters
+        self.records = 0
+        self.dropped = 0
+
+    def read(self):
+        """
+        Waits for the next batch and also takes every batch already waiting behind it, so
+        a client that fell behind catches up in one call instead of one batch per call.
+        """
+        records, dropped = self._read_batch()
+        if records is None:
+            return None, 0
+        parts = [records]
+        while select.select([self._sock], [], [], 0)[0]:
+            more, more_dropped = self._read_batch()
+            if more is None:
+                break  # Service stopped; the next read() says so
+            parts.append(more)
+            dropped += more_dropped
+        return (parts[0] if len(parts) == 1 else np.concatenate(parts)), dropped
+
+    def _read_batch(self):
+        data = self._recv(_BATCH.size)
+        if data is None:
+            return None, 0
+        count, dropped = _BATCH.unpack(data)
+        payload = self._recv(count * self.dtype.itemsize)
+        if payload is None:
+            return None, 0
+        self.records += count
+        self.dropped += dropped
+        return np.frombuffer(payload, dtype=self.dtype), dropped
+
+    def __iter__(self):
+        """Every record, one at a time, until the service stops."""
+        while True:
+            records, _ = self.read()
+            if records is None:
+                return
+            yield from records
+
+    def close(self):
+        self._sock.close()
+
+    def _recv(self, n):
+        buffer = bytearray(n)
+        view = memoryview(buffer)
+        got = 0
+        while got < n:
+            k = self._sock.recv_into(view[got:])
+            if k == 0:
+                return None
+            got += k
+        return buffer
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Landmark service client")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("watch", help="print a status line a second: rate, delivery latency, ratios, gestures")
+    p.add_argument("path")
+    args = parser.parse_args(argv)
+
+    subscriber = LandmarkSubscriber(args.path)
+    print(f"{args.path}: {len(subscriber.points)} points, gestures {subscriber.gestures}")
+    last, n, latency, last_record = time.time(), 0, 0.0, None
+    try:
+        while True:
+            records, dropped = subscriber.read()
+            if records is None:
+                print("Service stopped")
+                break
+            now = time.time()
+            n += len(records)
+            latency = max(latency, now - float(records["t"][-1]))
+            last_record = records[-1]
+            for r in records:
+                if r["events"]:
+                    names = [g for i, g in enumerate(subscriber.gestures) if r["events"] >> i & 1]
+                    print(f"  {r['t']:.3f} {' '.join(names)}")
+            if now - last >= 1.0:
+                r = last_record
+                print(f"{n / (now - last):5.1f} fps  latency max {latency * 1000:5.1f} ms  "
+                      f"dropped {subscriber.dropped}  face={r['face']} L={r['left_ratio']:.2f} "
+                      f"R={r['right_ratio']:.2f} nose=({r['nose_x']:.3f}, {r['nose_y']:.3f})")
+                last, n, latency = now, 0, 0.0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
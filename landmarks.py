@@ -0,0 +1,156 @@
+import numpy as np
+
+# FaceMesh with refine_landmarks=True returns 468 mesh points + 10 iris points
+NUM_LANDMARKS = 478
+
+# Eye & nose landmarks
+LEFT_EYE = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE = [362, 385, 387, 263, 373, 380]
+NOSE_TIP = 1
+# Iris centres (refine_landmarks=True), one per eye above
+LEFT_IRIS = 468
+RIGHT_IRIS = 473
+
+# Everything the detector reads per frame, in this row order
+FEATURE_POINTS = LEFT_EYE + RIGHT_EYE + [NOSE_TIP]
+NOSE_ROW = 12
+# Row pairs for the eye ratio: per eye (corner, corner), (upper, lower), (upper, lower)
+_PAIR_A = [0, 1, 2, 6, 7, 8]
+_PAIR_B = [3, 5, 4, 9, 11, 10]
+
+
+class _Point:
+    """Single landmark with the same .x/.y/.z attributes as MediaPipe's NormalizedLandmark."""
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class _LandmarkView:
+    """Indexable view over an (N, 3) array that mimics NormalizedLandmarkList.landmark."""
+    __slots__ = ("_array",)
+
+    def __init__(self, array):
+        self._array = array
+
+    def __getitem__(self, index):
+        row = self._array[index]
+        return _Point(float(row[0]), float(row[1]), float(row[2]))
+
+    def __len__(self):
+        return len(self._array)
+
+    def __iter__(self):
+        for i in range(len(self._array)):
+            yield self[i]
+
+
+class FaceLandmarks:
+    """Array-backed stand-in for one entry of results.multi_face_landmarks."""
+    __slots__ = ("array", "landmark")
+
+    def __init__(self, array):
+        self.array = array
+        self.landmark = _LandmarkView(array)
+
+
+class LandmarkResults:
+    """Stand-in for the object returned by FaceMesh.process()."""
+    __slots__ = ("multi_face_landmarks", "timestamp")
+
+    def __init__(self, faces=None, timestamp=None):
+        # MediaPipe uses None (not an empty list) when no face is found
+        self.multi_face_landmarks = faces if faces else None
+        self.timestamp = timestamp
+
+
+def landmarks_to_array(face, out=None):
+    """Copies a MediaPipe face (or FaceLandmarks) into an (N, 3) float32 array."""
+    if isinstance(face, FaceLandmarks):
+        if out is None:
+            return face.array
+        np.copyto(out, face.array)
+        return out
+    points = face.landmark
+    if out is None:
+        out = np.empty((len(points), 3), dtype=np.float32)
+    for i, p in enumerate(points):
+        out[i, 0] = p.x
+        out[i, 1] = p.y
+        out[i, 2] = p.z
+    return out
+
+
+class LandmarkAccessor:
+    """
+    Per-frame feature extraction into preallocated float32 buffers.
+    update(face) fills coords (FEATURE_POINTS rows) and computes both eye ratios and
+    the nose position in one vectorized step; nothing is allocated per frame.
+    """
+
+    def __init__(self):
+        self.points = np.array(FEATURE_POINTS, dtype=np.intp)
+        self._point_list = list(FEATURE_POINTS)
+        self.coords = np.zeros((len(FEATURE_POINTS), 2), dtype=np.float32)
+        self._a = np.empty((len(_PAIR_A), 2), dtype=np.float32)
+        self._b = np.empty((len(_PAIR_B), 2), dtype=np.float32)
+        self._dist = np.empty(len(_PAIR_A), dtype=np.float32)
+        self.left_ratio = 0.0
+        self.right_ratio = 0.0
+        self.nose_x = 0.0
+        self.nose_y = 0.0
+
+    def update(self, face):
+        array = getattr(face, "array", None)
+        if array is not None:
+            np.take(array[:, :2], self.points, axis=0, out=self.coords)
+        else:
+            # MediaPipe landmark list: only the 13 points we need are touched
+            points = face.landmark
+            coords = self.coords
+            for row, index in enumerate(self._point_list):
+                p = points[index]
+                coords[row, 0] = p.x
+                coords[row, 1] = p.y
+
+        np.take(self.coords, _PAIR_A, axis=0, out=self._a)
+        np.take(self.coords, _PAIR_B, axis=0, out=self._b)
+        np.subtract(self._a, self._b, out=self._a)
+        np.einsum("ij,ij->i", self._a, self._a, out=self._dist)
+        np.sqrt(self._dist, out=self._dist)
+
+        d = self._dist
+        self.left_ratio = _ratio(d[0], d[1], d[2])
+        self.right_ratio = _ratio(d[3], d[4], d[5])
+        self.nose_x = float(self.coords[NOSE_ROW, 0])
+        self.nose_y = float(self.coords[NOSE_ROW, 1])
+        return self
+
+
+def _ratio(horizontal, vertical_a, vertical_b):
+    vertical = (vertical_a + vertical_b) / 2
+    return float(horizontal / vertical) if vertical != 0 else 0.0
+
+
+def batch_features(points):
+    """
+    Offline version of LandmarkAccessor for many frames at once.
+    points: (frames, 478, 2|3) full meshes or (frames, 13, 2|3) in FEATURE_POINTS order.
+    Returns: (frames, 4) float32 columns [left_ratio, right_ratio, nose_x, nose_y].
+    """
+    points = np.asarray(points)
+    if points.shape[1] != len(FEATURE_POINTS):
+        points = points[:, FEATURE_POINTS]
+    xy = points[..., :2].astype(np.float32, copy=False)
+    dist = np.linalg.norm(xy[:, _PAIR_A] - xy[:, _PAIR_B], axis=2)
+
+    out = np.empty((len(xy), 4), dtype=np.float32)
+    for column, first in ((0, 0), (1, 3)):
+        horizontal = dist[:, first]
+        vertical = (dist[:, first + 1] + dist[:, first + 2]) / 2
+        out[:, column] = np.divide(horizontal, vertical, out=np.zeros_like(horizontal), where=vertical != 0)
+    out[:, 2:] = xy[:, NOSE_ROW]
+    return out
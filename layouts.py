@@ -0,0 +1,236 @@
+"""
+Keyboard layout evaluation and search.
+
+Navigation is simulated with the exact rules of DetectorEngine._navigate: one move
+steps the column (wrapping inside the row) and/or the row (wrapping, with the column
+clamped to the new row's length), and the selection stays on the last typed key, so
+each character starts from the previous one. Costs are expected moves and seconds per
+character over a text corpus.
+
+    python layouts.py evaluate --corpus notes.txt               # current layout
+    python layouts.py evaluate --layout my_layout.json
+    python layouts.py optimize --corpus notes.txt -o my_layout.json
+    python eye_detector.py --layout my_layout.json               # use it
+
+Without --corpus the word list (words.txt) is used, weighted by frequency.
+"""
+import json
+from collections import deque
+
+import numpy as np
+
+# Keys the detector needs in any layout
+REQUIRED_KEYS = [chr(c) for c in range(ord("A"), ord("Z") + 1)] + ["Space", "Delete", "Shift", "Enter", "CLOSE_KB"]
+# Non-character keys stay where they are unless --move-all is given
+DEFAULT_PINNED = ("Delete", "Shift", "Enter", "CLOSE_KB")
+
+# One nose move: (column step, row step); both happen in the same move when both deltas pass MOVE_THRESHOLD
+MOVES = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+STRAIGHT_MOVES = [(dx, dy) for dx, dy in MOVES if not (dx and dy)]
+
+
+def step(layout, row, col, dx, dy):
+    """Selection after one move, same order and wrapping as DetectorEngine._navigate."""
+    if dx:
+        col = (col + dx) % len(layout[row])
+    if dy:
+        row = (row + dy) % len(layout)
+        col = min(col, len(layout[row]) - 1)
+    return row, col
+
+
+def cells(layout):
+    return [(r, c) for r, keys in enumerate(layout) for c in range(len(keys))]
+
+
+def move_distances(layout, diagonal=True):
+    """(cells x cells) matrix of the fewest moves from one cell to another (not symmetric)."""
+    all_cells = cells(layout)
+    index = {cell: i for i, cell in enumerate(all_cells)}
+    moves = MOVES if diagonal else STRAIGHT_MOVES
+    dist = np.full((len(all_cells), len(all_cells)), -1, dtype=np.int32)
+    for source, start in enumerate(all_cells):
+        dist[source, source] = 0
+        queue = deque([start])
+        while queue:
+            r, c = queue.popleft()
+            d = dist[source, index[(r, c)]]
+            for dx, dy in moves:
+                nxt = index[step(layout, r, c, dx, dy)]
+                if dist[source, nxt] < 0:
+                    dist[source, nxt] = d + 1
+                    queue.append(all_cells[nxt])
+    return dist
+
+
+def text_keys(text):
+    """Key names typed for text (case ignored; characters the keyboard lacks are skipped)."""
+    keys = []
+    for ch in text:
+        if "a" <= ch.lower() <= "z":
+            keys.append(ch.upper())
+        elif ch == " ":
+            keys.append("Space")
+        elif ch == "\n":
+            keys.append("Enter")
+    return keys
+
+
+def bigram_counts(keys, key_names):
+    """(keys x keys) counts of key b typed right after key a."""
+    index = {k: i for i, k in enumerate(key_names)}
+    counts = np.zeros((len(key_names), len(key_names)), dtype=np.float64)
+    ids = [index[k] for k in keys if k in index]
+    np.add.at(counts, (ids[:-1], ids[1:]), 1)
+    return counts
+
+
+def corpus_from_word_list(path):
+    """Frequency-weighted bigram source from a word list: [(text, weight)]."""
+    from predictor import read_word_list
+    return [(word + " ", count) for word, count in read_word_list(path)]
+
+
+class LayoutCost:
+    """Expected navigation cost of layouts with a fixed row shape, for one corpus."""
+
+    def __init__(self, shape_layout, samples, diagonal=True):
+        self.shape = [len(r) for r in shape_layout]
+        self.key_names = [k for row in shape_layout for k in row]
+        self.dist = move_distances(shape_layout, diagonal).astype(np.float64)
+        self.bigrams = np.zeros((len(self.key_names), len(self.key_names)))
+        self.chars = 0.0
+        for text, weight in samples:
+            keys = text_keys(text)
+            self.bigrams += weight * bigram_counts(keys, self.key_names)
+            self.chars += weight * len(keys)
+
+    def moves_per_char(self, placement):
+        """placement[k] = cell index of key k (same order as key_names)."""
+        d = self.dist[np.ix_(placement, placement)]
+        return float((self.bigrams * d).sum() / max(self.chars, 1.0))
+
+    def layout_of(self, placement):
+        flat = [None] * len(placement)
+        for key, cell in enumerate(placement):
+            flat[cell] = self.key_names[key]
+        rows, i = [], 0
+        for n in self.shape:
+            rows.append(flat[i:i + n])
+            i += n
+        return rows
+
+
+def report(cost, placement, move_delay, select_time):
+    moves = cost.moves_per_char(placement)
+    seconds = moves * move_delay + select_time
+    return {
+        "moves_per_char": round(moves, 3),
+        "seconds_per_char": round(seconds, 3),
+        "chars_per_minute": round(60.0 / seconds, 2),
+        "words_per_minute": round(60.0 / seconds / 5, 2),
+    }
+
+
+def optimize(cost, pinned=DEFAULT_PINNED, iterations=20000, restarts=4, seed=0):
+    """Simulated annealing over key swaps; pinned keys keep their cells. Returns the best placement."""
+    rng = np.random.default_rng(seed)
+    movable = [i for i, k in enumerate(cost.key_names) if k not in pinned]
+    best = np.arange(len(cost.key_names))
+    best_cost = cost.moves_per_char(best)
+    for restart in range(restarts):
+        placement = best.copy()
+        if restart:
+            cells_ = placement[movable]
+            placement[movable] = rng.permutation(cells_)
+        current = cost.moves_per_char(placement)
+        temperature = max(current * 0.05, 1e-3)
+        for it in range(iterations):
+            a, b = rng.choice(movable, 2, replace=False)
+            placement[a], placement[b] = placement[b], placement[a]
+            candidate = cost.moves_per_char(placement)
+            t = temperature * (1 - it / iterations) + 1e-9
+            if candidate <= current or rng.random() < np.exp((current - candidate) / t):
+                current = candidate
+                if current < best_cost:
+                    best_cost, best = current, placement.copy()
+            else:
+                placement[a], placement[b] = placement[b], placement[a]
+    return best
+
+
+# --- Layout files ---
+
+def save_layout(path, rows, info=None):
+    with open(path, "w") as f:
+        json.dump({"rows": rows, **(info or {})}, f, indent=2)
+
+
+def load_layout(path):
+    """Rows of key names from a layout JSON file; raises ValueError if keys are missing or repeated."""
+    with open(path) as f:
+        rows = json.load(f)["rows"]
+    keys = [k for row in rows for k in row]
+    missing = [k for k in REQUIRED_KEYS if k not in keys]
+    if missing or len(keys) != len(set(keys)):
+        raise ValueError(f"Layout {path}: missing {missing} or repeated keys")
+    return rows
+
+
+def main(argv=None):
+    import argparse
+    import os
+    import eye_detector
+
+    parser = argparse.ArgumentParser(description="Keyboard layout evaluation and optimization")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("evaluate", "optimize"):
+        p = sub.add_parser(name)
+        p.add_argument("--layout", help="layout JSON (default: the built-in QWERTY grid)")
+        p.add_argument("--corpus", help="text file to type (default: word list, weighted by frequency)")
+        p.add_argument("--word-list", default=eye_detector.PREDICTION_WORD_LIST)
+        p.add_argument("--move-delay", type=float, default=eye_detector.KB_NAVIGATION_DELAY,
+                       help="seconds per move (KB_NAVIGATION_DELAY; floating KB uses move_delay)")
+        p.add_argument("--select-time", type=float, default=eye_detector.min_blink_duration + 0.2,
+                       help="seconds per selection blink")
+        p.add_argument("--no-diagonal", action="store_true", help="only one direction per move")
+        p.add_argument("--word-row", action="store_true",
+                       help="include the word-suggestion row the app adds when prediction is on")
+    p = sub.choices["optimize"]
+    p.add_argument("-o", "--output", default="layout.json")
+    p.add_argument("--iterations", type=int, default=20000)
+    p.add_argument("--restarts", type=int, default=4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--move-all", action="store_true", help=f"also move {', '.join(DEFAULT_PINNED)}")
+    args = parser.parse_args(argv)
+
+    layout = load_layout(args.layout) if args.layout else eye_detector.keyboard
+    if args.word_row:
+        layout = [eye_detector.WORD_KEYS] + layout
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            samples = [(f.read(), 1.0)]
+    elif os.path.exists(args.word_list):
+        samples = corpus_from_word_list(args.word_list)
+    else:
+        parser.error("no --corpus given and no word list found")
+
+    cost = LayoutCost(layout, samples, diagonal=not args.no_diagonal)
+    identity = np.arange(len(cost.key_names))
+    before = report(cost, identity, args.move_delay, args.select_time)
+    print(f"current:   {before}")
+    if args.command == "optimize":
+        pinned = tuple(eye_detector.WORD_KEYS) + (() if args.move_all else DEFAULT_PINNED)
+        best = optimize(cost, pinned, args.iterations, args.restarts, args.seed)
+        after = report(cost, best, args.move_delay, args.select_time)
+        rows = [row for row in cost.layout_of(best) if row != eye_detector.WORD_KEYS]
+        print(f"optimized: {after}")
+        for row in rows:
+            print("  " + " ".join(f"{k[:5]:<5}" for k in row))
+        save_layout(args.output, rows, {"cost": after, "baseline": before,
+                                        "corpus": args.corpus or args.word_list})
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Per-stage latency metrics.
+
+Every stage gets a LatencyHistogram with fixed log-spaced buckets, so recording is O(1)
+and memory never grows however long the app runs. Metrics can be drawn on the camera
+frame, written to a Prometheus text file, or served on a local HTTP endpoint.
+"""
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# Stages recorded by the main loop, in display order
+STAGES = [
+    "cap_read",          # waiting for / taking the newest camera frame
+    "flip_cvt",          # cv2.flip + cv2.cvtColor
+    "face_mesh",         # face_mesh.process
+    "blink_ratio",       # eye ratios for both eyes
+    "gestures",          # blink/scroll/navigation state machines
+    "render_keyboard",   # keyboard window drawing
+    "imshow_waitkey",    # cv2.imshow + cv2.waitKey
+    "os_input",          # pynput move/scroll/click/tap calls
+    "frame_total",       # whole loop iteration
+    "eye_open_to_keystroke",  # frame timestamp -> keyboard_os.tap returned
+]
+
+# Bucket boundaries exported to Prometheus (seconds)
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram from 1us to 10s with fixed memory."""
+
+    def __init__(self, min_seconds=1e-6, max_seconds=10.0, buckets_per_decade=20):
+        self._log_min = math.log10(min_seconds)
+        self._per_decade = buckets_per_decade
+        n = int(round((math.log10(max_seconds) - self._log_min) * buckets_per_decade))
+        # upper_edges[i] is the upper bound of bucket i; the last bucket catches overflow
+        self.upper_edges = np.append(np.logspace(self._log_min, math.log10(max_seconds), n + 1), np.inf)
+        self.counts = np.zeros(len(self.upper_edges), dtype=np.int64)
+        self._last = len(self.upper_edges) - 1
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        if seconds <= 0:
+            index = 0
+        else:
+            index = int(math.ceil((math.log10(seconds) - self._log_min) * self._per_decade))
+            index = 0 if index < 0 else (self._last if index > self._last else index)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) in seconds: upper edge of the bucket that holds it."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side="left"))
+        index = min(index, self._last)
+        return min(float(self.upper_edges[index]), self.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def cumulative_at(self, seconds):
+        """Number of observations <= seconds (bucket resolution)."""
+        index = int(np.searchsorted(self.upper_edges, seconds * (1 + 1e-9), side="right"))
+        return int(self.counts[:index].sum())
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class _StageTimer:
+    """Reusable context manager that records one stage; no allocation per use."""
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """Histograms per stage plus a few plain gauges (frame counters etc.)."""
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {}
+        self._timers = {}
+        self.gauges = {}
+        for stage in stages:
+            self._add(stage)
+
+    def _add(self, stage):
+        histogram = LatencyHistogram()
+        self.histograms[stage] = histogram
+        self._timers[stage] = _StageTimer(histogram)
+        return histogram
+
+    def stage(self, name):
+        """with metrics.stage("face_mesh"): ..."""
+        timer = self._timers.get(name)
+        if timer is None:
+            self._add(name)
+            timer = self._timers[name]
+        return timer
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name) or self._add(name)
+        histogram.observe(seconds)
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def summary(self):
+        """{stage: (count, mean, p50, p95, p99)} in seconds, only for stages with data."""
+        result = {}
+        for name, h in list(self.histograms.items()):
+            if h.count:
+                result[name] = (h.count, h.mean(), h.percentile(50), h.percentile(95), h.percentile(99))
+        return result
+
+    # --- Export ---
+
+    def prometheus_text(self, prefix="eye_detector"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Per-stage latency of the main loop",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        # Snapshots: other threads add stages and gauges while an exporter thread reads them
+        for name, h in list(self.histograms.items()):
+            label = f'stage="{name}"'
+            for le in PROMETHEUS_BUCKETS:
+                lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="{le}"}} {h.cumulative_at(le)}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="+Inf"}} {h.count}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {h.total:.9f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {h.count}")
+        for name, value in list(self.gauges.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the text format atomically (for node_exporter's textfile collector or plain tailing)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def draw_overlay(self, img, stages=None, origin=(10, 140)):
+        """Draws 'stage p50/p95' lines onto img (camera frame)."""
+        x, y = origin
+        for name in stages or list(self.histograms):
+            h = self.histograms.get(name)
+            if h is None or h.count == 0:
+                continue
+            text = f"{name}: {h.percentile(50) * 1000:.1f}/{h.percentile(95) * 1000:.1f} ms"
+            cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 200, 200), 1)
+            y += 16
+        return img
+
+
+class MetricsExporter:
+    """Background thread that periodically writes a Prometheus text file and/or serves /metrics."""
+
+    def __init__(self, metrics, path=None, port=None, interval=5.0):
+        self.metrics = metrics
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.port:
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip("/") not in ("", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = metrics.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        if self.path:
+            self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.metrics.write_prometheus(self.path)
+        except OSError as e:
+            print(f"Metrics export failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._write()  # Final snapshot
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,269 @@
+import threading
+import time
+from collections import deque
+
+# Named keys the detector can tap besides single characters
+SPECIAL_KEYS = ("space", "backspace", "enter", "left", "right", "up", "down", "home", "end")
+
+
+class PynputInput:
+    """Mouse and keyboard injection into the OS through pynput; call times go to metrics["os_input"]."""
+
+    def __init__(self, metrics=None):
+        from pynput.mouse import Controller, Button
+        from pynput.keyboard import Controller as K_Controller, Key
+        self.mouse = Controller()
+        self.keyboard_os = K_Controller()
+        self._left_button = Button.left
+        self._keys = {name: getattr(Key, name) for name in SPECIAL_KEYS}
+        self.metrics = metrics
+
+    @property
+    def position(self):
+        return self.mouse.position
+
+    def _timed(self, start):
+        if self.metrics is not None:
+            self.metrics.observe("os_input", time.perf_counter() - start)
+
+    def move(self, x, y):
+        start = time.perf_counter()
+        self.mouse.position = (x, y)
+        self._timed(start)
+
+    def scroll(self, dy):
+        start = time.perf_counter()
+        self.mouse.scroll(0, dy)
+        self._timed(start)
+
+    def click(self):
+        start = time.perf_counter()
+        self.mouse.click(self._left_button)
+        self._timed(start)
+
+    def tap(self, key, frame_time=None):
+        """
+        Taps a single character or one of SPECIAL_KEYS.
+        frame_time: timestamp of the frame that triggered the key, for the eye-open-to-keystroke metric.
+        """
+        start = time.perf_counter()
+        self.keyboard_os.tap(self._keys.get(key, key))
+        self._timed(start)
+        if self.metrics is not None and frame_time:
+            self.metrics.observe("eye_open_to_keystroke", time.time() - frame_time)
+
+    def close(self):
+        pass
+
+
+class NullInput:
+    """Records injected input instead of sending it; used for headless replay and benchmarks."""
+
+    def __init__(self, position=(0, 0)):
+        self._position = position
+        self.moves = 0
+        self.scrolls = 0
+        self.clicks = 0
+        self.taps = 0
+        self.last_key = None
+
+    @property
+    def position(self):
+        return self._position
+
+    def move(self, x, y):
+        self._position = (x, y)
+        self.moves += 1
+
+    def scroll(self, dy):
+        self.scrolls += 1
+
+    def click(self):
+        self.clicks += 1
+
+    def tap(self, key, frame_time=None):
+        self.taps += 1
+        self.last_key = key
+
+    def close(self):
+        pass
+
+
+class InputWorker:
+    """
+    Runs a backend (PynputInput, NullInput) on its own thread so slow OS calls never stall
+    the vision loop. Same API as the backends.
+
+    Moves are coalesced to the latest target and ignored inside dead_zone pixels of the
+    previous one. With refresh_hz set, the pointer glides to each new target over about
+    one landmark interval instead of jumping at camera rate. Consecutive scrolls are summed
+    into one call; clicks and taps keep their order and first snap the pointer to its target.
+
+    backend may also be a zero-argument callable returning one: it is then built on the
+    worker thread, which keeps pynput's import and controller setup off the startup path.
+    Calls made before it is ready are queued as usual.
+
+    A backend call that raises (a pynput or X error) is reported and skipped, not allowed
+    to end the thread; after max_failures in a row the backend is replaced by NullInput.
+    """
+
+    def __init__(self, backend, dead_zone=2, refresh_hz=60, max_glide=0.1, max_failures=20):
+        self._factory = backend if callable(backend) else None
+        self.backend = None if self._factory is not None else backend
+        self.dead_zone = dead_zone
+        self.tick = 1.0 / refresh_hz if refresh_hz else None
+        self.max_glide = max_glide
+        self.max_failures = max_failures
+        self._failures = 0       # backend calls failed in a row
+        self._cond = threading.Condition()
+        self._events = deque()   # ["scroll", dy] / ["click"] / ["tap", key, frame_time], in order
+        self._target = None      # latest requested pointer position
+        self._start = None       # where the current glide started
+        self._emitted = None     # last position sent to the backend
+        self._target_time = 0.0
+        self._interval = 1.0 / 30  # EMA of time between accepted moves
+        self._closed = False
+        self._thread = None
+
+        # Counters
+        self.moves_requested = 0
+        self.moves_skipped = 0    # inside the dead-zone
+        self.moves_sent = 0
+        self.scrolls_merged = 0
+        self.errors = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="os-input", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def position(self):
+        with self._cond:
+            target = self._target
+        if target is not None:
+            return target
+        backend = self.backend
+        return backend.position if backend is not None else (0, 0)
+
+    def move(self, x, y):
+        with self._cond:
+            self.moves_requested += 1
+            target = self._target
+            if target is not None and abs(x - target[0]) <= self.dead_zone and abs(y - target[1]) <= self.dead_zone:
+                self.moves_skipped += 1
+                return
+            now = time.perf_counter()
+            if target is not None:
+                self._interval = 0.8 * self._interval + 0.2 * min(now - self._target_time, self.max_glide)
+            self._start = self._emitted
+            self._target = (x, y)
+            self._target_time = now
+            self._cond.notify()
+
+    def scroll(self, dy):
+        with self._cond:
+            if self._events and self._events[-1][0] == "scroll":
+                self._events[-1][1] += dy
+                self.scrolls_merged += 1
+            else:
+                self._events.append(["scroll", dy])
+            self._cond.notify()
+
+    def click(self):
+        self._push(["click"])
+
+    def tap(self, key, frame_time=None):
+        self._push(["tap", key, frame_time])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+
+    # --- Worker thread ---
+
+    def _push(self, event):
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify()
+
+    def _run(self):
+        if self.backend is None:
+            try:
+                self.backend = self._factory()
+            except Exception as e:
+                print(f"OS input unavailable ({e}), input is discarded")
+                self.backend = NullInput()
+        while True:
+            with self._cond:
+                while not self._closed and not self._events and self._target == self._emitted:
+                    self._cond.wait()
+                events = list(self._events)
+                self._events.clear()
+                point = self._next_point(snap=bool(events) or self._closed)
+                stop = self._closed and not events
+
+            if point is not None and self._send("move", *point):
+                self.moves_sent += 1
+            for event in events:
+                kind = event[0]
+                if kind == "scroll":
+                    if event[1]:
+                        self._send("scroll", event[1])
+                elif kind == "click":
+                    self._send("click")
+                else:
+                    self._send("tap", event[1], event[2])
+            if stop:
+                break
+
+            if not events and self._target != self._emitted:
+                with self._cond:
+                    # Next glide step; wakes early for new events or targets
+                    self._cond.wait(self.tick)
+
+    def _send(self, method, *args):
+        """One backend call; a failure is counted and reported instead of ending the thread."""
+        try:
+            getattr(self.backend, method)(*args)
+        except Exception as e:
+            self.errors += 1
+            self._failures += 1
+            if self._failures == 1:
+                print(f"OS input {method} failed ({e!r}), skipped")
+            if self._failures >= self.max_failures:
+                print(f"OS input failed {self._failures} times in a row, input is discarded from now on")
+                failed, self.backend = self.backend, NullInput(self._emitted or (0, 0))
+                self._failures = 0
+                try:
+                    failed.close()
+                except Exception:
+                    pass
+            return False
+        self._failures = 0
+        return True
+
+    def _next_point(self, snap):
+        """Position to send now (None if the pointer is already there). Called with the lock held."""
+        target = self._target
+        if target is None or target == self._emitted:
+            return None
+        if snap or self.tick is None or self._start is None:
+            point = target
+        else:
+            progress = (time.perf_counter() - self._target_time) / self._interval
+            if progress >= 1.0:
+                point = target
+            else:
+                point = (int(round(self._start[0] + (target[0] - self._start[0]) * progress)),
+                         int(round(self._start[1] + (target[1] - self._start[1]) * progress)))
+                if point == self._emitted:
+                    return None
+        self._emitted = point
+        return point
@@ -0,0 +1,198 @@
+"""
+Idle / low-power mode.
+
+With nobody in front of the camera the loop would still decode every frame and run the
+full FaceMesh on it. IdleFaceMesh wraps the FaceMesh backend with three states:
+
+ACTIVE  every frame goes to FaceMesh. After idle_after seconds without a face -> IDLE.
+IDLE    FaceMesh is not called and the camera publishes only idle_fps frames a second;
+        each one gets a cheap presence check (PresenceDetector). Presence -> WAKING.
+WAKING  full rate again and FaceMesh on every frame. A face -> ACTIVE; nothing within
+        wake_timeout -> back to IDLE (a false wake: a shadow, a passer-by).
+
+Wake latency is measured from the last idle frame that saw nobody (the latest moment the
+user can have arrived) to the end of the first FaceMesh call that found the face. When a
+wake takes longer than max_wake_latency, idle_fps is raised so the next one won't.
+"""
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from landmarks import LandmarkResults
+
+ACTIVE, IDLE, WAKING = "active", "idle", "waking"
+
+
+class PresenceDetector:
+    """
+    Cheap "is somebody there" check on a small grayscale copy of the frame.
+    method="motion": share of pixels that differ from a slowly updated background.
+    method="cascade": OpenCV Haar frontal-face cascade on the small image.
+    """
+
+    def __init__(self, method="motion", size=(80, 60), pixel_threshold=18, min_changed=0.02,
+                 background_rate=0.05, cascade_size=(160, 120)):
+        if method not in ("motion", "cascade"):
+            raise ValueError(f"Unknown presence method '{method}' (motion, cascade)")
+        self.method = method
+        self.size = size if method == "motion" else cascade_size
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.background_rate = background_rate
+        self._small = np.empty((self.size[1], self.size[0]), dtype=np.uint8)
+        self._gray = None
+        self._background = None
+        self._diff = np.empty_like(self._small)
+        self._background_u8 = np.empty_like(self._small)
+        self._cascade = None
+        if method == "cascade":
+            self._cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+            if self._cascade.empty():
+                raise RuntimeError("Haar face cascade not found in cv2.data.haarcascades")
+
+    def reset(self):
+        """Forget the background (call when entering idle)."""
+        self._background = None
+
+    def check(self, bgr_frame):
+        if self._gray is None or self._gray.shape != bgr_frame.shape[:2]:
+            self._gray = np.empty(bgr_frame.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.resize(self._gray, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+
+        if self.method == "cascade":
+            faces = self._cascade.detectMultiScale(self._small, scaleFactor=1.2, minNeighbors=3, minSize=(20, 20))
+            return len(faces) > 0
+
+        if self._background is None:
+            self._background = self._small.astype(np.float32)
+            return False
+        cv2.convertScaleAbs(self._background, dst=self._background_u8)
+        cv2.absdiff(self._small, self._background_u8, dst=self._diff)
+        changed = np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+        # Slow background update absorbs lighting drift but not a person sitting down
+        cv2.accumulateWeighted(self._small, self._background, self.background_rate)
+        return changed >= self.min_changed
+
+
+class IdleFaceMesh:
+    """
+    Wraps a FaceMesh backend (same process()/process_bgr() API). capture: anything with
+    set_interval(seconds), e.g. frame_capture.CameraCapture; None = frame rate untouched.
+    """
+
+    def __init__(self, face_mesh, presence=None, capture=None, idle_after=10.0, idle_fps=4.0,
+                 max_wake_latency=0.5, wake_timeout=1.0, max_idle_fps=15.0, metrics=None):
+        self.face_mesh = face_mesh
+        self.presence = presence or PresenceDetector()
+        self.capture = capture
+        self.idle_after = idle_after
+        self.max_wake_latency = max_wake_latency
+        self.wake_timeout = wake_timeout
+        self.max_idle_fps = max_idle_fps
+        # The idle frame interval alone must leave room for the wake-up inference
+        self.idle_fps = min(max(idle_fps, 1.5 / max_wake_latency), max_idle_fps)
+        self.metrics = metrics
+        self.pipelined = getattr(face_mesh, "pipelined", False)
+
+        self.state = ACTIVE
+        self._no_face_since = None
+        self._last_absent = None
+        self._waking_since = None
+        self.wake_latencies = deque(maxlen=100)
+
+        # Counters
+        self.idle_frames = 0
+        self.active_frames = 0
+        self.wakes = 0
+        self.false_wakes = 0
+        self.slow_wakes = 0  # wakes over max_wake_latency
+
+    def process(self, rgb_frame, timestamp=None):
+        return self._run(rgb_frame, timestamp, bgr=False)
+
+    def process_bgr(self, bgr_frame, timestamp=None):
+        return self._run(bgr_frame, timestamp, bgr=True)
+
+    def close(self):
+        self.face_mesh.close()
+
+    # --- Internals ---
+
+    def _run(self, frame, timestamp, bgr):
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self.state == IDLE:
+            self.idle_frames += 1
+            present = self.presence.check(frame if bgr else cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+            if not present:
+                self._last_absent = timestamp
+                return LandmarkResults(None, timestamp)
+            self._set_state(WAKING, timestamp)
+
+        self.active_frames += 1
+        start = time.perf_counter()
+        results = self._infer(frame, timestamp, bgr)
+        found = bool(results.multi_face_landmarks)
+
+        if self.state == WAKING:
+            if found:
+                latency = timestamp - self._last_absent + (time.perf_counter() - start)
+                self.wake_latencies.append(latency)
+                self.wakes += 1
+                if self.metrics is not None:
+                    self.metrics.observe("wake_latency", latency)
+                if latency > self.max_wake_latency:
+                    self.slow_wakes += 1
+                    self.idle_fps = min(self.idle_fps * 1.5, self.max_idle_fps)
+                self._set_state(ACTIVE, timestamp)
+            elif timestamp - self._waking_since > self.wake_timeout:
+                self.false_wakes += 1
+                self._set_state(IDLE, timestamp)
+        elif found:
+            self._no_face_since = None
+        elif self._no_face_since is None:
+            self._no_face_since = timestamp
+        elif timestamp - self._no_face_since >= self.idle_after:
+            self._set_state(IDLE, timestamp)
+        return results
+
+    def _infer(self, frame, timestamp, bgr):
+        if bgr:
+            if hasattr(self.face_mesh, "process_bgr"):
+                return self.face_mesh.process_bgr(frame, timestamp)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if hasattr(self.face_mesh, "submit"):
+            return self.face_mesh.process(frame, timestamp)
+        return self.face_mesh.process(frame)  # MediaPipe FaceMesh takes no timestamp
+
+    def _set_state(self, state, timestamp):
+        self.state = state
+        if state == IDLE:
+            self.presence.reset()
+            self._last_absent = timestamp
+            self._no_face_since = None
+            if self.capture is not None:
+                self.capture.set_interval(1.0 / self.idle_fps)
+        elif state == WAKING:
+            self._waking_since = timestamp
+            if self.capture is not None:
+                self.capture.set_interval(0.0)
+        else:
+            self._no_face_since = None
+
+    def stats(self):
+        latencies = sorted(self.wake_latencies)
+        return {
+            "state": self.state,
+            "idle_frames": self.idle_frames,
+            "active_frames": self.active_frames,
+            "wakes": self.wakes,
+            "false_wakes": self.false_wakes,
+            "slow_wakes": self.slow_wakes,
+            "idle_fps": round(self.idle_fps, 2),
+            "wake_latency_max": round(latencies[-1], 3) if latencies else None,
+        }
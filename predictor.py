@@ -0,0 +1,218 @@
+"""
+Word completion from a frequency-ranked prefix trie.
+
+The trie is built once from a word list into a flat binary file and memory-mapped at
+startup, so loading costs nothing and lookups touch only the nodes on the prefix path.
+Each node stores the ids of its top-k most frequent words, so a lookup is one binary
+search per prefix character plus k small string reads.
+
+    python predictor.py build words.txt -o words.trie     # word list -> trie file
+    python predictor.py query words.trie th               # top completions for "th"
+
+Word list format: one word per line, optionally followed by a count. Without counts the
+line order is taken as the frequency ranking (most frequent first).
+"""
+import mmap
+import os
+import re
+import struct
+import sys
+from bisect import bisect_left
+
+_MAGIC = b"EDTRIE1\0"
+_HEADER = struct.Struct("<8sIIIII")  # magic, top_k, nodes, edges, words, blob bytes
+_EMPTY = 0xFFFFFFFF
+_WORD = re.compile(r"^[a-z]+$")
+
+
+def read_word_list(path):
+    """[(word, count)] from a word list; words the keyboard can't type are skipped."""
+    entries = []
+    ranked = set()
+    with open(path, encoding="utf-8") as f:
+        lines = [line.split() for line in f if line.strip() and not line.startswith("#")]
+    for rank, parts in enumerate(lines):
+        word = parts[0].lower()
+        if not _WORD.match(word):
+            continue
+        if len(parts) > 1:
+            entries.append((word, int(parts[1])))  # Repeats (e.g. "The" and "the") add up
+        elif word not in ranked:
+            ranked.add(word)  # Ranked lists: only the first (best) rank counts
+            entries.append((word, len(lines) - rank))
+    return entries
+
+
+def build_trie(entries, path, top_k=8):
+    """Writes the binary trie for [(word, count)] to path."""
+    counts = {}
+    for word, count in entries:
+        counts[word] = counts.get(word, 0) + count
+    words = sorted(counts, key=lambda w: (-counts[w], w))
+
+    # Insert in frequency order: the first k words reaching a node are its top-k
+    children = [{}]
+    top = [[]]
+    for word_id, word in enumerate(words):
+        node = 0
+        if len(top[0]) < top_k:
+            top[0].append(word_id)
+        for ch in word:
+            child = children[node].get(ch)
+            if child is None:
+                child = len(children)
+                children[node][ch] = child
+                children.append({})
+                top.append([])
+            node = child
+            if len(top[node]) < top_k:
+                top[node].append(word_id)
+
+    # Renumber breadth-first so every node's edges are contiguous and sorted by character
+    order = [0]
+    new_id = {0: 0}
+    for node in order:
+        for ch in sorted(children[node]):
+            child = children[node][ch]
+            new_id[child] = len(order)
+            order.append(child)
+    edge_start, edge_chars, edge_nodes, top_ids = [], [], [], []
+    for node in order:
+        edge_start.append(len(edge_chars))
+        for ch in sorted(children[node]):
+            edge_chars.append(ord(ch))
+            edge_nodes.append(new_id[children[node][ch]])
+        ids = top[node]
+        top_ids.extend(ids + [_EMPTY] * (top_k - len(ids)))
+    edge_start.append(len(edge_chars))
+
+    encoded = [w.encode("utf-8") for w in words]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    blob = b"".join(encoded)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, top_k, len(order), len(edge_chars), len(words), len(blob)))
+        for array in (edge_start, edge_chars, edge_nodes, top_ids, offsets, [counts[w] for w in words]):
+            f.write(struct.pack(f"<{len(array)}I", *array))
+        f.write(blob)
+    os.replace(tmp, path)
+    return len(words)
+
+
+class WordTrie:
+    """Read-only view of a trie file; complete() takes well under a millisecond."""
+
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise RuntimeError("Trie files are little-endian")
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.top_k, nodes, edges, words, blob_bytes = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a word trie file")
+        self.words = words
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+
+        def section(count):
+            nonlocal offset
+            part = view[offset:offset + count * 4].cast("I")
+            offset += count * 4
+            return part
+
+        self._edge_start = section(nodes + 1)
+        self._edge_chars = section(edges)
+        self._edge_nodes = section(edges)
+        self._top = section(nodes * self.top_k)
+        self._offsets = section(words + 1)
+        self._counts = section(words)
+        self._blob = view[offset:offset + blob_bytes]
+
+    def _node(self, prefix):
+        node = 0
+        chars = self._edge_chars
+        for ch in prefix:
+            lo, hi = self._edge_start[node], self._edge_start[node + 1]
+            code = ord(ch)
+            i = bisect_left(chars, code, lo, hi)
+            if i == hi or chars[i] != code:
+                return None
+            node = self._edge_nodes[i]
+        return node
+
+    def word(self, word_id):
+        return bytes(self._blob[self._offsets[word_id]:self._offsets[word_id + 1]]).decode("utf-8")
+
+    def count(self, word_id):
+        return self._counts[word_id]
+
+    def complete(self, prefix, k=None):
+        """Up to k most frequent words starting with prefix (lower-case), most frequent first."""
+        node = self._node(prefix.lower())
+        if node is None:
+            return []
+        k = self.top_k if k is None else min(k, self.top_k)
+        base = node * self.top_k
+        result = []
+        for i in range(base, base + k):
+            word_id = self._top[i]
+            if word_id == _EMPTY:
+                break
+            result.append(self.word(word_id))
+        return result
+
+    def close(self):
+        # Views must go before the mmap can close
+        self._edge_start = self._edge_chars = self._edge_nodes = None
+        self._top = self._offsets = self._counts = self._blob = None
+        self._mmap.close()
+        self._file.close()
+
+
+def load_predictor(trie_path, word_list=None, top_k=8):
+    """
+    Opens trie_path, (re)building it from word_list first if the list is newer or the
+    trie is missing. Returns None when neither file exists.
+    """
+    have_list = word_list is not None and os.path.exists(word_list)
+    if have_list and (not os.path.exists(trie_path) or os.path.getmtime(word_list) > os.path.getmtime(trie_path)):
+        os.makedirs(os.path.dirname(os.path.abspath(trie_path)), exist_ok=True)
+        build_trie(read_word_list(word_list), trie_path, top_k)
+    if not os.path.exists(trie_path):
+        return None
+    return WordTrie(trie_path)
+
+
+def main(argv=None):
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Word-completion trie builder")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="build a trie file from a word list")
+    p.add_argument("word_list")
+    p.add_argument("-o", "--output", default="words.trie")
+    p.add_argument("--top-k", type=int, default=8)
+    p = sub.add_parser("query", help="print completions for prefixes")
+    p.add_argument("trie")
+    p.add_argument("prefixes", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        n = build_trie(read_word_list(args.word_list), args.output, args.top_k)
+        print(f"{n} words -> {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        trie = WordTrie(args.trie)
+        for prefix in args.prefixes:
+            start = time.perf_counter()
+            words = trie.complete(prefix)
+            elapsed = time.perf_counter() - start
+            print(f"{prefix!r}: {', '.join(words) or '-'}  ({elapsed * 1e6:.0f} us)")
+        trie.close()
+
+
+if __name__ == "__main__":
+    main()
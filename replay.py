@@ -0,0 +1,204 @@
+"""
+Frame and landmark sources for driving DetectorEngine without a camera.
+
+VideoFileSource replays a recorded video with the same read() shape as CameraCapture.
+SyntheticLandmarkSource generates scripted faces (nose motion, blinks, winks) so the
+decision logic can be exercised without FaceMesh at all.
+"""
+import math
+import random
+import time
+
+import cv2
+import numpy as np
+
+from landmarks import LEFT_EYE, LEFT_IRIS, NOSE_TIP, NUM_LANDMARKS, RIGHT_EYE, RIGHT_IRIS, FaceLandmarks
+
+EYE_WIDTH = 0.06
+EYE_OPEN_HEIGHT = 0.02     # blink ratio ~3.0
+EYE_CLOSED_HEIGHT = 0.008  # blink ratio ~7.5
+
+
+class VideoFileSource:
+    """
+    Reads a video file frame by frame; timestamps come from the file, not the wall clock.
+    realtime=True plays it like a live camera instead: read() returns the frame due now
+    (frames the reader was too slow for are skipped) with a wall-clock timestamp.
+    """
+
+    def __init__(self, path, loop=False, realtime=False):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self._started = None
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_index = 0
+
+    def read(self, timeout=None):
+        """Returns: (ret, frame, timestamp)"""
+        if self.realtime:
+            return self._read_realtime()
+        ret, frame = self._next(decode=True)
+        if not ret:
+            return False, None, 0.0
+        timestamp = self.frame_index / self.fps
+        self.frame_index += 1
+        return True, frame, timestamp
+
+    def _next(self, decode):
+        ret, frame = self.cap.read() if decode else (self.cap.grab(), None)
+        if not ret and self.loop and self.frame_index > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read() if decode else (self.cap.grab(), None)
+        return ret, frame
+
+    def _read_realtime(self):
+        if self._started is None:
+            self._started = time.time()
+        due = int((time.time() - self._started) * self.fps)
+        if due < self.frame_index:
+            # Reader is ahead of the "camera": wait for the next frame
+            time.sleep(self._started + self.frame_index / self.fps - time.time())
+            due = self.frame_index
+        while self.frame_index < due:
+            if not self._next(decode=False)[0]:
+                return False, None, 0.0
+            self.frame_index += 1
+        ret, frame = self._next(decode=True)
+        if not ret:
+            return False, None, 0.0
+        timestamp = self._started + self.frame_index / self.fps
+        self.frame_index += 1
+        return True, frame, timestamp
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticFace:
+    """A reusable (478, 3) landmark array with controllable eyes, irises and nose."""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.base = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+        # Rough face-shaped cloud so bounding boxes and trackers have something to work with
+        angles = rng.uniform(0, 2 * np.pi, NUM_LANDMARKS)
+        radii = np.sqrt(rng.uniform(0, 1, NUM_LANDMARKS))
+        self.base[:, 0] = 0.5 + 0.12 * radii * np.cos(angles)
+        self.base[:, 1] = 0.5 + 0.16 * radii * np.sin(angles)
+        self.base[:, 2] = rng.normal(0, 0.01, NUM_LANDMARKS)
+        self.array = self.base.copy()
+        self.face = FaceLandmarks(self.array)
+        self.set(0.5, 0.5, True, True)
+
+    def set(self, nose_x, nose_y, left_open, right_open, gaze=(0.0, 0.0)):
+        """
+        Moves the whole face so the nose tip lands on (nose_x, nose_y) and sets each eye.
+        gaze: iris offset from the eye centre in eye widths (x along the eye, y down).
+        """
+        dx = nose_x - 0.5
+        dy = nose_y - 0.5
+        np.add(self.base[:, 0], dx, out=self.array[:, 0])
+        np.add(self.base[:, 1], dy, out=self.array[:, 1])
+        self.array[NOSE_TIP, 0] = nose_x
+        self.array[NOSE_TIP, 1] = nose_y
+        self._place_eye(LEFT_EYE, LEFT_IRIS, 0.44 + dx, 0.42 + dy, left_open, gaze)
+        self._place_eye(RIGHT_EYE, RIGHT_IRIS, 0.56 + dx, 0.42 + dy, right_open, gaze)
+        return self.face
+
+    def _place_eye(self, points, iris, cx, cy, is_open, gaze):
+        half_w = EYE_WIDTH / 2
+        half_h = (EYE_OPEN_HEIGHT if is_open else EYE_CLOSED_HEIGHT) / 2
+        a = self.array
+        a[points[0], 0], a[points[0], 1] = cx - half_w, cy
+        a[points[3], 0], a[points[3], 1] = cx + half_w, cy
+        a[points[1], 0], a[points[1], 1] = cx - half_w / 3, cy - half_h
+        a[points[5], 0], a[points[5], 1] = cx - half_w / 3, cy + half_h
+        a[points[2], 0], a[points[2], 1] = cx + half_w / 3, cy - half_h
+        a[points[4], 0], a[points[4], 1] = cx + half_w / 3, cy + half_h
+        a[iris, 0], a[iris, 1] = cx + gaze[0] * EYE_WIDTH, cy + gaze[1] * EYE_WIDTH
+
+
+class SyntheticLandmarkSource:
+    """
+    Scripted user for a given path:
+      KEYBOARD / FLOATING_KB - nose nudges between keys and ~0.5 s selection blinks
+      CURSOR                 - smooth nose wander, short click blinks and occasional winks (scroll)
+    read() returns (ret, face, timestamp); face is None while the "user" is out of frame.
+    """
+
+    def __init__(self, path="KEYBOARD", seconds=60.0, fps=30.0, seed=0, absent_fraction=0.0):
+        self.path = path
+        self.fps = fps
+        self.total_frames = int(seconds * fps)
+        self.absent_fraction = absent_fraction
+        self.rng = random.Random(seed)
+        self.synth = SyntheticFace(seed)
+        self.frame_index = 0
+        self._nose = [0.5, 0.5]
+        self._target = [0.5, 0.5]
+        self._event = None       # (kind, frames_left)
+        self._next_event = int(fps)
+
+    def __len__(self):
+        return self.total_frames
+
+    def read(self, timeout=None):
+        if self.frame_index >= self.total_frames:
+            return False, None, 0.0
+        i = self.frame_index
+        self.frame_index += 1
+        timestamp = i / self.fps
+
+        if self.absent_fraction and self.rng.random() < self.absent_fraction:
+            return True, None, timestamp
+
+        left_open = right_open = True
+        if self._event is None and i >= self._next_event:
+            self._event = self._pick_event()
+        if self._event is not None:
+            kind, left = self._event
+            if kind == "blink":
+                left_open = right_open = False
+            elif kind == "wink_left":
+                left_open = False
+            elif kind == "wink_right":
+                right_open = False
+            left -= 1
+            self._event = (kind, left) if left > 0 else None
+            if self._event is None:
+                self._next_event = i + int(self.fps * self.rng.uniform(0.8, 2.5))
+
+        self._move_nose(i)
+        face = self.synth.set(self._nose[0], self._nose[1], left_open, right_open)
+        return True, face, timestamp
+
+    def _pick_event(self):
+        fps = self.fps
+        if self.path == "CURSOR":
+            r = self.rng.random()
+            if r < 0.6:
+                return ("blink", max(1, int(0.25 * fps)))
+            return ("wink_left" if r < 0.8 else "wink_right", max(1, int(0.6 * fps)))
+        return ("blink", max(1, int(0.5 * fps)))
+
+    def _move_nose(self, i):
+        if self.path == "CURSOR":
+            # Slow Lissajous wander across the frame
+            t = i / self.fps
+            self._nose[0] = 0.5 + 0.15 * math.sin(0.7 * t)
+            self._nose[1] = 0.5 + 0.10 * math.sin(1.1 * t + 1.0)
+            return
+        # Step-like nudges: hold still, then shift by a few MOVE_THRESHOLDs
+        if i % int(self.fps * 0.6) == 0:
+            self._target[0] += self.rng.choice((-0.006, 0.0, 0.006))
+            self._target[1] += self.rng.choice((-0.006, 0.0, 0.0, 0.006))
+            self._target[0] = min(max(self._target[0], 0.4), 0.6)
+            self._target[1] = min(max(self._target[1], 0.4), 0.6)
+        self._nose[0] += 0.3 * (self._target[0] - self._nose[0]) + self.rng.gauss(0, 0.0003)
+        self._nose[1] += 0.3 * (self._target[1] - self._nose[1]) + self.rng.gauss(0, 0.0003)
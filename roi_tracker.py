@@ -0,0 +1,176 @@
+"""
+Region-of-interest tracking for FaceMesh.
+
+Once a face has been found, the next frame only sends a padded square crop around the
+previous landmarks, resized to a small fixed input, and maps the landmarks back to
+full-frame coordinates. Tracking falls back to full-frame detection whenever the face
+is lost. The input size and the padding adapt to the measured inference time.
+"""
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, FaceLandmarks, LandmarkResults, landmarks_to_array
+
+# Square input sizes to step through, largest (most accurate) first
+INPUT_SIZES = (256, 224, 192, 160, 128)
+
+
+class RoiFaceMesh:
+    """
+    Wraps a FaceMesh (or FaceMeshWorker) and feeds it face crops instead of full frames.
+    Use process_bgr() with the flipped BGR frame: only the crop is colour-converted.
+    """
+
+    def __init__(self, face_mesh, frame_size, input_size=192, padding=0.25, max_padding=0.6,
+                 inference_budget=0.012, full_frame_scale=1.0):
+        self.face_mesh = face_mesh
+        self.frame_w, self.frame_h = frame_size
+        self.level = INPUT_SIZES.index(input_size) if input_size in INPUT_SIZES else 2
+        self.base_padding = padding
+        self.max_padding = max_padding
+        self.inference_budget = inference_budget
+        self.full_frame_scale = full_frame_scale
+        self.pipelined = getattr(face_mesh, "pipelined", False)
+
+        self.box = None                 # (x0, y0, size) of the crop for the next frame; None = full frame
+        self._boxes = deque()           # crops of frames still in flight (pipelined backends)
+        self._inference_ema = 0.0
+        self._velocity = 0.0            # face centre motion, fraction of face size per second
+        self._last_center = None
+        self._last_time = None
+        self._out = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._face = FaceLandmarks(self._out)
+        self._resized = {size: np.empty((size, size, 3), dtype=np.uint8) for size in INPUT_SIZES}
+
+        # Counters
+        self.tracked_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    @property
+    def input_size(self):
+        return INPUT_SIZES[self.level]
+
+    def process(self, rgb_frame, timestamp=None):
+        """Drop-in FaceMesh.process() for an RGB frame."""
+        return self._run(rgb_frame, None, timestamp)
+
+    def process_bgr(self, bgr_frame, timestamp=None):
+        """Same as process() but takes the BGR frame and converts only what gets sent."""
+        return self._run(bgr_frame, cv2.COLOR_BGR2RGB, timestamp)
+
+    def close(self):
+        self.face_mesh.close()
+
+    # --- Internals ---
+
+    def _run(self, frame, conversion, timestamp):
+        box = self.box
+        if box is None:
+            image = self._prepare_full(frame, conversion)
+            self.full_frames += 1
+        else:
+            image = self._prepare_crop(frame, box, conversion)
+            self.tracked_frames += 1
+        self._boxes.append(box)
+
+        start = time.perf_counter()
+        try:
+            if timestamp is not None and hasattr(self.face_mesh, "submit"):
+                results = self.face_mesh.process(image, timestamp)
+            else:
+                results = self.face_mesh.process(image)
+        except Exception:
+            self._boxes.pop()  # The backend dropped this frame (e.g. serving.FrameDropped)
+            raise
+        elapsed = time.perf_counter() - start
+        self._inference_ema = elapsed if self._inference_ema == 0 else 0.8 * self._inference_ema + 0.2 * elapsed
+
+        if self.pipelined and len(self._boxes) < 2:
+            return results  # Pipeline still filling; keep the box for the result that follows
+        used_box = self._boxes.popleft()
+
+        if not results.multi_face_landmarks:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None  # Tracking lost: next frame goes full-frame
+            self._last_center = None
+            return LandmarkResults(None, getattr(results, "timestamp", None))
+
+        landmarks_to_array(results.multi_face_landmarks[0], self._out)
+        self._to_frame_coords(used_box)
+        self._adapt()
+        self.box = self._next_box(timestamp)
+        return LandmarkResults([self._face], getattr(results, "timestamp", None))
+
+    def _target(self, height, width):
+        if hasattr(self.face_mesh, "input_buffer"):
+            return self.face_mesh.input_buffer(height, width)
+        return None
+
+    def _prepare_full(self, frame, conversion):
+        if self.full_frame_scale != 1.0:
+            w = int(self.frame_w * self.full_frame_scale)
+            h = int(self.frame_h * self.full_frame_scale)
+            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        h, w = frame.shape[:2]
+        if conversion is None:
+            return frame
+        return cv2.cvtColor(frame, conversion, dst=self._target(h, w))
+
+    def _prepare_crop(self, frame, box, conversion):
+        x0, y0, size = box
+        crop = frame[y0:y0 + size, x0:x0 + size]
+        s = self.input_size
+        resized = cv2.resize(crop, (s, s), dst=self._resized[s], interpolation=cv2.INTER_AREA)
+        if conversion is None:
+            return resized
+        return cv2.cvtColor(resized, conversion, dst=self._target(s, s))
+
+    def _to_frame_coords(self, box):
+        """Crop-normalized -> full-frame-normalized landmarks, in place."""
+        if box is None:
+            return
+        x0, y0, size = box
+        out = self._out
+        out[:, 0] *= size / self.frame_w
+        out[:, 0] += x0 / self.frame_w
+        out[:, 1] *= size / self.frame_h
+        out[:, 1] += y0 / self.frame_h
+        out[:, 2] *= size / self.frame_w
+
+    def _adapt(self):
+        """Smaller input when inference is over budget, larger when there's plenty of headroom."""
+        if self._inference_ema > self.inference_budget * 1.1 and self.level < len(INPUT_SIZES) - 1:
+            self.level += 1
+        elif self._inference_ema < self.inference_budget * 0.5 and self.level > 0:
+            self.level -= 1
+
+    def _next_box(self, timestamp):
+        xs = self._out[:, 0]
+        ys = self._out[:, 1]
+        x_min, x_max = float(xs.min()) * self.frame_w, float(xs.max()) * self.frame_w
+        y_min, y_max = float(ys.min()) * self.frame_h, float(ys.max()) * self.frame_h
+        face_size = max(x_max - x_min, y_max - y_min, 1.0)
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+
+        now = timestamp if timestamp is not None else time.time()
+        if self._last_center is not None and now > self._last_time:
+            moved = np.hypot(cx - self._last_center[0], cy - self._last_center[1]) / face_size
+            speed = moved / (now - self._last_time)
+            self._velocity = 0.7 * self._velocity + 0.3 * speed
+        self._last_center = (cx, cy)
+        self._last_time = now
+
+        # Pad for how far the face can move while the next inference is running
+        padding = self.base_padding + self._velocity * max(self._inference_ema, 1.0 / 30)
+        padding = min(padding, self.max_padding)
+        size = int(face_size * (1 + 2 * padding))
+        if size >= min(self.frame_w, self.frame_h):
+            return None  # Face fills the frame: cropping doesn't help
+        x0 = int(min(max(cx - size / 2, 0), self.frame_w - size))
+        y0 = int(min(max(cy - size / 2, 0), self.frame_h - size))
+        return (x0, y0, size)
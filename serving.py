@@ -0,0 +1,278 @@
+"""
+Several stations from one box: N camera feeds on a fixed pool of FaceMesh workers.
+
+Each Stream is one user: its own capture source, DetectorEngine (menu, keyboard, gestures,
+calibration) and FaceMesh pipeline wrappers (ROI crop, optical flow), so no state is
+shared between users. Only the inference workers are shared.
+
+A stream thread runs its newest frame through its engine. Only when FaceMesh actually
+runs (keyframes; optical-flow frames and the decision logic need no worker) does the
+stream's PooledFaceMesh ask the InferencePool for a worker, and it gives it back as soon
+as the landmarks are copied out. Workers are granted in round-robin order over the
+waiting streams (not first come, first served), so a fast stream can't starve a slow one.
+A frame that is older than the stream's latency limit by the time a worker is free is
+dropped (FrameDropped), and the stream moves on to its newest frame. Under overload every
+stream runs at a lower rate but with bounded latency.
+
+Pool workers run FaceMesh with static_image_mode=True: consecutive calls on one worker come
+from different streams, so MediaPipe's own frame-to-frame tracking would mix faces up.
+Tracking is done per stream instead, by the ROI crop (see roi_tracker.py).
+
+    python serving.py 0 1 station3.mp4 --workers 2 --latency-limit 0.15
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from inference_worker import FaceMeshWorker
+from landmarks import NUM_LANDMARKS, FaceLandmarks, LandmarkResults
+from startup import Task
+
+
+class InferencePool:
+    """size FaceMesh worker processes for frames up to width x height, lent out one frame at a time."""
+
+    def __init__(self, size, width, height, **face_mesh_kwargs):
+        self.shape = (height, width, 3)
+        self.face_mesh_kwargs = {**face_mesh_kwargs, "static_image_mode": True}
+        self.size = size
+        self.workers = []
+        self._free = []
+        self._waiting = set()
+        self._streams = 0
+        self._turn = 0          # stream id that gets the next worker if it is waiting
+        self._cond = threading.Condition()
+
+        # Counters
+        self.grants = 0
+
+    def start(self):
+        # Workers start in parallel (each imports mediapipe, ~1 s)
+        tasks = [Task(f"worker-{i}", FaceMeshWorker(self.shape[1], self.shape[0], **self.face_mesh_kwargs).start)
+                 for i in range(self.size)]
+        error = None
+        for task in tasks:
+            try:
+                self.workers.append(task.result())
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            self.close()
+            raise error
+        self._free = list(self.workers)
+        return self
+
+    def register(self):
+        """Id for a new stream (its place in the round-robin order)."""
+        with self._cond:
+            self._streams += 1
+            return self._streams - 1
+
+    def acquire(self, stream_id, timeout=None):
+        """Waits for a free worker and this stream's turn. None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._waiting.add(stream_id)
+            try:
+                while not (self._free and self._next_waiting() == stream_id):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+                worker = self._free.pop()
+                self._turn = (stream_id + 1) % self._streams
+                self.grants += 1
+                return worker
+            finally:
+                self._waiting.discard(stream_id)
+                self._cond.notify_all()  # Another free worker may now be the next stream's
+
+    def release(self, worker):
+        with self._cond:
+            self._free.append(worker)
+            self._cond.notify_all()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = self._free = []
+
+    def _next_waiting(self):
+        return min(self._waiting, key=lambda i: (i - self._turn) % self._streams)
+
+
+class FrameDropped(Exception):
+    """The frame went stale while its stream waited for a pool worker."""
+
+
+class PooledFaceMesh:
+    """
+    FaceMeshWorker stand-in for one stream's pipeline. Each process() call borrows a pool
+    worker for that one inference: the landmarks are copied out and the worker goes
+    straight back. deadline (time.time() value, set per frame by the stream) is when the
+    frame stops being worth inferring; past it process() raises FrameDropped.
+    (No input_buffer(): there is no worker to write into until process() is called.)
+    """
+
+    pipelined = False
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.shape = pool.shape
+        self.id = pool.register()
+        self.deadline = None
+        self._out = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._face = FaceLandmarks(self._out)
+
+    def process(self, rgb_frame, timestamp=0.0):
+        worker = None
+        if self.deadline is None:
+            worker = self.pool.acquire(self.id)
+        elif self.deadline > time.time():
+            worker = self.pool.acquire(self.id, timeout=self.deadline - time.time())
+        if worker is None or (self.deadline is not None and time.time() > self.deadline):
+            if worker is not None:
+                self.pool.release(worker)
+            raise FrameDropped()
+        try:
+            results = worker.process(rgb_frame, timestamp or 0.0)
+            # The worker's result slot belongs to the next stream once it is released
+            found = bool(results.multi_face_landmarks)
+            if found:
+                np.copyto(self._out, results.multi_face_landmarks[0].array)
+        finally:
+            self.pool.release(worker)
+        return LandmarkResults([self._face] if found else None, timestamp)
+
+    def close(self):
+        pass  # The workers belong to the pool
+
+
+class Stream:
+    """
+    One station. source: read() -> (ok, frame, wall-clock timestamp) with the newest frame
+    (CameraCapture, or VideoFileSource(realtime=True)). engine: its DetectorEngine, whose
+    face_mesh pipeline ends in `backend` (a PooledFaceMesh on the shared pool).
+    """
+
+    def __init__(self, name, source, engine, backend, latency_limit=0.15):
+        self.name = name
+        self.source = source
+        self.engine = engine
+        self.backend = backend
+        self.latency_limit = latency_limit
+        self.latencies = deque(maxlen=1000)   # capture -> decisions done, seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = None
+        self.error = None     # why the stream stopped on its own (worker died, source failed)
+
+        # Counters
+        self.frames = 0
+        self.stale = 0        # older than latency_limit before a worker came free: dropped
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.source.release()
+
+    def _run(self):
+        try:
+            self._serve()
+        except Exception as e:
+            self.error = e
+            print(f"Stream {self.name} stopped: {e}")
+
+    def _serve(self):
+        while not self._stop.is_set():
+            ok, frame, t = self.source.read()
+            if not ok:
+                if getattr(self.source, "closed", True):
+                    break
+                continue  # CameraCapture timed out: the camera may only be stalled
+            self.backend.deadline = t + self.latency_limit
+            try:
+                self.engine.process_frame(frame, t)
+            except FrameDropped:
+                self.stale += 1
+                continue
+            self.latencies.append(time.time() - t)
+            self.frames += 1
+
+    def stats(self):
+        seconds = time.time() - self.started if self.started else 0.0
+        latencies = np.asarray(self.latencies)
+        return {
+            "frames": self.frames,
+            "fps": round(self.frames / seconds, 1) if seconds else None,
+            "stale": self.stale,
+            "latency_p50": round(float(np.percentile(latencies, 50)), 4) if len(latencies) else None,
+            "latency_p95": round(float(np.percentile(latencies, 95)), 4) if len(latencies) else None,
+        }
+
+
+def open_source(spec, width, height):
+    """A camera index ("0") or a video file, played back in real time."""
+    if spec.isdigit():
+        import cv2
+        from frame_capture import CameraCapture
+        cap = cv2.VideoCapture(int(spec))
+        if not cap.isOpened():
+            raise IOError(f"Could not open camera {spec}")
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return CameraCapture(cap).start()
+    from replay import VideoFileSource
+    return VideoFileSource(spec, loop=True, realtime=True)
+
+
+def main(argv=None):
+    import argparse
+    import eye_detector
+    from os_input import NullInput
+    from speech import NullSpeaker
+
+    parser = argparse.ArgumentParser(description="Serve several camera feeds on one FaceMesh worker pool")
+    parser.add_argument("sources", nargs="+", help="camera indices and/or video files, one per station")
+    parser.add_argument("--workers", type=int, default=eye_detector.SERVING_WORKERS)
+    parser.add_argument("--latency-limit", type=float, default=eye_detector.SERVING_LATENCY_LIMIT,
+                        help="seconds; older frames are dropped instead of processed")
+    parser.add_argument("--mode", choices=["KEYBOARD", "CURSOR"], default=None,
+                        help="start every station in this mode instead of the blink menu")
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between status lines")
+    args = parser.parse_args(argv)
+
+    width, height = eye_detector.CAM_W, eye_detector.CAM_H
+    pool = InferencePool(args.workers, width, height, **eye_detector.FACE_MESH_OPTIONS).start()
+    streams = []
+    try:
+        for spec in args.sources:
+            source = open_source(spec, width, height)
+            backend = PooledFaceMesh(pool)
+            engine = eye_detector.DetectorEngine(eye_detector.create_face_mesh(width, height, backend=backend),
+                                                 speaker=NullSpeaker(), os_input=NullInput(), mode=args.mode)
+            streams.append(Stream(spec, source, engine, backend, args.latency_limit).start())
+        while True:
+            time.sleep(args.report)
+            for stream in streams:
+                print(f"{stream.name:<16} {stream.stats()}  typed={stream.engine.typed_text!r}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for stream in streams:
+            stream.stop()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
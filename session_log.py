@@ -0,0 +1,270 @@
+"""
+Per-frame session log: what the detector saw and what it did.
+
+Each frame is one fixed-width record (timestamp, FaceMesh landmarks, eye ratios, nose,
+the blink threshold in force, gesture events and the decisions taken), so a file is a
+small JSON header followed by a plain array that np.memmap opens without reading it.
+Landmarks are stored as float16: ~0.25 px at 640 px, below FaceMesh's own jitter, and
+half the size (about 300 MB per hour at 30 fps).
+
+The recorder fills preallocated batches in the main loop and a writer thread appends
+full batches to disk; if the disk falls behind and every batch is queued, records are
+dropped and counted instead of stalling the loop.
+
+    python eye_detector.py --session-log today.edlog
+    python session_log.py summary today.edlog              # rates, latency, blink durations
+    python session_log.py events today.edlog --start 600   # keys/clicks/scrolls with ratios
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, landmarks_to_array
+
+_MAGIC = b"EDLOG1\0\0"
+_HEADER = struct.Struct("<8sI")  # magic, JSON length; records start at the next 64-byte boundary
+MODES = ["", "KEYBOARD", "CURSOR"]
+NO_KEY = -1
+
+
+def record_dtype(n_landmarks=NUM_LANDMARKS):
+    return np.dtype([
+        ("t", "<f8"),               # frame timestamp
+        ("latency", "<f4"),         # wall clock when logged - t (camera timestamps only)
+        ("face", "u1"),             # 0 = no face this frame (landmarks and ratios are zero)
+        ("mode", "u1"),             # index into MODES
+        ("floating_kb", "u1"),
+        ("click", "u1"),
+        ("scroll", "i1"),           # +1 up, -1 down
+        ("key", "<i2"),             # index into the header's key list, NO_KEY if none
+        ("events", "<u4"),          # gesture bitmask (bit i = header gestures[i])
+        ("left_ratio", "<f4"),
+        ("right_ratio", "<f4"),
+        ("nose_x", "<f4"),
+        ("nose_y", "<f4"),
+        ("click_ratio", "<f4"),     # blink threshold in force (changes with calibration)
+        ("landmarks", "<f2", (n_landmarks, 3)),
+    ])
+
+
+class SessionRecorder:
+    """Appends one record per frame; disk writes happen on a background thread."""
+
+    def __init__(self, path, keys, gestures, n_landmarks=NUM_LANDMARKS, batch=256, buffers=4, info=None):
+        self.path = path
+        self.dtype = record_dtype(n_landmarks)
+        self.keys = list(keys)
+        self._key_index = {k: i for i, k in enumerate(self.keys)}
+        fields = [self.dtype.fields[name][0] for name in self.dtype.names]
+        header = {
+            "version": 1,
+            "dtype": [[name, f.base.str, list(f.shape)] for name, f in zip(self.dtype.names, fields)],
+            "keys": self.keys,
+            "gestures": list(gestures),
+            "modes": MODES,
+            "landmarks": n_landmarks,
+            "started": time.time(),
+            **(info or {}),
+        }
+        blob = json.dumps(header).encode("utf-8")
+        offset = -(-(_HEADER.size + len(blob)) // 64) * 64
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(_MAGIC, len(blob)) + blob + b"\0" * (offset - _HEADER.size - len(blob)))
+
+        self._free = queue.Queue()
+        for _ in range(buffers):
+            self._free.put(np.zeros(batch, dtype=self.dtype))
+        self._full = queue.Queue()
+        self._overflow = np.zeros(batch, dtype=self.dtype)  # Written into (and discarded) while the disk catches up
+        self._buffer = self._free.get()
+        self._n = 0
+        self._scratch = np.zeros((n_landmarks, 3), dtype=np.float32)
+        self._thread = threading.Thread(target=self._run, name="session-log", daemon=True)
+        self._thread.start()
+
+        # Counters
+        self.records = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def record(self, t, face, features=None, mode=None, floating_kb=False, key=None, click=False,
+               scroll=0, events=0, click_ratio=0.0):
+        """face: MediaPipe face / FaceLandmarks or None; features: a LandmarkAccessor updated for it."""
+        row = self._buffer[self._n]
+        row["t"] = t
+        row["latency"] = time.time() - t
+        row["mode"] = MODES.index(mode or "")
+        row["floating_kb"] = floating_kb
+        row["click"] = click
+        row["scroll"] = scroll
+        row["key"] = self._key_index.get(key, NO_KEY) if key is not None else NO_KEY
+        row["events"] = events
+        row["click_ratio"] = click_ratio
+        if face is None:
+            row["face"] = 0
+            row["left_ratio"] = row["right_ratio"] = row["nose_x"] = row["nose_y"] = 0.0
+            row["landmarks"] = 0
+        else:
+            row["face"] = 1
+            row["left_ratio"] = features.left_ratio
+            row["right_ratio"] = features.right_ratio
+            row["nose_x"] = features.nose_x
+            row["nose_y"] = features.nose_y
+            points = landmarks_to_array(face, out=None if len(face.landmark) != len(self._scratch) else self._scratch)
+            n = min(len(points), len(self._scratch))
+            row["landmarks"][:n] = points[:n]
+        self._n += 1
+        self.records += 1
+        if self._n == len(self._buffer):
+            self._hand_off()
+
+    def _hand_off(self):
+        if self._buffer is self._overflow:
+            self.dropped += self._n
+        else:
+            self._full.put((self._buffer, self._n))
+        self._n = 0
+        try:
+            self._buffer = self._free.get_nowait()
+        except queue.Empty:
+            self._buffer = self._overflow
+
+    def _run(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                break
+            buffer, n = item
+            self._file.write(buffer[:n].data)
+            self.batches += 1
+            self._free.put(buffer)
+
+    def close(self):
+        if self._n:
+            self._hand_off()
+        self._full.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+# --- Reading ---
+
+def open_session(path):
+    """(header dict, records) with records a read-only np.memmap; a torn last record is ignored."""
+    with open(path, "rb") as f:
+        magic, length = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a session log")
+        header = json.loads(f.read(length))
+    dtype = np.dtype([(name, fmt, tuple(shape)) for name, fmt, shape in header["dtype"]])
+    offset = -(-(_HEADER.size + length) // 64) * 64
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count <= 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+def closures(records, threshold=None):
+    """(start index, end index) of every run where both eyes were above the blink threshold."""
+    level = np.minimum(records["left_ratio"], records["right_ratio"])
+    limit = records["click_ratio"] if threshold is None else threshold
+    closed = (records["face"] == 1) & (level > limit)
+    edges = np.diff(closed.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def blink_durations(records, threshold=None):
+    starts, ends = closures(records, threshold)
+    t = records["t"]
+    ends_t = t[np.minimum(ends, len(t) - 1)]
+    return ends_t - t[starts]
+
+
+def percentiles(values, qs=(50, 95, 99)):
+    if len(values) == 0:
+        return {f"p{q}": None for q in qs}
+    return {f"p{q}": round(float(v), 4) for q, v in zip(qs, np.percentile(values, qs))}
+
+
+def summary(header, records):
+    t = records["t"]
+    n = len(records)
+    seconds = float(t[-1] - t[0]) if n > 1 else 0.0
+    dt = np.diff(t)
+    latency = records["latency"]
+    latency = latency[(latency >= 0) & (latency < 60)]  # Replayed/synthetic timestamps are not wall clock
+    durations = blink_durations(records)
+    gestures = header["gestures"]
+    events = records["events"]
+    keys = records["key"]
+    typed = np.bincount(keys[keys != NO_KEY], minlength=len(header["keys"]))
+    return {
+        "frames": n,
+        "seconds": round(seconds, 1),
+        "fps": round(n / seconds, 2) if seconds else None,
+        "face_fraction": round(float(records["face"].mean()), 4) if n else None,
+        "frame_interval": percentiles(dt),
+        "gaps_over_200ms": int((dt > 0.2).sum()),
+        "latency": percentiles(latency),
+        "blink_duration": {**percentiles(durations), "count": len(durations),
+                           "histogram": dict(zip(["<0.1", "0.1-0.3", "0.3-0.5", "0.5-1.0", "1.0-1.5", ">1.5"],
+                                                 np.histogram(durations, [0, 0.1, 0.3, 0.5, 1.0, 1.5, np.inf])[0].tolist()))},
+        "click_ratio": percentiles(records["click_ratio"][records["face"] == 1], (0, 50, 100)),
+        "gestures": {name: int(((events >> i) & 1).sum()) for i, name in enumerate(gestures)},
+        "keys": {header["keys"][i]: int(c) for i, c in enumerate(typed) if c},
+        "clicks": int(records["click"].sum()),
+        "scroll_frames": int((records["scroll"] != 0).sum()),
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Session log reader")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("summary", help="frame rate, latency, blink-duration distribution, decisions")
+    p.add_argument("log")
+    p = sub.add_parser("events", help="every key, click and scroll start with the ratios that caused it")
+    p.add_argument("log")
+    p.add_argument("--start", type=float, default=None, help="seconds from the start of the log")
+    p.add_argument("--end", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    header, records = open_session(args.log)
+    if args.command == "summary":
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["started"]))
+        print(f"{args.log}: started {started}")
+        for name, value in summary(header, records).items():
+            print(f"  {name:<16} {value}")
+        return
+
+    if len(records) == 0:
+        return
+    t0 = records["t"][0]
+    rel = records["t"] - t0
+    mask = np.ones(len(records), dtype=bool)
+    if args.start is not None:
+        mask &= rel >= args.start
+    if args.end is not None:
+        mask &= rel <= args.end
+    scroll = records["scroll"]
+    scroll_start = (scroll != 0) & (np.diff(scroll, prepend=0) != 0)
+    for i in np.flatnonzero(mask & ((records["key"] != NO_KEY) | (records["click"] == 1) | scroll_start)):
+        r = records[i]
+        if r["key"] != NO_KEY:
+            what = f"key {header['keys'][r['key']]}"
+        elif r["click"]:
+            what = "click"
+        else:
+            what = "scroll up" if r["scroll"] > 0 else "scroll down"
+        mode = header["modes"][r["mode"]] + (" +KB" if r["floating_kb"] else "")
+        print(f"{rel[i]:10.3f}s  {mode:<14} {what:<16} L={r['left_ratio']:.2f} R={r['right_ratio']:.2f} "
+              f"threshold={r['click_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Text-to-speech backends.
+
+SpeechWorker owns one pyttsx3 engine on one long-lived thread and reads utterances
+from a small bounded priority queue. Key echoes and "Click" are coalesced (only the
+newest pending one is kept) and dropped once stale, so fast typing never builds up a
+backlog. Fixed phrases are rendered to WAV once, kept in memory and played directly.
+"""
+import hashlib
+import heapq
+import os
+import sys
+import threading
+import time
+
+# kind -> (priority, max age in seconds or None); lower priority value is spoken first.
+# Kinds other than "prompt" are coalesced: a new utterance replaces the pending one of the same kind.
+SPEECH_KINDS = {
+    "prompt": (0, None),   # mode changes, status messages
+    "echo": (1, 1.0),      # typed key feedback
+    "click": (1, 0.5),     # cursor-mode click confirmation
+}
+
+
+class UtteranceQueue:
+    """Bounded priority queue with per-kind coalescing and expiry."""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        # Counters
+        self.coalesced = 0
+        self.dropped = 0    # evicted because the queue was full
+        self.expired = 0    # too old by the time the worker got to it
+
+    def put(self, text, kind="prompt"):
+        priority, max_age = SPEECH_KINDS.get(kind, SPEECH_KINDS["prompt"])
+        deadline = time.monotonic() + max_age if max_age is not None else None
+        with self._cond:
+            if kind != "prompt":
+                before = len(self._heap)
+                self._heap = [item for item in self._heap if item[3] != kind]
+                if len(self._heap) != before:
+                    self.coalesced += before - len(self._heap)
+                    heapq.heapify(self._heap)
+            self._seq += 1
+            heapq.heappush(self._heap, (priority, self._seq, text, kind, deadline))
+            if len(self._heap) > self.maxsize:
+                # Evict the oldest entry of the lowest priority present
+                worst = max(self._heap, key=lambda item: (item[0], -item[1]))
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                self.dropped += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next (text, kind) to speak, None on timeout or after close()."""
+        with self._cond:
+            end = None if timeout is None else time.monotonic() + timeout
+            while True:
+                while self._heap:
+                    _, _, text, kind, deadline = heapq.heappop(self._heap)
+                    if deadline is not None and time.monotonic() > deadline:
+                        self.expired += 1
+                        continue
+                    return text, kind
+                if self._closed:
+                    return None
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def empty(self):
+        with self._cond:
+            return not self._heap
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._heap = []
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class AudioCache:
+    """
+    Pre-rendered WAVs for a fixed vocabulary, on disk (reused across runs) and in memory.
+    Playback uses winsound on Windows or simpleaudio if installed; otherwise the cache
+    stays disabled and everything is synthesized live.
+    """
+
+    def __init__(self, directory, voice_key=""):
+        self.directory = directory
+        self.voice_key = voice_key
+        self._clips = {}
+        self._play = _audio_player()
+        self.enabled = self._play is not None and directory is not None
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, text):
+        digest = hashlib.sha1(f"{self.voice_key}|{text.casefold()}".encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.wav")
+
+    def missing(self, vocabulary):
+        """Phrases not yet loaded; those already on disk are loaded on the way."""
+        todo = []
+        for text in vocabulary:
+            if text.casefold() in self._clips:
+                continue
+            if not self.load(text):
+                todo.append(text)
+        return todo
+
+    def load(self, text):
+        path = self.path_for(text)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if len(data) <= 44:  # WAV header only: the driver rendered nothing
+            return False
+        try:
+            self._clips[text.casefold()] = _load_clip(data)
+        except Exception:
+            return False  # Not a PCM WAV (some drivers write other formats)
+        return True
+
+    def play(self, text):
+        """Plays the cached clip and returns True, or False if text isn't cached."""
+        clip = self._clips.get(text.casefold())
+        if clip is None:
+            return False
+        self._play(clip)
+        return True
+
+
+def _audio_player():
+    if sys.platform == "win32":
+        import winsound
+        return lambda clip: winsound.PlaySound(clip, winsound.SND_MEMORY)
+    try:
+        import simpleaudio  # noqa: F401
+    except ImportError:
+        return None
+    return lambda clip: clip.play().wait_done()
+
+
+def _load_clip(data):
+    if sys.platform == "win32":
+        return data
+    import io
+    import wave
+    import simpleaudio
+    with wave.open(io.BytesIO(data)) as w:
+        return simpleaudio.WaveObject(w.readframes(w.getnframes()), w.getnchannels(),
+                                      w.getsampwidth(), w.getframerate())
+
+
+class SpeechWorker:
+    """
+    One thread, one pyttsx3 engine. say() never blocks: it only queues the text.
+    vocabulary: phrases to pre-render into cache_dir while the worker is idle.
+    """
+
+    def __init__(self, rate=180, vocabulary=(), cache_dir=None, queue_size=8, render_batch=8):
+        self.rate = rate
+        self.vocabulary = list(dict.fromkeys(vocabulary))
+        self.cache_dir = cache_dir
+        self.render_batch = render_batch
+        self.queue = UtteranceQueue(queue_size)
+        self.cache = None
+        self._thread = None
+        # Counters
+        self.spoken = 0
+        self.cache_hits = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+        return self
+
+    def say(self, text, kind="prompt"):
+        if text:
+            self.queue.put(text, kind)
+
+    def close(self):
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # --- Worker thread ---
+
+    def _run(self):
+        # pyttsx3 drivers are bound to the thread that created them
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            voice = engine.getProperty('voice')
+        except Exception as e:
+            print(f"Text-to-speech unavailable: {e}")
+            return
+
+        self.cache = AudioCache(self.cache_dir, f"{voice}|{self.rate}")
+        todo = self.cache.missing(self.vocabulary) if self.cache.enabled else []
+
+        while True:
+            # Render the vocabulary in small batches whenever nothing is waiting to be spoken
+            item = self.queue.get(timeout=0 if todo else None)
+            if item is None:
+                if self.queue.closed:
+                    break
+                todo = self._render(engine, todo)
+                continue
+            text, _ = item
+            try:
+                if self.cache.enabled and self.cache.play(text):
+                    self.cache_hits += 1
+                else:
+                    engine.say(text)
+                    engine.runAndWait()
+                self.spoken += 1
+            except Exception:
+                pass
+
+    def _render(self, engine, todo):
+        batch, rest = todo[:self.render_batch], todo[self.render_batch:]
+        try:
+            for text in batch:
+                engine.save_to_file(text, self.cache.path_for(text))
+            engine.runAndWait()
+        except Exception:
+            return []  # Driver can't render to files; keep synthesizing live
+        for text in batch:
+            self.cache.load(text)
+        return rest
+
+
+class NullSpeaker:
+    """Discards speech; used for headless replay and benchmarks."""
+
+    def __init__(self):
+        self.spoken = 0
+        self.last_text = None
+
+    def say(self, text, kind="prompt"):
+        if text:
+            self.spoken += 1
+            self.last_text = text
+
+    def close(self):
+        pass
@@ -0,0 +1,86 @@
+"""
+Startup sequencing (kiosks restart often, so the first seconds matter).
+
+main() used to do everything in order before the first window appeared: open the camera,
+start the FaceMesh worker (which imports mediapipe), import pynput, query the screen;
+the first real frame then paid the model's warm-up on top. Now each slow step is a Task
+started at once on its own thread. The mode menu is shown on a blank canvas while they
+run; the camera picture joins as soon as the camera is open, and FaceMesh as soon as it
+has been warmed up on a dummy frame.
+
+StartupTimer records when each milestone was first reached, in seconds since the process
+started (eye_detector.STARTED):
+
+    first_frame         first window on screen (the mode menu)
+    camera              camera open
+    face_mesh           backend running and warmed up
+    first_inference     first camera frame through FaceMesh
+    first_landmarks     first frame with a face
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class Task:
+    """Runs fn(*args, **kwargs) on a daemon thread; result() waits for it and re-raises its exception."""
+
+    def __init__(self, name, fn, *args, **kwargs):
+        self.name = name
+        self._result = None
+        self._error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(fn, args, kwargs), name=f"startup-{name}",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, fn, args, kwargs):
+        try:
+            self._result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Startup step '{self.name}' still running after {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class StartupTimer:
+    """Milestone name -> seconds since start (a time.time() value); only the first mark counts."""
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.marks = {}
+
+    def mark(self, name, at=None):
+        if name not in self.marks:
+            self.marks[name] = (time.time() if at is None else at) - self.start
+        return self.marks[name]
+
+    def report(self):
+        return "  ".join(f"{name}={seconds:.2f}s" for name, seconds in sorted(self.marks.items(), key=lambda kv: kv[1]))
+
+
+def warm_up(face_mesh, width, height):
+    """
+    One inference on a black frame, so the first camera frame doesn't pay for interpreter
+    setup (MediaPipe creates both the detector and the landmark model on the first call,
+    face or no face). Returns the seconds it took.
+    """
+    start = time.perf_counter()
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    if hasattr(face_mesh, "submit"):
+        face_mesh.submit(frame, 0.0)  # Not process(): a pipelined worker must start with an empty queue
+        face_mesh.collect()
+    else:
+        face_mesh.process(frame)
+    return time.perf_counter() - start